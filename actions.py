@@ -0,0 +1,55 @@
+from game import Game
+
+# Each move is mapped to one of 50 actions:
+# 0-23 play a power card, 24-47 play a power card with a hero card, 48 draw a card, 49 sit out.
+ACTION_NUM = 50
+DRAW_ACTION = ACTION_NUM - 2
+SIT_OUT_ACTION = ACTION_NUM - 1
+
+def get_move_from_action(action):
+    """Map the action index to a move.
+
+    arguments:
+    action -- The action index.
+
+    return: The move that corresponds to the action index.
+    """
+    if action == SIT_OUT_ACTION:
+        return None # Sit out.
+    if action == DRAW_ACTION:
+        return (True, False, None) # Draw a card.
+    
+    is_using_hero_card = False
+    if action > Game.POWER_CARDS_NUM-1:
+        is_using_hero_card = True
+    
+    direction = Game.DIRECTIONS[action%Game.DIRECTIONS_NUM]
+    distance = (action%Game.POWER_CARDS_NUM) // Game.DIRECTIONS_NUM + 1
+    power_card = [direction[0]*distance, direction[1]*distance]
+    
+    return (False, is_using_hero_card, power_card)
+
+def get_action_from_move(move):
+    """Map the move to an action index.
+
+    arguments:
+    move -- The move.
+
+    return: The action index that corresponds to move.
+    """
+    if move == None: # Sit out.
+        return SIT_OUT_ACTION
+    if move[0]: # Draw a card.
+        return DRAW_ACTION
+
+    action = 0
+    if move[1]: # Use a hero card.
+        action += Game.POWER_CARDS_NUM
+
+    power_card = move[2]
+    distance = max(abs(power_card[0]), abs(power_card[1]))
+    direction = (power_card[0]/distance, power_card[1]/distance)
+    action += (distance-1) * Game.DIRECTIONS_NUM
+    action += Game.DIRECTIONS.index(direction)
+
+    return int(action)
@@ -1,78 +1,202 @@
 from game import Game
 import numpy as np
 import time
+import json
 from tqdm import tqdm
-import math
-import players
-from monte_carlo import MonteCarlo
-from sb3_contrib.common.wrappers import ActionMasker
-from sb3_contrib.ppo_mask import MaskablePPO
-import gymnasium
-from game_env import GameEnv
-import os
+import random
+import player_registry
+from game_record import GameRecord, save_records
+from search_control import SearchControl
+from search_stats import SearchStats, save_stats
+import profiling
 
-def mask_fn(env: gymnasium.Env) -> np.ndarray:
-    return env.valid_action_mask()
-
-def suggest_move(state, player_to_move, mode, depth=None, hero_card_discount=None, mcts=None, timeout=None, selection_mode=None, env=None, model=None):
-    """Suggest a move for the given player type.
+def suggest_move(state, player, budget=None, control=None):
+    """Suggest a move for the given player.
 
     arguments:
     state -- The current game state.
-    player_to_move -- The "color" of the player whose turn it is.
-    mode -- The type of player.
-    further arguments for the player modes
+    player -- The specification of the player (dict), see player_registry.py and the templates below.
+    budget -- An optional limit for the calculation (search depth or seconds, depending on the player type).
+    control -- An optional SearchControl, e.g. to collect the statistics of the search.
 
     return: The player's suggested move.
     """
-    if mode == "random":
-        return players.random(state, player_to_move)
-    elif mode == "expectiminimax":
-        return players.expectiminimax(state, depth, -math.inf, math.inf, player_to_move, hero_card_discount)[1]
-    elif mode == "alphabeta":
-        return players.alphabeta(state, depth, -math.inf, math.inf, player_to_move, hero_card_discount)[1]
-    elif mode == "minimax":
-        return players.minimax(state, depth, player_to_move, hero_card_discount)[1]
-    elif mode == "mcts":
-        return players.mcts(state, mcts, timeout, selection_mode)
-    elif mode == "rl":
-        return players.rl(state, env, model)
-        
-def play_games(num, player1, player2):
+    return player_registry.get_player(player, state.player_to_move).choose_move(state, budget, control)
+
+def play_game(player1, player2, starting_player=-1, seed=None, collect_stats=False):
+    """Play one game between the given players.
+
+    arguments:
+    player1 -- The specification of the first participating player (dict), who plays with -1.
+    player2 -- The specification of the second participating player (dict), who plays with 1.
+    starting_player -- The player who makes the first move.
+    seed -- The seed for the random number generators, so that the card distribution is reproducible.
+    collect_stats -- Whether the statistics of each search are collected (see search_stats.py).
+                     The players search in the same way as without statistics.
+
+    return: The result of the game (dict) with the winner, the moves, the time for each move,
+            the record of the game (see game_record.py) and the statistics of the searches if they are collected.
+    """
+    if seed != None:
+        random.seed(seed)
+        np.random.seed(seed)
+
+    game = Game()
+    game.player_to_move = starting_player
+    record = GameRecord.start(game, {"player1": player1, "player2": player2, "seed": seed})
+    moves = []
+    move_times = []
+    stats = []
+
+    while(not game.is_game_over()):
+        player = player1 if game.player_to_move == -1 else player2
+        other_player = player2 if game.player_to_move == -1 else player1
+        control = SearchControl(SearchStats()) if collect_stats else None
+        start_time = time.time()
+        with profiling.attribute(get_profile_label(player, game.player_to_move)):
+            move = suggest_move(game, player, control=control)
+        move_time = time.time() - start_time
+        move_times.append(move_time)
+        if collect_stats:
+            control.finish()
+            stats.append(dict(control.stats.to_dict(), player=get_player_name(player), ply=len(moves)))
+        # The other player may think on the opponent's time. A pondering thread would compete with the search
+        # for the GIL and distort its timing, so it only starts after the search and gets as much time as the search took.
+        # Players that do not ponder are skipped, so that they do not wait for nothing.
+        pondering_player = player_registry.get_player(other_player, -game.player_to_move)
+        if pondering_player.CAN_PONDER:
+            with profiling.attribute(get_profile_label(other_player, -game.player_to_move)):
+                pondering_player.ponder(game, move_time)
+        game.execute_move(move, game.player_to_move)
+        record.add_move(game)
+        moves.append(move)
+
+    for side, player in [(-1, player1), (1, player2)]:
+        player_registry.get_player(player, side).stop_pondering()
+        player_registry.get_player(player, side).new_game()
+
+    record.info["winner"] = game.determine_winner()
+    result = {"winner": game.determine_winner(), "starting_player": starting_player, "seed": seed, "moves": moves, "move_times": move_times,
+              "record": record}
+    if collect_stats:
+        result["stats"] = stats
+    return result
+
+def play_games(num, player1, player2, store=None, tournament="arena", seed=None, records_path=None, stats_path=None, profile_path=None):
     """Play a number of games between the given players.
 
     arguments:
     num -- The number of games.
     player1 -- The first participating player (dict)
     player2 -- The seconds participating player (dict)
+    store -- An optional ResultStore (see results_store.py) in which every game is saved as soon as it is finished.
+             Games that are already stored for the tournament are not played again.
+    tournament -- The name of the run in the store.
+    seed -- The seed of the first game, the other games use the following seeds.
+    records_path -- An optional path under which the records of the played games are saved (see game_record.py).
+    stats_path -- An optional path under which the statistics of all searches are saved as JSON (see search_stats.py).
+    profile_path -- An optional path under which the games are profiled as collapsed stacks for flamegraph tools,
+                    split by player (see profiling.py). The CPU time of each player is printed.
+    """
+    profiler = None
+    if profile_path != None:
+        profiler = profiling.Profiler()
+        profiler.start()
+    results = []
+    finished_indices = set()
+    if store != None:
+        for player in [player1, player2]:
+            store.register_player(get_player_name(player), get_player_config(player))
+        games = [{"index": i, "player1": get_player_name(player1), "player2": get_player_name(player2),
+                  "seed": None if seed == None else seed + i} for i in range(num)]
+        finished_indices = store.get_finished_indices(tournament, games)
+        # Other runs under the same name, e.g. with more games, are not part of the results.
+        results = [result for result in store.get_results(tournament) if result["index"] in finished_indices]
+
+    player_to_move = 1
+    for i in tqdm(range(num), desc="Play Games"):
+        player_to_move *= -1
+        if i in finished_indices:
+            continue
+        game_seed = None if seed == None else seed + i
+        result = play_game(player1, player2, player_to_move, game_seed, stats_path != None)
+        result.update({"index": i, "player1": get_player_name(player1), "player2": get_player_name(player2)})
+        if store != None:
+            store.add_result(tournament, result)
+        results.append(result)
+
+    if records_path != None:
+        save_records([result["record"] for result in results if "record" in result], records_path)
+    if stats_path != None:
+        save_stats([dict(entry, game=result["index"]) for result in results for entry in result.get("stats", [])], stats_path)
+    if profiler != None:
+        profiler.stop()
+        profiling.save_profile(profiler, profile_path)
+    print_results(results)
+
+def get_player_name(player):
+    """Return the name of a player, under which the results are stored.
+
+    arguments:
+    player -- The player (dict).
+
+    return: The optional "name" of the player, otherwise its mode with the parameters that differ from the defaults,
+            e.g. "alphabeta(depth=3)", so that differently configured players get different names.
+    """
+    if "name" in player:
+        return player["name"]
+    defaults = player_registry.PLAYER_TYPES[player["mode"]].PARAMETERS
+    parameters = [f"{key}={json.dumps(value, sort_keys=True)}" for key, value in sorted(player.items())
+                  if key != "mode" and (key not in defaults or defaults[key] != value)]
+    if len(parameters) == 0:
+        return player["mode"]
+    return f"{player['mode']}({','.join(parameters)})"
+
+def get_profile_label(player, player_number):
+    """Return the label under which the time of a player is profiled.
+    The side is part of the label, so that two players of the same type are distinguished.
+
+    arguments:
+    player -- The player (dict).
+    player_number -- The number of the player in the game (-1 for player1, 1 for player2).
+
+    return: The label.
+    """
+    return f"{'player1' if player_number == -1 else 'player2'}:{get_player_name(player)}"
+
+def get_player_config(player):
+    """Return the configuration of a player with the default values of all parameters.
+
+    arguments:
+    player -- The player (dict).
+
+    return: The configuration (dict).
+    """
+    return player_registry.complete_spec(player)
+
+def print_results(results):
+    """Print the wins, draws and average move times of both players.
+
+    arguments:
+    results -- The results of the played games (see play_game).
     """
     stats = [0, 0, 0] # [wins player 1, draws, wins player 2]
     time_player1 = 0
     time_player2 = 0
     move_num_player1 = 0
     move_num_player2 = 0
-    
-    player_to_move = 1
-    for i in tqdm(range(num), desc="Play Games"):
-        player_to_move *= -1
-        game = Game()
-        game.player_to_move = player_to_move
-        
-        while(not game.is_game_over()):
-            if game.player_to_move == -1:
-                start_time = time.time()
-                move = suggest_move(game, -1, player1["mode"], player1["depth"], player1["hero_card_discount"], player1["mcts"], player1["timeout"], player1["selection_mode"], player1["env"], player1["model"])
-                time_player1 += time.time() - start_time
-                game.execute_move(move, -1)
+
+    for result in results:
+        # The players alternate, starting with the starting player.
+        for i, move_time in enumerate(result["move_times"]):
+            if (i % 2 == 0) == (result["starting_player"] == -1):
+                time_player1 += move_time
                 move_num_player1 += 1
             else:
-                start_time = time.time()
-                move = suggest_move(game, 1, player2["mode"], player2["depth"], player2["hero_card_discount"], player2["mcts"], player2["timeout"], player2["selection_mode"], player2["env"], player2["model"])
-                time_player2 += time.time() - start_time
-                game.execute_move(move, 1)
+                time_player2 += move_time
                 move_num_player2 += 1
-                
-        winner = game.determine_winner()
+
+        winner = result["winner"]
         if winner == -1:
             stats[0] += 1
         elif winner == 1:
@@ -80,8 +204,8 @@ def play_games(num, player1, player2):
         else:
             stats[1] += 1
             
-    average_time_player1 = time_player1 / move_num_player1
-    average_time_player2 = time_player2 / move_num_player2
+    average_time_player1 = time_player1 / move_num_player1 if move_num_player1 > 0 else 0
+    average_time_player2 = time_player2 / move_num_player2 if move_num_player2 > 0 else 0
         
     print(f"Average time player 1: {average_time_player1}")
     print(f"Average time player 2: {average_time_player2}")
@@ -92,79 +216,71 @@ def play_games(num, player1, player2):
 """
 ### Create random player ###
 player$player_number$ = {
-    "mode": "random",
-    "depth": None,
-    "hero_card_discount": None,
-    "mcts": None,
-    "timeout": None,
-    "selection_mode": None,
-    "env": None,
-    "model": None
+    "mode": "random"
 }
 
 ### Create minimax player ###
 player$player_number$ = {
     "mode": "minimax",
     "depth": 4,
-    "hero_card_discount": 30,
-    "mcts": None,
-    "timeout": None,
-    "selection_mode": None,
-    "env": None,
-    "model": None
+    "hero_card_discount": 30
 }
 
 ### Create alphabeta player ###
 player$player_number$ = {
     "mode": "alphabeta",
     "depth": 4,
+    "hero_card_discount": 30
+}
+
+### Create alphabeta player that solves short endgames exactly (see endgame.py) ###
+player$player_number$ = {
+    "mode": "alphabeta",
+    "depth": 4,
+    "hero_card_discount": 30,
+    "endgame_threshold": 3
+}
+
+### Create principal variation search player (iterative deepening with aspiration windows) ###
+player$player_number$ = {
+    "mode": "pvs",
+    "depth": 4,
     "hero_card_discount": 30,
-    "mcts": None,
-    "timeout": None,
-    "selection_mode": None,
-    "env": None,
-    "model": None
+    "aspiration_window": 20
+}
+
+### Create principal variation search player with tuned evaluation weights (see texel_tuning.py) ###
+player$player_number$ = {
+    "mode": "pvs",
+    "depth": 4,
+    "hero_card_discount": 30,
+    "weights_path": "weights/evaluation.json"
 }
 
 ### Create expectiminimax player ###
 player$player_number$ = {
     "mode": "expectiminimax",
     "depth": 4,
-    "hero_card_discount": 30,
-    "mcts": None,
-    "timeout": None,
-    "selection_mode": None,
-    "env": None,
-    "model": None
+    "hero_card_discount": 30
 }
 
 ### Create mcts player ###
-mcts$player_number$ = MonteCarlo()
 player$player_number$ = {
     "mode": "mcts",
-    "depth": None,
-    "hero_card_discount": None,
-    "mcts": mcts$player_number$,
     "timeout": 1,
-    "selection_mode": "robust child",
-    "env": None,
-    "model": None
+    "selection_mode": "robust child"
+}
+
+### Create player that thinks on the opponent's time ###
+player$player_number$ = {
+    "mode": "ponder",
+    "player": {"mode": "alphabeta", "depth": 4, "hero_card_discount": 30}
 }
 
 ### Create reinforcement learning player ###
-env$player_number$ = GameEnv(model=2)
-env$player_number$ = ActionMasker(env$player_number$, mask_fn)
-env$player_number$.reset()
-model_path$player_number$ = "models/trained_models/model2.zip"
-model$player_number$ = MaskablePPO.load(model_path$player_number$, env=env$player_number$)
 player$player_number$ = {
     "mode": "rl",
-    "depth": None,
-    "hero_card_discount": None,
-    "mcts": None,
-    "timeout": None,
-    "selection_mode": None,
-    "env": env$player_number$,
-    "model": model$player_number$
+    "model_path": "models/trained_models/model2.zip",
+    "env_model": 2
 }
 """
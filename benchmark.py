@@ -0,0 +1,299 @@
+import os
+import sys
+import copy
+import json
+import time
+import random
+import platform
+import numpy as np
+from game import Game
+from game_env import GameEnv
+import players
+from monte_carlo import MonteCarlo
+from search_control import SearchControl
+
+BASELINE_PATH = "benchmarks/baseline.json"
+RESULTS_PATH = "benchmarks/latest.json"
+# Relative deterioration above which a benchmark counts as a regression.
+REGRESSION_THRESHOLD = 0.15
+POSITION_NUM = 50 # positions per game phase
+REPEAT_NUM = 5 # the fastest repetition is taken, which is the least disturbed by other processes
+# Number of pieces on the board at which the positions of each game phase are taken.
+PHASES = {"opening": 2, "midgame": 26, "endgame": 46}
+
+# Search depths of the minimax-based algorithms and the number of simulations of the MCTS per position.
+# The workloads visit about a thousand nodes or more, so that the node rates are stable enough for the threshold.
+SEARCH_DEPTHS = {"minimax": 4, "alphabeta": 5, "pvs": 5, "expectiminimax": 2}
+SEARCH_POSITION_NUM = 20
+MCTS_POSITION_NUM = 10
+MCTS_SIMULATION_BUDGET = 100
+SEARCH_REPEAT_NUM = 3
+HERO_CARD_DISCOUNT = 30
+
+
+def create_positions(seed=0, position_num=POSITION_NUM):
+    """Create reproducible positions of all game phases by playing random games.
+
+    arguments:
+    seed -- The seed of the random games.
+    position_num -- The number of positions per game phase.
+
+    return: The positions by game phase (dict of lists of game states).
+    """
+    random.seed(seed)
+    np.random.seed(seed)
+    positions = {phase: [] for phase in PHASES}
+    while min(len(states) for states in positions.values()) < position_num:
+        game = Game()
+        game.player_to_move = random.choice([-1, 1])
+        phases = list(PHASES.items())
+        while not game.is_game_over() and len(phases) > 0:
+            phase, piece_num = phases[0]
+            if Game.PIECES_NUM - game.playable_pieces_num >= piece_num:
+                if len(positions[phase]) < position_num:
+                    positions[phase].append(copy.deepcopy(game))
+                phases.pop(0)
+                continue
+            game.execute_move(random.choice(game.get_legal_moves(game.player_to_move)), game.player_to_move)
+    return positions
+
+def create_terminal_positions(seed=0, position_num=POSITION_NUM):
+    """Create reproducible finished games by playing random games to the end.
+
+    arguments:
+    seed -- The seed of the random games.
+    position_num -- The number of positions.
+
+    return: The final game states (list).
+    """
+    random.seed(seed)
+    np.random.seed(seed)
+    positions = []
+    while len(positions) < position_num:
+        game = Game()
+        game.player_to_move = random.choice([-1, 1])
+        while not game.is_game_over():
+            game.execute_move(random.choice(game.get_legal_moves(game.player_to_move)), game.player_to_move)
+        positions.append(game)
+    return positions
+
+def measure(function, states, setup=None, repeat_num=REPEAT_NUM):
+    """Measure the average time of a function over a set of positions.
+
+    arguments:
+    function -- The function that is called with each prepared position.
+    states -- The positions.
+    setup -- An optional function that prepares each position outside of the measured time.
+    repeat_num -- The number of repetitions, of which the fastest one is taken.
+
+    return: The time per call in microseconds.
+    """
+    best_time = None
+    for _ in range(repeat_num):
+        items = states if setup == None else [setup(state) for state in states]
+        start_time = time.perf_counter()
+        for item in items:
+            function(item)
+        elapsed_time = time.perf_counter() - start_time
+        if best_time == None or elapsed_time < best_time:
+            best_time = elapsed_time
+    return best_time / len(states) * 1e6
+
+def clear_cache(state):
+    """Prepare a position for a measurement that should not profit from the cached valuations.
+
+    arguments:
+    state -- The game state.
+
+    return: The game state.
+    """
+    state.valuations = None
+    return state
+
+def prepare_move(state):
+    """Prepare a copy of a position together with its first legal move.
+
+    arguments:
+    state -- The game state.
+
+    return: The copied game state and the move.
+    """
+    return copy.deepcopy(state), state.get_legal_moves(state.player_to_move)[0]
+
+def run_game_benchmarks(positions, terminal_positions):
+    """Measure the hot paths of the game and of the environment in every game phase.
+    determine_winner returns early in positions that are not finished,
+    so it is measured on finished games as well.
+
+    arguments:
+    positions -- The positions by game phase (see create_positions).
+    terminal_positions -- Finished games (see create_terminal_positions).
+
+    return: The results by benchmark name (dict).
+    """
+    results = {}
+    envs = {f"model{model}": GameEnv(model=model) for model in [2, 5]}
+
+    for phase, states in positions.items():
+        benchmarks = {
+            "get_legal_moves": (lambda state: state.get_legal_moves(state.player_to_move), None),
+            "execute_move": (lambda item: item[0].execute_move(item[1], item[0].player_to_move), prepare_move),
+            "calc_valuations": (lambda state: state.calc_valuations(), clear_cache),
+            "determine_winner": (lambda state: state.determine_winner(), clear_cache),
+            "deepcopy": (copy.deepcopy, None),
+        }
+        for env_name, env in envs.items():
+            benchmarks[f"get_obs_{env_name}"] = (lambda state, env=env: (env.set_game(state), env.get_obs()), clear_cache)
+        benchmarks["valid_action_mask"] = (lambda state, env=envs["model2"]: (env.set_game(state), env.valid_action_mask()), None)
+
+        for name, (function, setup) in benchmarks.items():
+            results[f"{phase}/{name}"] = {"value": measure(function, states, setup), "unit": "us", "higher_is_better": False}
+    results["terminal/determine_winner"] = {"value": measure(lambda state: state.determine_winner(), terminal_positions, clear_cache),
+                                            "unit": "us", "higher_is_better": False}
+    return results
+
+def run_search(mode, state, control):
+    """Run one of the search algorithms on a position.
+
+    arguments:
+    mode -- The search algorithm ("minimax", "alphabeta", "pvs", "expectiminimax" or "mcts").
+    state -- The game state.
+    control -- The SearchControl that counts the visited nodes.
+    """
+    player = state.player_to_move
+    if mode == "minimax":
+        players.minimax(state, SEARCH_DEPTHS[mode], player, HERO_CARD_DISCOUNT, control)
+    elif mode == "alphabeta":
+        players.alphabeta(state, SEARCH_DEPTHS[mode], -np.inf, np.inf, player, HERO_CARD_DISCOUNT, control)
+    elif mode == "pvs":
+        players.pvs(state, SEARCH_DEPTHS[mode], -np.inf, np.inf, HERO_CARD_DISCOUNT, control)
+    elif mode == "expectiminimax":
+        players.expectiminimax(state, SEARCH_DEPTHS[mode], -np.inf, np.inf, player, HERO_CARD_DISCOUNT, control)
+    else:
+        # Each position gets a new seeded tree, so that the searched tree is the same in every run.
+        MonteCarlo(seed=0).run_search(state, None, control, MCTS_SIMULATION_BUDGET)
+
+def run_search_benchmarks(positions, seed=0):
+    """Measure the visited nodes per second of all search algorithms on midgame positions.
+    For the MCTS the nodes are the simulations. Each search is repeated with the same seed,
+    so that it visits the same nodes, and the fastest repetition is taken.
+
+    arguments:
+    positions -- The positions by game phase (see create_positions).
+    seed -- The seed for the drawn cards within the searches.
+
+    return: The results by benchmark name (dict).
+    """
+    results = {}
+    for mode in list(SEARCH_DEPTHS) + ["mcts"]:
+        states = positions["midgame"][:MCTS_POSITION_NUM if mode == "mcts" else SEARCH_POSITION_NUM]
+        best_rate = None
+        for _ in range(SEARCH_REPEAT_NUM):
+            np.random.seed(seed)
+            node_num = 0
+            elapsed_time = 0
+            for state in states:
+                control = SearchControl()
+                start_time = time.perf_counter()
+                run_search(mode, state, control)
+                elapsed_time += time.perf_counter() - start_time
+                node_num += control.node_num
+            if best_rate == None or node_num / elapsed_time > best_rate:
+                best_rate = node_num / elapsed_time
+        results[f"search/{mode}"] = {"value": best_rate, "unit": "nodes/s", "higher_is_better": True}
+    return results
+
+def run_benchmarks(seed=0, with_searches=True):
+    """Run all benchmarks on reproducible positions.
+
+    arguments:
+    seed -- The seed of the positions.
+    with_searches -- Whether the search algorithms are measured as well.
+
+    return: The report (dict) with information about the machine and the results by benchmark name.
+    """
+    positions = create_positions(seed)
+    results = run_game_benchmarks(positions, create_terminal_positions(seed))
+    if with_searches:
+        results.update(run_search_benchmarks(positions, seed))
+    return {
+        "machine": {"python": platform.python_version(), "numpy": np.__version__, "platform": platform.platform(),
+                    "processor": platform.processor()},
+        "seed": seed,
+        "time": time.time(),
+        "results": results,
+    }
+
+def save_report(report, path):
+    """Save a report as JSON.
+
+    arguments:
+    report -- The report (see run_benchmarks).
+    path -- The path of the file.
+    """
+    directory = os.path.dirname(path)
+    if directory != "":
+        os.makedirs(directory, exist_ok=True)
+    with open(path, "w") as file:
+        json.dump(report, file, indent=4)
+
+def load_report(path):
+    """Load a report.
+
+    arguments:
+    path -- The path of the file.
+
+    return: The report.
+    """
+    with open(path) as file:
+        return json.load(file)
+
+def compare_reports(report, baseline, threshold=REGRESSION_THRESHOLD):
+    """Compare the results of a report with a baseline.
+
+    arguments:
+    report -- The new report.
+    baseline -- The report of the baseline.
+    threshold -- The relative deterioration above which a benchmark counts as a regression.
+
+    return: The comparison of each benchmark that is in both reports (list of dicts with the name, both values,
+            the relative improvement and whether it is a regression).
+    """
+    comparisons = []
+    for name, result in report["results"].items():
+        if name not in baseline["results"]:
+            continue
+        baseline_value = baseline["results"][name]["value"]
+        value = result["value"]
+        # Positive changes are improvements, for times as well as for rates.
+        if result["higher_is_better"]:
+            change = value / baseline_value - 1
+        else:
+            change = baseline_value / value - 1
+        comparisons.append({"name": name, "baseline": baseline_value, "value": value, "unit": result["unit"],
+                            "change": change, "is_regression": change < -threshold})
+    return comparisons
+
+def print_comparisons(comparisons):
+    """Print the comparison with the baseline as a table.
+
+    arguments:
+    comparisons -- The comparisons (see compare_reports).
+    """
+    print(f"{'benchmark':<32}{'baseline':>14}{'current':>14}{'change':>10}")
+    for comparison in comparisons:
+        marker = "  REGRESSION" if comparison["is_regression"] else ""
+        print(f"{comparison['name']:<32}{comparison['baseline']:>14.2f}{comparison['value']:>14.2f}{comparison['change']:>+10.1%} {comparison['unit']}{marker}")
+
+
+if __name__ == "__main__":
+    report = run_benchmarks()
+    save_report(report, RESULTS_PATH)
+    if not os.path.exists(BASELINE_PATH):
+        save_report(report, BASELINE_PATH)
+        print(f"Baseline saved in {BASELINE_PATH}")
+        sys.exit()
+    comparisons = compare_reports(report, load_report(BASELINE_PATH))
+    print_comparisons(comparisons)
+    if any(comparison["is_regression"] for comparison in comparisons):
+        sys.exit(1)
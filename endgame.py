@@ -0,0 +1,210 @@
+import copy
+from collections import OrderedDict
+
+# Value of a won game in the units of Game.calc_heuristic, so that exact results fit into the minimax-based searches.
+WIN_VALUE = 1000000
+ENDGAME_THRESHOLD = 3
+# Maximum number of positions that are searched for one move, since drawn cards can make an endgame very large.
+NODE_LIMIT = 2000
+SOLUTION_CACHE_SIZE = 1000000
+
+# Types of the values in the cache: exact value, lower bound, upper bound.
+EXACT = 0
+LOWER_BOUND = 1
+UPPER_BOUND = 2
+
+
+def calc_horizon(state):
+    """Calculate an upper bound for the number of card plays until the end of the game.
+    Each card play either places a piece or uses a hero card.
+
+    arguments:
+    state -- The current game state.
+
+    return: The number of remaining pieces and hero cards.
+    """
+    return state.playable_pieces_num + int(sum(state.player_hero_cards_num))
+
+def is_endgame(state, threshold=ENDGAME_THRESHOLD):
+    """Check whether the game is short enough to try to solve it exactly.
+
+    arguments:
+    state -- The current game state.
+    threshold -- The maximum number of remaining pieces and hero cards.
+
+    return: Whether the state is an endgame.
+    """
+    return calc_horizon(state) <= threshold
+
+
+class EndgameTooLarge(Exception):
+    """Raised when an endgame cannot be solved within the node limit."""
+    pass
+
+
+class EndgameSolver:
+    """Class to search an endgame exactly until the end of the game.
+    The value of a position is the expected result for the player to move
+    (1 for a win, 0 for a draw, -1 for a loss), drawn cards are averaged over all cards in the stack.
+    The search is an alpha-beta search in negamax form, which also cuts off draws
+    as soon as the average cannot leave the window anymore (Star1).
+    Searched positions are kept in a cache by their position key, so that transpositions
+    and later moves of the same endgame are answered immediately.
+    """
+
+    def __init__(self, node_limit=NODE_LIMIT, cache_size=SOLUTION_CACHE_SIZE):
+        """Create a solver with an empty cache.
+
+        arguments:
+        node_limit -- The maximum number of positions that are searched for one move, None for no limit.
+        cache_size -- The maximum number of positions in the cache.
+        """
+        self.node_limit = node_limit
+        self.cache_size = cache_size
+        self.cache = OrderedDict()
+        self.node_num = 0
+
+    def try_solve(self, state, control=None):
+        """Solve an endgame if it is possible within the node limit.
+        Positions that were searched before the limit was reached stay in the cache.
+
+        arguments:
+        state -- The current game state.
+        control -- An optional SearchControl to cancel the search and to count the visited nodes.
+
+        return: The value for the player to move and the best move, None if the endgame is too large.
+        """
+        self.node_num = 0
+        try:
+            return self.solve(state, control)
+        except EndgameTooLarge:
+            return None
+
+    def solve(self, state, control=None):
+        """Calculate the exact value and the best move for the player to move.
+        EndgameTooLarge is raised when more positions than the node limit are searched since the last try_solve.
+
+        arguments:
+        state -- The current game state.
+        control -- An optional SearchControl to cancel the search and to count the visited nodes.
+
+        return: The value for the player to move, the best move (None at the end of the game).
+        """
+        # With a window larger than all values, the result is exact.
+        return self.search(state, -2, 2, control)
+
+    def search(self, state, alpha, beta, control=None):
+        """Alpha-beta search to the end of the game.
+        If the value is outside the window, only a bound is returned (fail-soft).
+
+        arguments:
+        state -- The current game state.
+        alpha -- minimum possible value.
+        beta -- maximum possible value.
+        control -- An optional SearchControl to cancel the search and to count the visited nodes.
+
+        return: The value for the player to move, the best move.
+        """
+        key = state.position_key()
+        cached_move = None
+        if key in self.cache:
+            self.cache.move_to_end(key)
+            cached_value, value_type, cached_move = self.cache[key]
+            if value_type == EXACT or (value_type == LOWER_BOUND and cached_value >= beta) or (value_type == UPPER_BOUND and cached_value <= alpha):
+                return cached_value, cached_move
+
+        if control != None:
+            control.count_node()
+        self.node_num += 1
+        if self.node_limit != None and self.node_num > self.node_limit:
+            raise EndgameTooLarge()
+
+        winner = state.determine_winner()
+        if winner != None:
+            return winner * state.player_to_move, None
+
+        player = state.player_to_move
+        # Drawing a card is searched last, because it is the most expensive move.
+        moves = sorted(state.get_legal_moves(player), key=lambda move: move != None and move[0])
+        if cached_move != None and cached_move in moves:
+            # The best move of an earlier search is searched first.
+            moves.remove(cached_move)
+            moves.insert(0, cached_move)
+
+        original_alpha = alpha
+        value = -2
+        best_move = None
+        for move in moves:
+            if move == None or not move[0]:
+                new_state = copy.deepcopy(state)
+                new_state.execute_move(move, player)
+                new_value = -self.search(new_state, -beta, -alpha, control)[0]
+            else:
+                new_value = self.search_draw(state, move, alpha, beta, control)
+
+            if new_value > value:
+                value = new_value
+                best_move = move
+            if value > alpha:
+                alpha = value
+            if alpha >= beta:
+                break # beta cutoff
+
+        value_type = EXACT
+        if value <= original_alpha:
+            value_type = UPPER_BOUND
+        elif value >= beta:
+            value_type = LOWER_BOUND
+        self.cache[key] = (value, value_type, best_move)
+        if len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+        return value, best_move
+
+    def search_draw(self, state, move, alpha, beta, control=None):
+        """Calculate the average value of drawing a card over all cards in the stack.
+        The search stops as soon as the average is certainly outside the window.
+
+        arguments:
+        state -- The current game state.
+        move -- The move that draws a card.
+        alpha -- minimum possible value.
+        beta -- maximum possible value.
+        control -- An optional SearchControl to cancel the search and to count the visited nodes.
+
+        return: The average value for the player to move, or a bound if it is outside the window.
+        """
+        player = state.player_to_move
+        drawable_power_cards_num = len(state.drawable_power_cards)
+        value_sum = 0
+        for i in range(drawable_power_cards_num):
+            # The values of the remaining cards are between -1 and 1.
+            remaining_num = drawable_power_cards_num - i - 1
+            child_alpha = drawable_power_cards_num * alpha - value_sum - remaining_num
+            child_beta = drawable_power_cards_num * beta - value_sum + remaining_num
+            if child_alpha >= 1:
+                return (value_sum + remaining_num + 1) / drawable_power_cards_num
+            if child_beta <= -1:
+                return (value_sum - remaining_num - 1) / drawable_power_cards_num
+
+            new_state = copy.deepcopy(state)
+            new_state.execute_move(move, player, i)
+            new_value = -self.search(new_state, -min(child_beta, 1), -max(child_alpha, -1), control)[0]
+            value_sum += new_value
+            if new_value <= child_alpha:
+                return (value_sum + remaining_num) / drawable_power_cards_num
+            if new_value >= child_beta:
+                return (value_sum - remaining_num) / drawable_power_cards_num
+
+        return value_sum / drawable_power_cards_num
+
+    def evaluate(self, state, player, control=None):
+        """Calculate the exact value of a position in the units of Game.calc_heuristic.
+
+        arguments:
+        state -- The current game state.
+        player -- The player from whose point of view the value is calculated.
+        control -- An optional SearchControl to cancel the search and to count the visited nodes.
+
+        return: The value for the given player.
+        """
+        return self.solve(state, control)[0] * state.player_to_move * player * WIN_VALUE
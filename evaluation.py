@@ -0,0 +1,175 @@
+import os
+import json
+import numpy as np
+from game import Game
+
+WEIGHTS_PATH = "weights/evaluation.json"
+
+# The features are differences between the player and the opponent, so that the evaluation is antisymmetric.
+FEATURE_NAMES = [
+    "points",             # points of all fields
+    "largest_field",      # size of the largest field
+    "pieces",             # pieces on the board
+    "hero_cards",         # remaining hero cards
+    "hero_cards_phase",   # remaining hero cards weighted by the share of remaining pieces
+    "mobility",           # power cards that can be played without a hero card
+    "hero_threats",       # power cards that can flip a piece of the opponent with a hero card
+    "crown_centrality",   # centrality of the crown if the player is to move, negative for the opponent
+]
+FEATURE_NUM = len(FEATURE_NAMES)
+
+# With these weights the evaluation equals Game.calc_heuristic with the hero card discount of the game.
+DEFAULT_WEIGHTS = {"points": 1, "hero_cards": Game.HERO_CARD_DISCOUNT}
+
+# Value of a won game, as in Game.calc_heuristic.
+WIN_VALUE = 1000000
+
+# Loaded evaluators by their path.
+evaluator_cache = {}
+
+
+def calc_card_features(state, player_index):
+    """Calculate the mobility and the hero card threats of one player.
+
+    arguments:
+    state -- The current game state.
+    player_index -- The array index of the player.
+
+    return: The number of power cards that can be played without and with a hero card.
+    """
+    cards = state.player_power_cards[player_index]
+    # Empty places in the hand are [0, 0] and lead to the crown position itself.
+    is_card = np.any(cards != 0, axis=1)
+    targets = state.crown_position + cards
+    is_on_board = np.all((targets >= 0) & (targets < Game.BOARD_SIZE), axis=1) & is_card
+    target_values = state.board[targets[:, 0] % Game.BOARD_SIZE, targets[:, 1] % Game.BOARD_SIZE]
+    player = state.determine_player(player_index)
+
+    mobility = np.count_nonzero(is_on_board & (target_values == 0))
+    hero_threats = 0
+    if state.player_hero_cards_num[player_index] > 0:
+        hero_threats = np.count_nonzero(is_on_board & (target_values == -player))
+    return mobility, hero_threats
+
+def calc_features(state, player):
+    """Calculate the features of a state from the point of view of the given player.
+    The valuations of the board are taken from the cache of the state.
+
+    arguments:
+    state -- The current game state.
+    player -- The player from whose point of view the features are calculated.
+
+    return: The features (array of FEATURE_NUM values).
+    """
+    player_index = state.determine_player_index(player)
+    other_player_index = 1 - player_index
+    valuations = state.calc_valuations()
+    mobility, hero_threats = calc_card_features(state, player_index)
+    other_mobility, other_hero_threats = calc_card_features(state, other_player_index)
+
+    hero_cards = state.player_hero_cards_num[player_index] - state.player_hero_cards_num[other_player_index]
+    center = Game.BOARD_SIZE // 2
+    crown_centrality = center - max(abs(state.crown_position[0] - center), abs(state.crown_position[1] - center))
+    if state.player_to_move != player:
+        crown_centrality = -crown_centrality
+
+    return np.array([
+        valuations[0, player_index] - valuations[0, other_player_index],
+        valuations[1, player_index] - valuations[1, other_player_index],
+        valuations[2, player_index] - valuations[2, other_player_index],
+        hero_cards,
+        hero_cards * state.playable_pieces_num / Game.PIECES_NUM,
+        mobility - other_mobility,
+        hero_threats - other_hero_threats,
+        crown_centrality,
+    ], dtype=np.float64)
+
+def load_evaluator(path):
+    """Load an evaluator from a weights file. Each file is only loaded once per process.
+
+    arguments:
+    path -- The path of the weights file.
+
+    return: The evaluator.
+    """
+    if path not in evaluator_cache:
+        evaluator_cache[path] = Evaluator.load(path)
+    return evaluator_cache[path]
+
+
+class Evaluator:
+    """Class for a static evaluation of game states as a weighted sum of features.
+    It can replace Game.calc_heuristic in the minimax-based searches.
+    """
+
+    def __init__(self, weights=None):
+        """Create an evaluator.
+
+        arguments:
+        weights -- The weights by feature name (dict), missing features get the weight 0.
+                   By default the evaluation equals Game.calc_heuristic.
+        """
+        if weights == None:
+            weights = DEFAULT_WEIGHTS
+        unknown_features = set(weights) - set(FEATURE_NAMES)
+        if len(unknown_features) > 0:
+            raise ValueError(f"Unknown features: {sorted(unknown_features)}")
+        self.weights = np.array([weights.get(name, 0) for name in FEATURE_NAMES], dtype=np.float64)
+
+    @classmethod
+    def load(cls, path):
+        """Load the weights from a JSON file.
+
+        arguments:
+        path -- The path of the weights file.
+
+        return: The evaluator.
+        """
+        with open(path) as file:
+            return cls(json.load(file))
+
+    def save(self, path):
+        """Save the weights into a JSON file.
+
+        arguments:
+        path -- The path of the weights file.
+        """
+        directory = os.path.dirname(path)
+        if directory != "":
+            os.makedirs(directory, exist_ok=True)
+        with open(path, "w") as file:
+            json.dump(self.get_weights(), file, indent=4)
+
+    def get_weights(self):
+        """Return the weights by feature name.
+
+        return: The weights (dict).
+        """
+        return {name: float(weight) for name, weight in zip(FEATURE_NAMES, self.weights)}
+
+    def has_integer_values(self):
+        """Whether all values of the evaluation are integers, like those of Game.calc_heuristic.
+        The feature hero_cards_phase is a multiple of 1/Game.PIECES_NUM.
+
+        return: Whether the values are integers.
+        """
+        phase_weight = self.weights[FEATURE_NAMES.index("hero_cards_phase")]
+        return bool(np.all(self.weights == np.round(self.weights)) and phase_weight % Game.PIECES_NUM == 0)
+
+    def evaluate(self, state, player, with_inf=False):
+        """Evaluate a state for the given player.
+
+        arguments:
+        state -- The current game state.
+        player -- The player from whose point of view the state is evaluated.
+        with_inf -- Whether decided games get the values WIN_VALUE/-WIN_VALUE, as in Game.calc_heuristic.
+
+        return: The value of the state.
+        """
+        if with_inf:
+            winner = state.determine_winner()
+            if winner == player:
+                return WIN_VALUE
+            if winner == -player:
+                return -WIN_VALUE
+        return float(calc_features(state, player) @ self.weights)
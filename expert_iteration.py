@@ -0,0 +1,359 @@
+import os
+import math
+import random
+import shutil
+from multiprocessing import Pool
+import numpy as np
+import torch
+import torch.nn.functional as F
+from tqdm import tqdm
+from sb3_contrib.common.maskable.policies import MaskableActorCriticPolicy
+from sb3_contrib.common.wrappers import ActionMasker
+from sb3_contrib.ppo_mask import MaskablePPO
+from game import Game
+import players
+from monte_carlo import MonteCarlo
+from game_env import GameEnv
+import symmetry
+
+GAME_NUM = 1000
+PROCESS_NUM = os.cpu_count()
+SHARD_SIZE = 50000 # number of positions per shard
+DATA_DIR = "data/expert_iteration"
+
+# Values of the minimax-based players are mapped to [-1, 1] with tanh(value / VALUE_SCALE).
+VALUE_SCALE = 50
+
+# The data of each process is kept here, so that the search player is only created once per process.
+worker = {}
+
+
+def init_worker(search, search_args, model, augment=False):
+    """Initialise a worker process that plays the games.
+
+    arguments:
+    search -- The search player that labels the positions ("alphabeta", "expectiminimax" or "mcts").
+    search_args -- The arguments of the search player (dict).
+    model -- The model type of the environment that determines the observations.
+    augment -- Whether each position is recorded in all eight symmetric versions (see symmetry.py).
+    """
+    worker["search"] = search
+    worker["augment"] = augment
+    worker["search_args"] = search_args
+    worker["env"] = GameEnv(model=model)
+
+
+def search_position(state):
+    """Calculate the move and the value of the search player for the given position.
+
+    arguments:
+    state -- The current game state.
+
+    return: The move of the search player, the value for the player to move in [-1, 1].
+    """
+    search_args = worker["search_args"]
+    player = state.player_to_move
+
+    if worker["search"] == "alphabeta":
+        value, move = players.alphabeta(state, search_args["depth"], -math.inf, math.inf, player, search_args["hero_card_discount"])
+        return move, math.tanh(value / VALUE_SCALE)
+    if worker["search"] == "expectiminimax":
+        value, move = players.expectiminimax(state, search_args["depth"], -math.inf, math.inf, player, search_args["hero_card_discount"])
+        return move, math.tanh(value / VALUE_SCALE)
+
+    mct = worker["mcts"]
+    move = players.mcts(state, mct, search_args["timeout"], search_args["selection_mode"])
+    child_node = mct.nodes[state.hash_value].child_node(move)
+    if child_node.proven_value != None:
+        return move, child_node.proven_value * player
+    # The wins of a child node are counted for the player who moved into it,
+    # except for chance nodes, whose state is still the one before drawing the card.
+    # A draw counts as half a win for both players.
+    win_num = child_node.win_num
+    if child_node.is_chance_node:
+        win_num = child_node.move_num - child_node.win_num - child_node.draw_num
+    return move, 2 * (win_num + child_node.draw_num / 2) / child_node.move_num - 1
+
+
+def play_game(args):
+    """Play one game with the search player on both sides and record all positions with more than one legal move.
+    With augmentation, the symmetric positions are recorded as well, with the correspondingly transformed moves.
+
+    arguments:
+    args -- The seed of the game and the probability to play a random move instead of the search move.
+
+    return: The recorded columns of the game (dict of arrays).
+    """
+    seed, random_move_ratio = args
+    random.seed(seed)
+    np.random.seed(seed)
+
+    env = worker["env"]
+    if worker["search"] == "mcts":
+        # A new tree for every game, so that the tree of the worker does not grow without bound.
+        worker["mcts"] = MonteCarlo()
+    game = Game()
+    game.player_to_move = random.choice([-1, 1])
+    env.set_game(game)
+    columns = {"obs": [], "mask": [], "action": [], "value": []}
+
+    while not game.is_game_over():
+        moves = game.get_legal_moves(game.player_to_move)
+        if len(moves) > 1:
+            move, value = search_position(game)
+            transformations = range(symmetry.TRANSFORMATIONS_NUM) if worker["augment"] else [symmetry.IDENTITY]
+            for transformation in transformations:
+                env.set_game(symmetry.transform_state(game, transformation, copy_state=False))
+                columns["obs"].append(env.get_obs())
+                columns["mask"].append(env.valid_action_mask())
+                columns["action"].append(env.get_action_from_move(symmetry.transform_move(move, transformation)))
+                columns["value"].append(value)
+            env.set_game(game)
+            # Random moves lead to more diverse positions.
+            if random.random() < random_move_ratio:
+                move = random.choice(moves)
+        else:
+            move = moves[0]
+        game.execute_move(move, game.player_to_move)
+
+    return {
+        "obs": np.array(columns["obs"], dtype=np.float32).reshape(-1, env.observation_space.shape[0]),
+        "mask": np.array(columns["mask"], dtype=bool).reshape(-1, env.action_num),
+        "action": np.array(columns["action"], dtype=np.int16),
+        "value": np.array(columns["value"], dtype=np.float32),
+    }
+
+
+class ShardWriter:
+    """Class to stream recorded positions into sharded columnar files.
+    Each shard is filled as a set of NumPy memmaps (one .npy file per column),
+    so that the positions are never held in memory.
+    A full shard is optionally compressed into a single .npz file.
+    """
+
+    def __init__(self, data_dir, obs_size, action_num, shard_size=SHARD_SIZE, compress=True):
+        """Create a writer for the given directory.
+
+        arguments:
+        data_dir -- The directory for the shards.
+        obs_size -- The number of observations per position.
+        action_num -- The number of actions.
+        shard_size -- The maximum number of positions per shard.
+        compress -- Whether completed shards are compressed.
+        """
+        self.data_dir = data_dir
+        self.shard_size = shard_size
+        self.compress = compress
+        self.shapes = {"obs": (obs_size,), "mask": (action_num,), "action": (), "value": ()}
+        self.dtypes = {"obs": np.float32, "mask": bool, "action": np.int16, "value": np.float32}
+
+        os.makedirs(data_dir, exist_ok=True)
+        # Continue the numbering of existing shards, so that several runs can be combined.
+        self.shard_index = len(list_shards(data_dir))
+        self.columns = None
+        self.row_num = 0
+        self.total_row_num = 0
+
+    def open_shard(self):
+        """Create the memmaps of a new shard.
+        """
+        self.shard_dir = os.path.join(self.data_dir, f"shard_{self.shard_index:05d}")
+        os.makedirs(self.shard_dir, exist_ok=True)
+        self.columns = {}
+        for name in self.shapes:
+            path = os.path.join(self.shard_dir, f"{name}.npy")
+            self.columns[name] = np.lib.format.open_memmap(path, mode="w+", dtype=self.dtypes[name],
+                                                           shape=(self.shard_size,) + self.shapes[name])
+        self.row_num = 0
+
+    def write(self, rows):
+        """Append positions to the current shard and start a new shard if it is full.
+
+        arguments:
+        rows -- The columns of the positions (dict of arrays with equal length).
+        """
+        start = 0
+        length = len(rows["action"])
+        while start < length:
+            if self.columns == None:
+                self.open_shard()
+            end = min(length, start + self.shard_size - self.row_num)
+            for name, column in self.columns.items():
+                column[self.row_num:self.row_num+end-start] = rows[name][start:end]
+            self.row_num += end - start
+            self.total_row_num += end - start
+            start = end
+            if self.row_num == self.shard_size:
+                self.close_shard()
+
+    def close_shard(self):
+        """Flush the current shard to disk. The shard is truncated to the written positions.
+        """
+        if self.columns == None:
+            return
+
+        if self.compress:
+            np.savez_compressed(f"{self.shard_dir}.npz", **{name: column[:self.row_num] for name, column in self.columns.items()})
+            self.columns = None
+            shutil.rmtree(self.shard_dir)
+        else:
+            for column in self.columns.values():
+                column.flush()
+            if self.row_num < self.shard_size:
+                truncated_columns = {name: np.array(column[:self.row_num]) for name, column in self.columns.items()}
+                self.columns = None
+                for name, data in truncated_columns.items():
+                    np.save(os.path.join(self.shard_dir, f"{name}.npy"), data)
+            self.columns = None
+        self.shard_index += 1
+
+    def close(self):
+        """Write the last, possibly incomplete shard.
+        """
+        if self.row_num > 0:
+            self.close_shard()
+        elif self.columns != None:
+            self.columns = None
+            shutil.rmtree(self.shard_dir)
+
+
+def list_shards(data_dir):
+    """List all completed shards in the given directory.
+
+    arguments:
+    data_dir -- The directory of the shards.
+
+    return: The paths of the shards, sorted by their index.
+    """
+    if not os.path.exists(data_dir):
+        return []
+    return sorted(os.path.join(data_dir, name) for name in os.listdir(data_dir) if name.startswith("shard_"))
+
+
+def load_shard(path):
+    """Load the columns of a shard. Uncompressed shards are memory-mapped.
+
+    arguments:
+    path -- The path of the shard (.npz file or directory of .npy files).
+
+    return: The columns of the shard (dict).
+    """
+    if path.endswith(".npz"):
+        with np.load(path) as data:
+            return {name: data[name] for name in data.files}
+    return {name[:-4]: np.load(os.path.join(path, name), mmap_mode="r") for name in os.listdir(path) if name.endswith(".npy")}
+
+
+def generate_positions(game_num, data_dir=DATA_DIR, search="alphabeta", search_args=None, model=2, process_num=PROCESS_NUM,
+                       random_move_ratio=0.1, shard_size=SHARD_SIZE, compress=True, seed=0, augment=False):
+    """Play games in parallel and stream the search-labelled positions into shards.
+
+    arguments:
+    game_num -- The number of games.
+    data_dir -- The directory for the shards.
+    search -- The search player that labels the positions ("alphabeta", "expectiminimax" or "mcts").
+    search_args -- The arguments of the search player (dict).
+    model -- The model type of the environment that determines the observations.
+    process_num -- The number of worker processes.
+    random_move_ratio -- The probability to play a random move instead of the search move.
+    shard_size -- The maximum number of positions per shard.
+    compress -- Whether completed shards are compressed.
+    seed -- The seed of the first game, the other games use the following seeds.
+    augment -- Whether each position is recorded in all eight symmetric versions.
+
+    return: The number of recorded positions.
+    """
+    if search_args == None:
+        search_args = {"depth": 3, "hero_card_discount": 30, "timeout": 1, "selection_mode": "robust child"}
+    env = GameEnv(model=model)
+    writer = ShardWriter(data_dir, env.observation_space.shape[0], env.action_num, shard_size, compress)
+
+    tasks = [(seed + i, random_move_ratio) for i in range(game_num)]
+    with Pool(process_num, initializer=init_worker, initargs=(search, search_args, model, augment)) as pool:
+        for rows in tqdm(pool.imap_unordered(play_game, tasks), total=game_num, desc="Generate Positions"):
+            writer.write(rows)
+    writer.close()
+
+    return writer.total_row_num
+
+
+def iterate_batches(data_dir, batch_size, shuffle=True, seed=None):
+    """Stream the recorded positions in mini-batches. Only one shard is loaded at a time.
+
+    arguments:
+    data_dir -- The directory of the shards.
+    batch_size -- The number of positions per mini-batch.
+    shuffle -- Whether the order of the shards and the positions is shuffled.
+    seed -- The seed for the shuffling.
+
+    return: A generator for the mini-batches (dicts of arrays).
+    """
+    rng = np.random.default_rng(seed)
+    shards = list_shards(data_dir)
+    if shuffle:
+        rng.shuffle(shards)
+
+    for shard in shards:
+        columns = load_shard(shard)
+        length = len(columns["action"])
+        indices = np.arange(length)
+        if shuffle:
+            rng.shuffle(indices)
+        for start in range(0, length, batch_size):
+            # Sorted indices keep the access to memory-mapped columns sequential.
+            batch_indices = np.sort(indices[start:start+batch_size])
+            yield {name: np.asarray(column[batch_indices]) for name, column in columns.items()}
+
+
+def pretrain(model, data_dir=DATA_DIR, epochs=1, batch_size=256, value_coef=0.5, value_scale=GameEnv.REWARD_WIN):
+    """Train the policy of a MaskablePPO model supervised on the recorded positions.
+    The policy learns the search moves (cross-entropy) and the value function learns the search values (MSE).
+
+    arguments:
+    model -- The MaskablePPO model to train.
+    data_dir -- The directory of the shards.
+    epochs -- The number of passes over all shards.
+    batch_size -- The number of positions per mini-batch.
+    value_coef -- The weight of the value loss.
+    value_scale -- The factor to map the search values from [-1, 1] to the scale of the rewards.
+
+    return: The average loss of the last epoch.
+    """
+    policy = model.policy
+    policy.set_training_mode(True)
+    average_loss = None
+    for epoch in range(epochs):
+        loss_sum = 0
+        batch_num = 0
+        for batch in tqdm(iterate_batches(data_dir, batch_size, seed=epoch), desc=f"Pretrain Epoch {epoch+1}"):
+            obs = torch.as_tensor(batch["obs"], device=policy.device)
+            actions = torch.as_tensor(batch["action"].astype(np.int64), device=policy.device)
+            value_targets = torch.as_tensor(batch["value"] * value_scale, device=policy.device)
+
+            values, log_prob, _ = policy.evaluate_actions(obs, actions, action_masks=batch["mask"])
+            loss = -log_prob.mean() + value_coef * F.mse_loss(values.flatten(), value_targets)
+
+            policy.optimizer.zero_grad()
+            loss.backward()
+            torch.nn.utils.clip_grad_norm_(policy.parameters(), model.max_grad_norm)
+            policy.optimizer.step()
+
+            loss_sum += loss.item()
+            batch_num += 1
+        average_loss = loss_sum / max(batch_num, 1)
+        print(f"Epoch {epoch+1}: loss {average_loss}")
+    policy.set_training_mode(False)
+
+    return average_loss
+
+
+if __name__ == "__main__":
+    modeltype = 2
+    position_num = generate_positions(GAME_NUM, model=modeltype, augment=True)
+    print(f"Recorded positions: {position_num}")
+
+    env = ActionMasker(GameEnv(model=modeltype), lambda env: env.valid_action_mask())
+    model = MaskablePPO(MaskableActorCriticPolicy, env, verbose=1)
+    pretrain(model, epochs=3)
+    os.makedirs("models/new_models", exist_ok=True)
+    model.save("models/new_models/pretrained")
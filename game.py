@@ -59,6 +59,9 @@ class Game():
         
         # Create a hash value to uniquely identify game states.
         self.hash_value = str(self.player_power_cards)
+        
+        # The valuations of the current board, calculated on demand and reset by every move on the board.
+        self.valuations = None
 
     def set_power_cards(self, power_card_indices):
         """Add the predefined starting power cards to the players' hands.
@@ -77,12 +80,34 @@ class Game():
 
         self.hash_value = str(self.player_power_cards)
 
+    def position_key(self):
+        """Create a key that identifies the current position independently of the move history.
+        In contrast to hash_value, positions reached by different move orders get the same key.
+        The order of the cards in the hands and in the stack does not influence the key.
+
+        return: The key of the current position.
+        """
+        hands = [sorted(map(tuple, hand.astype(int).tolist())) for hand in self.player_power_cards]
+        drawable_power_cards = sorted(map(tuple, self.drawable_power_cards.astype(int).tolist()))
+
+        key = self.board.astype(np.int8).tobytes()
+        key += np.array(self.crown_position, dtype=np.int8).tobytes()
+        key += np.array(hands, dtype=np.int8).tobytes()
+        key += np.array(self.player_hero_cards_num, dtype=np.int8).tobytes()
+        key += np.array([self.player_to_move], dtype=np.int8).tobytes()
+        key += np.array(drawable_power_cards, dtype=np.int8).tobytes()
+        return key
+
     def calc_valuations(self):
         """Calculate for each player the number of points,
         the largest contiguous field and the number of pieces on the board.
         
         return: The number of points, the largest contiguous field and the number of pieces on the board for each player.
+                The array is shared with later calls for the same board and must not be modified.
         """
+        if self.valuations is not None:
+            return self.valuations
+        
         points = [0, 0]
         max_field_sizes = [0, 0]
         pieces_played_num = [0, 0]
@@ -100,7 +125,8 @@ class Game():
                 if field_size > max_field_sizes[i]:
                     max_field_sizes[i] = field_size
         
-        return np.array([points, max_field_sizes, pieces_played_num], dtype="float64")
+        self.valuations = np.array([points, max_field_sizes, pieces_played_num], dtype="float64")
+        return self.valuations
     
     def calc_differences(self, player):
         """Calculate the differences in the valuations.
@@ -267,6 +293,7 @@ class Game():
         self.player_power_cards[player_index][power_card_place] = 0
         
         self.board[self.crown_position[0]][self.crown_position[1]] = player
+        self.valuations = None
         self.last_drawn_card = None
         
         # A new piece is only placed on the board if no hero card is played,
@@ -4,8 +4,11 @@ from gymnasium import spaces
 from game import Game
 import random
 import players
+import actions
+import player_registry
 import math
 import copy
+import profiling
 from scipy import ndimage
 
 
@@ -24,7 +27,7 @@ class GameEnv(gym.Env):
         """
         super(GameEnv, self).__init__()
         
-        self.action_num = 50
+        self.action_num = actions.ACTION_NUM
         self.action_space = spaces.Discrete(self.action_num)
         self.model = model
         if self.model in [1,2,3]:
@@ -41,6 +44,9 @@ class GameEnv(gym.Env):
         self.game = None
         self.opponent_model = None
         self.opponent_env = None
+        self.opponent_pool = None
+        self.records_results = False
+        self.opponent = None
         self.has_won = None
         self.evaluation = 0
 
@@ -58,6 +64,9 @@ class GameEnv(gym.Env):
         # Initialise a new game.
         self.game = Game()
         self.has_won = None
+        # When training against a league, a new opponent is sampled for each episode.
+        if self.opponent_pool != None:
+            self.opponent = self.opponent_pool.sample()
         # It is randomly selected whether the training model or the opponent starts the game.
         if random.random() < 0.5:
             self.opponent_model_color = -1
@@ -219,26 +228,17 @@ class GameEnv(gym.Env):
                 whether the truncation condition outside the scope of the MDP is satisfied,
                 optional information
         """
-        move = self.get_move_from_action(action)
-        
-        possible_moves = self.game.get_legal_moves(self.game.player_to_move)
-        reward = 0
-        terminated = False
-        truncated = False  # no limit for the number of steps here
-        if move not in possible_moves:
-            reward = self.REWARD_IMPOSSIBLE_MOVE
-            terminated = True
-        else:
-            self.game.execute_move(move, self.game.player_to_move)
-            reward, terminated = self.check_game_end()
-            if not terminated:
+        with profiling.attribute(profiling.ENVIRONMENT_LABEL):
+            reward, terminated = self.execute_agent_move(action)
+        if not terminated:
+            with profiling.attribute(profiling.OPPONENT_LABEL):
                 self.execute_move() # opponent's move
-                reward_after_opponent, terminated = self.check_game_end()
-                if terminated:
-                    reward = reward_after_opponent
+                reward, terminated = self.check_opponent_move(reward)
+        truncated = False  # no limit for the number of steps here
 
-        observation = self.get_obs()
-        info = self.get_info()
+        with profiling.attribute(profiling.ENVIRONMENT_LABEL):
+            observation = self.get_obs()
+            info = self.get_info()
 
         return (
             observation,
@@ -248,6 +248,49 @@ class GameEnv(gym.Env):
             info,
         )
 
+    def execute_agent_move(self, action):
+        """Execute the agent action without the following move of the opponent.
+
+        arguments:
+        action -- The index of the action that the agent executes.
+
+        return: the reward for the agent, whether the game has ended
+        """
+        move = self.get_move_from_action(action)
+        
+        possible_moves = self.game.get_legal_moves(self.game.player_to_move)
+        if move not in possible_moves:
+            self.record_result(-1)
+            return self.REWARD_IMPOSSIBLE_MOVE, True
+
+        self.game.execute_move(move, self.game.player_to_move)
+        return self.check_game_end()
+
+    def execute_opponent_move(self, move, reward):
+        """Execute an already calculated move for the agent's opponent.
+
+        arguments:
+        move -- The move of the opponent.
+        reward -- The reward for the agent's preceding move.
+
+        return: the reward for the agent, whether the game has ended
+        """
+        self.game.execute_move(move, self.game.player_to_move)
+        return self.check_opponent_move(reward)
+
+    def check_opponent_move(self, reward):
+        """Auxiliary method to calculate the reward after the opponent's move.
+
+        arguments:
+        reward -- The reward for the agent's preceding move.
+
+        return: the reward for the agent, whether the game has ended
+        """
+        reward_after_opponent, terminated = self.check_game_end()
+        if terminated:
+            reward = reward_after_opponent
+        return reward, terminated
+
     def check_game_end(self):
         """Check whether the current game has ended and calculate the reward for the agent accordingly.
 
@@ -269,6 +312,9 @@ class GameEnv(gym.Env):
                 reward = new_evaluation - self.evaluation
             self.evaluation = new_evaluation
 
+        if terminated:
+            self.record_result(0 if self.has_won == None else (1 if self.has_won else -1))
+
         if self.model == 1:
             reward = self.REWARD_POSSIBLE_MOVE
         elif self.model == 6:
@@ -277,12 +323,28 @@ class GameEnv(gym.Env):
 
         return reward, terminated
 
+    def record_result(self, result):
+        """Report the result of a finished episode to the opponent pool, if the environment records its results.
+
+        arguments:
+        result -- The result for the agent: 1 for a win, 0 for a draw, -1 for a loss.
+        """
+        if self.opponent_pool != None and self.records_results:
+            self.opponent_pool.record_result(self.opponent, result)
+
     def set_opponent_model(self, opponent_model):
         """Set the model for the opponent.
 
         arguments:
-        opponent_model -- The opponent's model.
+        opponent_model -- The opponent's model. Instead of an RL model, a player from player_registry.py,
+                          its specification (dict) or the name of its mode (e.g. "alphabeta") can be given.
         """
+        if opponent_model == "alphabeta":
+            opponent_model = {"mode": "alphabeta", "depth": 3, "hero_card_discount": 30}
+        elif isinstance(opponent_model, str):
+            opponent_model = {"mode": opponent_model}
+        if isinstance(opponent_model, dict):
+            opponent_model = player_registry.get_player(opponent_model)
         self.opponent_model = opponent_model
 
     def set_opponent_env(self, opponent_env):
@@ -293,6 +355,18 @@ class GameEnv(gym.Env):
         """
         self.opponent_env = opponent_env
 
+    def set_opponent_pool(self, opponent_pool, records_results=True):
+        """Set a pool from which an opponent is sampled for each episode.
+        The pool replaces the single opponent model.
+
+        arguments:
+        opponent_pool -- The opponent pool (see league.py).
+        records_results -- Whether the results of the episodes are added to the statistics of the pool,
+                           which decide how often each opponent is sampled.
+        """
+        self.opponent_pool = opponent_pool
+        self.records_results = records_results
+
     def set_game(self, game):
         """Define the game in which the agent is to participate.
 
@@ -309,10 +383,12 @@ class GameEnv(gym.Env):
         if moves[0] == None: # Sit out.
             self.game.execute_move(None, self.game.player_to_move)
             return
-        if self.opponent_model == None: # random move
+        if self.opponent_pool != None:
+            move_to_play = self.opponent_pool.choose_move(self.opponent, self.game)
+        elif self.opponent_model == None: # random move
             move_to_play = random.choice(moves)
-        elif self.opponent_model == "alphabeta":
-            move_to_play = players.alphabeta(self.game, 3, -math.inf, math.inf, self.game.player_to_move, 30)[1]
+        elif isinstance(self.opponent_model, player_registry.Player):
+            move_to_play = self.opponent_model.choose_move(self.game)
         else:
             self.opponent_env.set_game(self.game)
             obs = self.opponent_env.get_obs()
@@ -327,42 +403,14 @@ class GameEnv(gym.Env):
 
         return: The move that corresponds to the action index.
         """
-        if action == self.action_num - 1:
-            return None # Sit out.
-        if action == self.action_num - 2:
-            return (True, False, None) # Draw a card.
-        
-        is_using_hero_card = False
-        if action > Game.POWER_CARDS_NUM-1:
-            is_using_hero_card = True
-        
-        direction = Game.DIRECTIONS[action%Game.DIRECTIONS_NUM]
-        distance = (action%Game.POWER_CARDS_NUM) // Game.DIRECTIONS_NUM + 1
-        power_card = [direction[0]*distance, direction[1]*distance]
-        
-        return (False, is_using_hero_card, power_card)
+        return actions.get_move_from_action(action)
 
     def get_action_from_move(self, move):
         """Map the move to an action index.
 
         return: The action index that corresponds to move.
         """
-        if move == None: # Sit out.
-            return self.action_num - 1
-        if move[0]: # Draw a card.
-            return self.action_num - 2
-
-        action = 0
-        if move[1]: # Use a hero card.
-            action += Game.POWER_CARDS_NUM
-
-        power_card = move[2]
-        distance = max(abs(power_card[0]), abs(power_card[1]))
-        direction = (power_card[0]/distance, power_card[1]/distance)
-        action += (distance-1) * Game.DIRECTIONS_NUM
-        action += Game.DIRECTIONS.index(direction)
-
-        return action
+        return actions.get_action_from_move(move)
     
     def valid_action_mask(self):
         """Create an action mask.
@@ -0,0 +1,252 @@
+import os
+import json
+import random
+from multiprocessing import Pool
+import numpy as np
+from tqdm import tqdm
+import actions
+import state_codec
+import player_registry
+import endgame
+from search_control import SearchControl
+
+RECORDS_PATH = "records/games.npz"
+PROCESS_NUM = os.cpu_count()
+# Minimum loss of value (in the units of Game.calc_heuristic) for which a move is flagged as a blunder.
+BLUNDER_THRESHOLD = 30
+ANALYSIS_ENGINE = {"mode": "pvs", "depth": 4, "hero_card_discount": 30}
+# Marks a move that does not draw a card.
+NO_CARD = 0
+
+# The data of each process is kept here.
+worker = {}
+
+
+class GameRecord:
+    """Class for the record of a game: the deal (the encoded starting position, see state_codec.py),
+    the moves as action indices (see actions.py) and the drawn cards as card codes.
+    Since the drawn cards are recorded, every position of the game can be reconstructed exactly.
+    """
+
+    def __init__(self, deal, moves=None, drawn_cards=None, info=None):
+        """Create a record.
+
+        arguments:
+        deal -- The encoded starting position (bytes).
+        moves -- The action indices of the moves.
+        drawn_cards -- The codes of the drawn cards (see state_codec.CARDS), NO_CARD for all other moves.
+        info -- Additional information about the game (dict with JSON-serializable values), e.g. the players.
+        """
+        self.deal = deal
+        self.moves = [] if moves is None else [int(action) for action in moves]
+        self.drawn_cards = [] if drawn_cards is None else [int(card) for card in drawn_cards]
+        self.info = {} if info == None else info
+
+    @classmethod
+    def start(cls, state, info=None):
+        """Start the record of a game.
+
+        arguments:
+        state -- The starting position, with the player who makes the first move.
+        info -- Additional information about the game (dict).
+
+        return: The record.
+        """
+        return cls(state_codec.encode(state), info=info)
+
+    def add_move(self, state):
+        """Append the last move of a game to the record.
+
+        arguments:
+        state -- The game state directly after the move.
+        """
+        self.moves.append(actions.get_action_from_move(state.last_move))
+        self.drawn_cards.append(NO_CARD if state.last_drawn_card is None else int(state_codec.encode_cards(state.last_drawn_card)[0]))
+
+    def __len__(self):
+        return len(self.moves)
+
+    def get_moves(self):
+        """Return the moves of the game.
+
+        return: The list of moves.
+        """
+        return [actions.get_move_from_action(action) for action in self.moves]
+
+    def positions(self, ply_num=None):
+        """Replay the game and yield each position before a move.
+        The same state object is changed by every move, it must be copied to be kept.
+
+        arguments:
+        ply_num -- The number of moves to replay, None for the whole game.
+
+        return: Generator of the game state and the move that was played in it.
+        """
+        state = state_codec.decode(self.deal)
+        for action, card in zip(self.moves[:ply_num], self.drawn_cards[:ply_num]):
+            yield state, actions.get_move_from_action(action)
+            execute_recorded_move(state, action, card)
+
+    def replay(self, ply_num=None):
+        """Reconstruct the position after the given number of moves.
+
+        arguments:
+        ply_num -- The number of moves, None for the final position.
+
+        return: The game state.
+        """
+        state = state_codec.decode(self.deal)
+        for action, card in zip(self.moves[:ply_num], self.drawn_cards[:ply_num]):
+            execute_recorded_move(state, action, card)
+        return state
+
+
+def execute_recorded_move(state, action, card):
+    """Execute a recorded move. A drawn card is taken from the stack instead of a random one.
+
+    arguments:
+    state -- The game state.
+    action -- The action index of the move.
+    card -- The code of the drawn card, NO_CARD for all other moves.
+    """
+    power_card_index = None
+    if card != NO_CARD:
+        power_card_index = int(np.where(state_codec.encode_cards(state.drawable_power_cards) == card)[0][0])
+    state.execute_move(actions.get_move_from_action(action), state.player_to_move, power_card_index)
+
+def save_records(records, path=RECORDS_PATH):
+    """Save game records into one compressed file.
+    The deals are stored as one structured array, the moves and drawn cards of all games are concatenated.
+
+    arguments:
+    records -- The game records.
+    path -- The path of the file.
+    """
+    directory = os.path.dirname(path)
+    if directory != "":
+        os.makedirs(directory, exist_ok=True)
+    moves = [record.moves for record in records]
+    drawn_cards = [record.drawn_cards for record in records]
+    np.savez_compressed(path,
+                        deals=np.frombuffer(b"".join(record.deal for record in records), dtype=state_codec.STATE_DTYPE),
+                        lengths=np.array([len(record) for record in records], dtype=np.int32),
+                        moves=np.array([action for game_moves in moves for action in game_moves], dtype=np.uint8),
+                        drawn_cards=np.array([card for game_cards in drawn_cards for card in game_cards], dtype=np.uint8),
+                        info=json.dumps([record.info for record in records]))
+
+def load_records(path=RECORDS_PATH):
+    """Load the game records of a file.
+
+    arguments:
+    path -- The path of the file.
+
+    return: The list of game records.
+    """
+    with np.load(path) as data:
+        deals, lengths, moves, drawn_cards = data["deals"], data["lengths"], data["moves"], data["drawn_cards"]
+        infos = json.loads(str(data["info"]))
+    offsets = np.concatenate(([0], np.cumsum(lengths)))
+    return [GameRecord(deals[i:i+1].tobytes(), moves[offsets[i]:offsets[i+1]], drawn_cards[offsets[i]:offsets[i+1]], infos[i])
+            for i in range(len(lengths))]
+
+
+def init_worker(engine_spec, threshold):
+    """Initialise a worker process of the analysis.
+
+    arguments:
+    engine_spec -- The specification of the engine (see player_registry.py).
+    threshold -- The minimum loss of value for a blunder.
+    """
+    worker["engine"] = player_registry.create_player(engine_spec)
+    worker["threshold"] = threshold
+
+def evaluate_position(engine, state):
+    """Calculate the best move and the value of a position with the engine.
+    The engine must report the value of its best move (see search_control.py), as the minimax-based players do.
+
+    arguments:
+    engine -- The player that analyses the position.
+    state -- The game state.
+
+    return: The best move, the value for the player to move.
+    """
+    winner = state.determine_winner()
+    if winner != None:
+        return None, winner * state.player_to_move * endgame.WIN_VALUE
+    control = SearchControl()
+    move = engine.choose_move(state, control=control)
+    value = control.get_progress()["best_value"]
+    if value == None:
+        raise ValueError(f"The engine {engine.MODE} does not report the values of its moves.")
+    return move, value
+
+def analyse_game(args):
+    """Evaluate every position of a game and flag the moves that lose a lot of value.
+    The loss of a move is the value before the move minus the value after it, both from the view of the mover.
+    Drawing a card is never flagged, because its loss mostly depends on the drawn card.
+
+    arguments:
+    args -- The game record and the seed for the random draws of the engine.
+
+    return: The analysis of each move (list of dicts with the player, the move, the best move of the engine,
+            the value before the move, the loss and whether it is a blunder).
+    """
+    record, seed = args
+    random.seed(seed)
+    np.random.seed(seed)
+    engine = worker["engine"]
+
+    positions = []
+    for state, move in record.positions():
+        best_move, value = evaluate_position(engine, state)
+        positions.append({"player": state.player_to_move, "move": move, "best_move": best_move, "value": value,
+                          "is_choice": len(state.get_legal_moves(state.player_to_move)) > 1})
+    final_value = evaluate_position(engine, record.replay())[1] if len(record) > 0 else None
+
+    for i, position in enumerate(positions):
+        # The player to move changes with every move.
+        next_value = positions[i+1]["value"] if i+1 < len(positions) else final_value
+        position["loss"] = position["value"] + next_value
+        is_draw = position["move"] != None and position["move"][0]
+        position["is_blunder"] = position.pop("is_choice") and not is_draw and position["loss"] >= worker["threshold"]
+    return positions
+
+def analyse_records(records, engine_spec=ANALYSIS_ENGINE, threshold=BLUNDER_THRESHOLD, seed=0, process_num=PROCESS_NUM):
+    """Analyse many games in parallel with the given engine.
+    Each game gets its own seed, so that the analysis does not depend on the number of processes.
+
+    arguments:
+    records -- The game records.
+    engine_spec -- The specification of the engine (see player_registry.py).
+    threshold -- The minimum loss of value for a blunder.
+    seed -- The seed of the first game.
+    process_num -- The number of worker processes.
+
+    return: The analysis of each game (see analyse_game).
+    """
+    args = [(record, seed + i) for i, record in enumerate(records)]
+    with Pool(process_num, initializer=init_worker, initargs=(engine_spec, threshold)) as pool:
+        return list(tqdm(pool.imap(analyse_game, args), total=len(records), desc="Analyse Games"))
+
+def print_blunders(records, analyses):
+    """Print the flagged moves of the analysed games.
+
+    arguments:
+    records -- The game records.
+    analyses -- The analysis of each game (see analyse_records).
+    """
+    blunder_num = 0
+    for i, (record, analysis) in enumerate(zip(records, analyses)):
+        for ply, position in enumerate(analysis):
+            if position["is_blunder"]:
+                blunder_num += 1
+                print(f"Game {i} {record.info}, ply {ply}, player {position['player']}: "
+                      f"{position['move']} loses {position['loss']:.1f}, best move {position['best_move']}")
+    move_num = sum(len(record) for record in records)
+    print(f"Blunders: {blunder_num} in {len(records)} games with {move_num} moves")
+
+
+if __name__ == "__main__":
+    records = load_records()
+    analyses = analyse_records(records)
+    print_blunders(records, analyses)
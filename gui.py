@@ -8,9 +8,13 @@ from monte_carlo import MonteCarlo
 import threading
 import copy
 from scipy import ndimage
-from sb3_contrib.common.wrappers import ActionMasker
-from sb3_contrib.ppo_mask import MaskablePPO
-from game_env import GameEnv
+import player_registry
+from ponder import Ponderer
+from search_worker import SearchWorker
+from search_control import SearchControl, SearchCancelled
+from game_record import GameRecord, save_records
+import os
+import time
 
 class GUI():
     """Class to visualise the game."""
@@ -32,6 +36,7 @@ class GUI():
     POWER_CARD_FONT = ("Arial", 16)
     HERO_CARD_USE_CB_FONT = ("Arial", 12)
     COMPUTER_THINKING_LABEL_FONT = ("Arial", 12)
+    ANALYSIS_LABEL_FONT = ("Arial", 10)
     STACK_FONT = ("Arial", 12)
     
     # symbols
@@ -52,8 +57,22 @@ class GUI():
     HERO_CARD_CB_HEIGHT = 30
     THINKING_LABEL_WIDTH = 180
     THINKING_LABEL_HEIGHT = 30
+    ANALYSIS_LABEL_HEIGHT = 40
     GAP = 10
     
+    # computer player (see player_registry.py)
+    COMPUTER_PLAYER = {"mode": "alphabeta", "depth": 7, "hero_card_discount": 30, "endgame_threshold": 3, "iterative_deepening": True}
+    # for rl opponent
+    #COMPUTER_PLAYER = {"mode": "rl", "model_path": "models/trained_models/model2.zip", "env_model": 2}
+    # Whether the computer thinks on the human's time.
+    PONDERING = False
+    # Whether the computer calculates its moves in a separate process, so that the GUI stays responsive.
+    SEARCH_PROCESS = False
+    # Interval in milliseconds in which the progress of the computer's search is displayed.
+    ANALYSIS_UPDATE_INTERVAL = 200
+    # Directory in which every finished game is saved (see game_record.py), e.g. "records/gui", None to not save the games.
+    RECORDS_DIR = None
+    
     def __init__(self, with_power_card_input=False):
         """Initialise a new GUI.
         """
@@ -61,6 +80,7 @@ class GUI():
         self.window.title("The Rose King")
         self.window.geometry(f"{self.RESOLUTION[0]}x{self.RESOLUTION[1]}")
         self.window.config(bg=self.BACKGROUND_COLOR)
+        self.window.protocol("WM_DELETE_WINDOW", self.close)
         
         # Load pictures.
         self.crown_icon = PhotoImage(file="crown_icon.png")
@@ -158,6 +178,12 @@ class GUI():
                                              fg=self.COMPUTER_THINKING_LABEL_FONT_COLOR,
                                              text="Computer is thinking...",
                                              font=self.COMPUTER_THINKING_LABEL_FONT)
+        # Create a label to show the progress of the computer's search.
+        self.analysis_label = Label(master=self.window,
+                                    bg=self.window.cget("bg"),
+                                    fg=self.COMPUTER_THINKING_LABEL_FONT_COLOR,
+                                    justify=LEFT,
+                                    font=self.ANALYSIS_LABEL_FONT)
         
         # Create a button to draw a card from the stack.
         self.stack = Button(master=self.window,
@@ -191,12 +217,12 @@ class GUI():
             self.played_power_cards.append(played_power_card)
         
         self.game = None
-
-        # for rl agent
-        #self.game_env = GameEnv(model=2)
-        #self.game_env = ActionMasker(self.game_env, self.game_env.valid_action_mask)
-        #model_path = "models/trained_models/model2.zip"
-        #self.model = MaskablePPO.load(model_path, env=self.game_env)
+        if self.SEARCH_PROCESS:
+            # The worker process keeps the player with its tree and its cache across moves.
+            self.ponderer = SearchWorker(self.COMPUTER_PLAYER)
+        else:
+            self.ponderer = Ponderer(player_registry.get_player(self.COMPUTER_PLAYER))
+        self.search_control = None # control of the running computer search
         
         self.is_player_computer = None
         self.is_game_started = False
@@ -211,9 +237,9 @@ class GUI():
         is_player1_computer -- Indicates whether player1 is a computer.
         is_player2_computer -- Indicates whether player2 is a computer.
         """
+        self.ponderer.stop()
+        self.cancel_computer_move()
         self.game = Game(with_power_card_input=self.with_power_card_input)
-        # for rl agent
-        #self.game_env.set_game(self.game)
         
         self.is_game_started = True
 
@@ -246,6 +272,7 @@ class GUI():
             self.game.set_power_cards(power_card_indices)
         
         self.is_player_computer = [is_player1_computer, is_player2_computer]
+        self.record = GameRecord.start(self.game, {"is_player_computer": self.is_player_computer, "computer_player": self.COMPUTER_PLAYER})
         self.sync_game()
         
         # If the first player is a computer, a computer move should be made immediately.
@@ -431,8 +458,17 @@ class GUI():
                                                width=self.THINKING_LABEL_WIDTH,
                                                height=self.THINKING_LABEL_HEIGHT)
             
-            computer_thread = threading.Thread(target=self.execute_computer_move)
+            self.analysis_label.place(x=self.GAP+Game.BOARD_SIZE*self.SQUARE_SIZE+self.GAP+Game.POWER_CARDS_PLACES_NUM*(self.POWER_CARD_WIDTH+self.GAP)+self.HERO_CARD_CB_WIDTH+self.GAP,
+                                      y=self.GAP+self.PLAYER_LABEL_HEIGHT+self.GAP+self.HERO_CARD_HEIGHT+self.GAP+player_to_move_index*(self.POWER_CARD_HEIGHT+self.GAP+self.PLAYER_LABEL_HEIGHT+self.GAP)+self.THINKING_LABEL_HEIGHT,
+                                      width=self.THINKING_LABEL_WIDTH,
+                                      height=self.ANALYSIS_LABEL_HEIGHT)
+            self.analysis_label.config(text="")
+            
+            # Each search gets its own control, so that the result of a cancelled search can be recognised.
+            self.search_control = SearchControl()
+            computer_thread = threading.Thread(target=self.execute_computer_move, args=(copy.deepcopy(self.game), self.search_control), daemon=True)
             computer_thread.start()
+            self.update_analysis(self.search_control)
             
         else: # A human player makes a move.
             power_card_to_draw_index = None
@@ -455,6 +491,7 @@ class GUI():
             legal_moves = self.game.get_legal_moves(self.game.player_to_move)
             if move in legal_moves:
                 self.game.execute_move(move, self.game.player_to_move, power_card_to_draw_index)
+                self.record.add_move(self.game)
                 self.sync_game()
             else:
                 messagebox.showerror(title="Move not possible",
@@ -463,21 +500,33 @@ class GUI():
         
             self.handle_consequences()
     
-    def execute_computer_move(self):
+    def execute_computer_move(self, state, control):
         """Calculate a move for a computer player.
+        
+        arguments:
+        state -- A copy of the current game state.
+        control -- The SearchControl of this search.
         """
-        move = players.alphabeta(self.game, 7, -math.inf, math.inf, self.game.player_to_move, 30)[1]
-        # for rl opponent
-        #move = players.rl(self.game, self.game_env, self.model)
+        try:
+            move = self.ponderer.choose_move(state, control=control)
+        except SearchCancelled:
+            return
+        control.finish()
         
-        self.window.after(0, lambda: self.execute_computer_move_in_main_thread(move))
+        self.window.after(0, lambda: self.execute_computer_move_in_main_thread(move, control))
 
-    def execute_computer_move_in_main_thread(self, move):
+    def execute_computer_move_in_main_thread(self, move, control):
         """Auxiliary method for execute_computer_move to display an eventual dialogue window in the main thread.
 
         arguments:
         move -- The computer's calculated move.
+        control -- The SearchControl of the search that calculated the move.
         """
+        # The result of a search that was cancelled in the meantime (e.g. by a new game) is ignored.
+        if control is not self.search_control or control.is_cancelled():
+            return
+        self.search_control = None
+        
         power_card_to_draw_index = None
         if move != None:
             if move[0]: # The computer wants to draw a card.
@@ -498,10 +547,65 @@ class GUI():
                             return
         
         self.game.execute_move(move, self.game.player_to_move, power_card_to_draw_index)
+        self.record.add_move(self.game)
         self.computer_thinking_label.place_forget()
+        self.analysis_label.place_forget()
         self.sync_game()
         self.handle_consequences()
     
+    def cancel_computer_move(self):
+        """Cancel the running search of the computer, if any.
+        """
+        if self.search_control != None:
+            self.search_control.cancel()
+            self.search_control = None
+        self.computer_thinking_label.place_forget()
+        self.analysis_label.place_forget()
+    
+    def update_analysis(self, control):
+        """Display the progress of the computer's search and schedule the next update until the search is over.
+        
+        arguments:
+        control -- The SearchControl of the search.
+        """
+        if control is not self.search_control or control.is_finished:
+            return
+        progress = control.get_progress()
+        analysis_text = f"Nodes: {progress['node_num']} ({int(progress['nodes_per_second'])}/s)"
+        if progress["depth"] > 0:
+            analysis_text = f"Depth: {progress['depth']}  Best: {self.format_move(progress['best_move'])}\n" + analysis_text
+        self.analysis_label.config(text=analysis_text)
+        self.window.after(self.ANALYSIS_UPDATE_INTERVAL, lambda: self.update_analysis(control))
+    
+    def format_move(self, move):
+        """Convert a move into a short text for the display.
+        
+        arguments:
+        move -- The move.
+        
+        return: The text of the move.
+        """
+        if move == None:
+            return "Sit out"
+        if move[0]:
+            return "Draw card"
+        max_distance = max(abs(move[2][0]), abs(move[2][1]))
+        direction = np.array(move[2]) / max_distance
+        direction_index = Game.DIRECTIONS.index(tuple(direction))
+        move_text = str(int(max_distance))+self.DIRECTION_SYMBOLS[direction_index]
+        if move[1]:
+            move_text += " (hero)"
+        return move_text
+    
+    def close(self):
+        """Stop all calculations of the computer and close the window.
+        """
+        self.cancel_computer_move()
+        self.ponderer.stop()
+        if self.SEARCH_PROCESS:
+            self.ponderer.close()
+        self.window.destroy()
+    
     def handle_consequences(self):
         """Check whether a special situation has occurred in the game.
         This could either be that only one player can no longer make a move,
@@ -517,6 +621,7 @@ class GUI():
                 messagebox.showwarning(title="No move possible",
                                        message=f"Player {player_to_move_index+1} cannot make a move.\nHe must sit out.")
                 self.game.execute_move(None, self.game.player_to_move)
+                self.record.add_move(self.game)
                 self.sync_game()
             else: # There is one winner (or draw), so the game is over.
                 # Determine why the game is over.
@@ -538,10 +643,16 @@ class GUI():
                     else:
                         winner_message=f"Player {winner_player_index+1} wins because he has more pieces on the board."
                 
+                if self.RECORDS_DIR != None:
+                    self.record.info["winner"] = winner
+                    save_records([self.record], os.path.join(self.RECORDS_DIR, time.strftime("%Y%m%d_%H%M%S") + ".npz"))
                 messagebox.showinfo(title="Game over", message=end_message+"\n"+winner_message)
                 return
             
         # Check whether the next player is a computer and if so, make a computer move.
         player_to_move_index = self.game.determine_player_index(self.game.player_to_move)
         if self.is_player_computer[player_to_move_index]:
-            self.execute_move(None, True)
\ No newline at end of file
+            self.execute_move(None, True)
+        elif self.PONDERING and self.is_player_computer[1-player_to_move_index]:
+            # Think about the likely replies while the human is thinking.
+            self.ponderer.start(self.game)
\ No newline at end of file
@@ -0,0 +1,252 @@
+import random
+from collections import OrderedDict
+import numpy as np
+from stable_baselines3.common.vec_env import DummyVecEnv
+import player_registry
+import symmetry
+import profiling
+from game_env import GameEnv
+
+
+class OpponentPool:
+    """Class for a league of opponents for the training of an RL agent.
+    The pool contains frozen past policies and search players.
+    For each episode one opponent is sampled from the pool.
+    """
+
+    def __init__(self, model=2, move_cache_size=100000, prioritized=True):
+        """Create an empty opponent pool.
+        The weights of frequently used policies are kept in memory by player_registry.load_model.
+
+        arguments:
+        model -- The model type of the environment, which determines the input coding scheme of the stored policies.
+        move_cache_size -- The maximum number of positions for which the moves of search players are kept.
+        prioritized -- Whether opponents against which the learner wins less often are sampled more often.
+        """
+        self.model = model
+        self.move_cache_size = move_cache_size
+        self.prioritized = prioritized
+
+        self.opponents = []
+        self.move_cache = OrderedDict()
+        # Scratch environment to calculate observations and action masks for the policies.
+        self.obs_env = GameEnv(model=model)
+
+    def add_random(self, weight=1):
+        """Add a player to the pool that plays random moves.
+
+        arguments:
+        weight -- The relative frequency with which the opponent is sampled.
+
+        return: The new opponent.
+        """
+        return self.add_opponent("random", {"mode": "random"}, weight)
+
+    def add_alphabeta(self, depth=3, hero_card_discount=30, weight=1):
+        """Add an alpha-beta player to the pool.
+
+        arguments:
+        depth -- The search depth of the player.
+        hero_card_discount -- The value that is added to the points per hero card.
+        weight -- The relative frequency with which the opponent is sampled.
+
+        return: The new opponent.
+        """
+        return self.add_opponent(f"alphabeta{depth}", {"mode": "alphabeta", "depth": depth, "hero_card_discount": hero_card_discount}, weight)
+
+    def add_model(self, model_path, weight=1):
+        """Add a frozen policy to the pool.
+
+        arguments:
+        model_path -- The path of the saved model.
+        weight -- The relative frequency with which the opponent is sampled.
+
+        return: The new opponent.
+        """
+        return self.add_opponent(model_path, {"mode": "rl", "model_path": model_path, "env_model": self.model}, weight)
+
+    def add_opponent(self, name, spec, weight=1):
+        """Add any player type from player_registry.py to the pool.
+
+        arguments:
+        name -- The name of the opponent.
+        spec -- The specification of the player (dict).
+        weight -- The relative frequency with which the opponent is sampled.
+
+        return: The new opponent.
+        """
+        opponent = {"name": name, "spec": spec}
+        opponent["weight"] = weight
+        opponent["game_num"] = 0
+        opponent["loss_num"] = 0 # games lost by the learner
+        opponent["draw_num"] = 0
+        self.opponents.append(opponent)
+        return opponent
+
+    def sample(self):
+        """Sample an opponent for the next episode.
+        If the pool is prioritized, opponents that beat the learner more often are preferred.
+
+        return: The sampled opponent.
+        """
+        if len(self.opponents) == 0:
+            raise ValueError("The opponent pool is empty!")
+
+        weights = []
+        for opponent in self.opponents:
+            weight = opponent["weight"]
+            if self.prioritized:
+                # Laplace smoothing so that new opponents are sampled as well. A draw counts as half a loss.
+                weight *= (opponent["loss_num"] + opponent["draw_num"] / 2 + 1) / (opponent["game_num"] + 2)
+            weights.append(weight)
+        return random.choices(self.opponents, weights=weights)[0]
+
+    def record_result(self, opponent, result):
+        """Update the statistics of an opponent after an episode.
+
+        arguments:
+        opponent -- The opponent of the episode.
+        result -- The result for the learner: 1 for a win, 0 for a draw, -1 for a loss (also after an impossible move).
+        """
+        opponent["game_num"] += 1
+        if result == -1:
+            opponent["loss_num"] += 1
+        elif result == 0:
+            opponent["draw_num"] += 1
+
+    def choose_move(self, opponent, game):
+        """Calculate the move of the given opponent.
+
+        arguments:
+        opponent -- The opponent whose move is calculated.
+        game -- The current game state.
+
+        return: The move of the opponent.
+        """
+        return self.choose_moves([(opponent, game)])[0]
+
+    def choose_moves(self, requests):
+        """Calculate the moves of the opponents for several games at once.
+        All games against the same policy are evaluated in a single batched prediction.
+
+        arguments:
+        requests -- A list of tuples (opponent, game).
+
+        return: A list with the move for each request.
+        """
+        moves = [None] * len(requests)
+        policy_requests = {}
+
+        for i, (opponent, game) in enumerate(requests):
+            if opponent["spec"]["mode"] == "rl":
+                policy_requests.setdefault(opponent["spec"]["model_path"], []).append(i)
+            elif opponent["spec"]["mode"] == "random":
+                moves[i] = player_registry.get_player(opponent["spec"]).choose_move(game)
+            else:
+                moves[i] = self.choose_search_move(opponent, game)
+
+        for model_path, indices in policy_requests.items():
+            model = player_registry.load_model(model_path)
+            observations = []
+            masks = []
+            for i in indices:
+                self.obs_env.set_game(requests[i][1])
+                observations.append(self.obs_env.get_obs())
+                masks.append(self.obs_env.valid_action_mask())
+            actions, _ = model.predict(np.array(observations), action_masks=np.array(masks))
+            for i, action in zip(indices, actions):
+                moves[i] = self.obs_env.get_move_from_action(action)
+
+        return moves
+
+    def choose_search_move(self, opponent, game):
+        """Calculate the move of a search player.
+        Positions that occur again (e.g. after the same opening) or their symmetric positions are answered from a cache.
+
+        arguments:
+        opponent -- The search player.
+        game -- The current game state.
+
+        return: The move of the search player.
+        """
+        position_key, transformation = symmetry.canonicalize(game)
+        key = (opponent["name"], position_key)
+        if key in self.move_cache:
+            self.move_cache.move_to_end(key)
+            return symmetry.from_canonical_move(self.move_cache[key], transformation)
+
+        move = player_registry.get_player(opponent["spec"]).choose_move(game)
+        self.move_cache[key] = symmetry.to_canonical_move(move, transformation)
+        if len(self.move_cache) > self.move_cache_size:
+            self.move_cache.popitem(last=False)
+        return move
+
+    def get_stats(self):
+        """Return the statistics of all opponents in the pool.
+
+        return: For each opponent its name, the number of games and the win and draw rates of the learner.
+        """
+        stats = []
+        for opponent in self.opponents:
+            win_rate = None
+            draw_rate = None
+            if opponent["game_num"] > 0:
+                win_rate = 1 - (opponent["loss_num"] + opponent["draw_num"]) / opponent["game_num"]
+                draw_rate = opponent["draw_num"] / opponent["game_num"]
+            stats.append({"name": opponent["name"], "game_num": opponent["game_num"], "win_rate": win_rate, "draw_rate": draw_rate})
+        return stats
+
+
+class LeagueVecEnv(DummyVecEnv):
+    """Vectorized environment in which all learner-vs-pool games are played in one process.
+    The moves of the opponents of all environments are calculated together,
+    so that games against the same policy share one batched prediction.
+    """
+
+    def __init__(self, env_fns, opponent_pool):
+        """Create the vectorized environment.
+
+        arguments:
+        env_fns -- Functions that create the (possibly wrapped) GameEnv instances.
+        opponent_pool -- The pool from which the opponents are sampled.
+        """
+        super().__init__(env_fns)
+        self.opponent_pool = opponent_pool
+        for env in self.envs:
+            env.unwrapped.set_opponent_pool(opponent_pool)
+
+    def step_wait(self):
+        """Execute the actions of the learner in all environments,
+        then the moves of all opponents in one batch.
+
+        return: observations, rewards, dones and infos of all environments
+        """
+        game_envs = [env.unwrapped for env in self.envs]
+        terminated = [False] * self.num_envs
+
+        requests = []
+        waiting_env_indices = []
+        with profiling.attribute(profiling.ENVIRONMENT_LABEL):
+            for env_idx, game_env in enumerate(game_envs):
+                self.buf_rews[env_idx], terminated[env_idx] = game_env.execute_agent_move(self.actions[env_idx])
+                if not terminated[env_idx]:
+                    requests.append((game_env.opponent, game_env.game))
+                    waiting_env_indices.append(env_idx)
+
+        with profiling.attribute(profiling.OPPONENT_LABEL):
+            moves = self.opponent_pool.choose_moves(requests)
+            for env_idx, move in zip(waiting_env_indices, moves):
+                self.buf_rews[env_idx], terminated[env_idx] = game_envs[env_idx].execute_opponent_move(move, self.buf_rews[env_idx])
+
+        with profiling.attribute(profiling.ENVIRONMENT_LABEL):
+            for env_idx, game_env in enumerate(game_envs):
+                obs = game_env.get_obs()
+                self.buf_infos[env_idx] = game_env.get_info()
+                self.buf_dones[env_idx] = terminated[env_idx]
+                self.buf_infos[env_idx]["TimeLimit.truncated"] = False
+                if self.buf_dones[env_idx]:
+                    self.buf_infos[env_idx]["terminal_observation"] = obs
+                    obs, self.reset_infos[env_idx] = self.envs[env_idx].reset()
+                self._save_obs(env_idx, obs)
+
+        return (self._obs_from_buf(), np.copy(self.buf_rews), np.copy(self.buf_dones), [dict(info) for info in self.buf_infos])
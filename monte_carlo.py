@@ -1,8 +1,41 @@
 from monte_carlo_node import MonteCarloNode
+import sys
 import time
 import math
 import random
 import copy
+import threading
+from contextlib import nullcontext
+import symmetry
+import actions
+import rollout
+
+# Progressive widening of the chance nodes: a chance node with n visits may have up to
+# ceil(WIDENING_PARAM * n**WIDENING_EXPONENT) expanded drawn cards.
+WIDENING_PARAM = 1
+WIDENING_EXPONENT = 0.5
+# Equivalence parameter of RAVE: the number of visits (times 3) at which the own win rate of a node
+# and the all-moves-as-first win rate of its move are weighted equally.
+RAVE_EQUIVALENCE = 1000
+# The time limit of a search is checked about this often (in seconds) instead of after every simulation.
+TIME_CHECK_INTERVAL = 0.005
+# Parallel search in a shared tree: the number of threads, the visits without a win that are added to every node
+# on the path of a running simulation (virtual loss), so that the other threads prefer other paths,
+# and the number of locks that protect the statistics of the nodes.
+THREAD_NUM = 8
+VIRTUAL_LOSS = 1
+LOCK_STRIPE_NUM = 64
+NO_LOCK = nullcontext()
+
+
+def is_gil_enabled():
+    """Whether the interpreter runs with the global interpreter lock.
+    Builds before Python 3.13 always have it.
+    
+    return: Whether the GIL is enabled.
+    """
+    is_enabled = getattr(sys, "_is_gil_enabled", None)
+    return True if is_enabled == None else is_enabled()
 
 class MonteCarlo:
     """Class representing the Monte Carlo search tree.
@@ -10,14 +43,65 @@ class MonteCarlo:
     Handles best-move selection.
     """
     
-    def __init__(self, UCB1_param=2**(1/2)):
+    def __init__(self, UCB1_param=2**(1/2), use_symmetry=False, widening_param=WIDENING_PARAM, widening_exponent=WIDENING_EXPONENT,
+                 use_rave=False, rave_equivalence=RAVE_EQUIVALENCE, rollout_policy="random", rollout_depth=None, seed=None,
+                 virtual_loss=VIRTUAL_LOSS):
         """Create a Monte Carlo search tree.
         
         arguments:
         UCB1_Param -- The exploration parameter in the UCB1 algorithm.
+        use_symmetry -- Whether a search from a position continues the tree of a symmetric position
+                        or of the same position reached by another move order (see symmetry.py).
+        widening_param -- The factor of the progressive widening of the chance nodes.
+                          With None, all drawn cards are expanded before a chance node is passed.
+        widening_exponent -- The exponent of the progressive widening of the chance nodes.
+        use_rave -- Whether the moves are selected with RAVE, i.e. with the all-moves-as-first statistics
+                    of the moves in all simulations through a node, including the random playouts.
+        rave_equivalence -- The equivalence parameter of the RAVE schedule (see MonteCarloNode.get_RAVE_UCB1).
+        rollout_policy -- The name of the policy that chooses the moves of the simulations (see rollout.ROLLOUT_POLICIES).
+        rollout_depth -- The maximum number of moves of a simulation, after which the winner is drawn
+                         from the heuristic value of the position (see rollout.sample_winner). None for complete games.
+        seed -- The seed of the random number generator of the tree, which makes the searches reproducible.
+                Only the reshuffling of the played cards in Game.execute_move still uses the generator of NumPy.
+                A search with several threads is not reproducible.
+        virtual_loss -- The virtual loss of the parallel search (see run_parallel_search).
         """
+        self.random = random.Random(seed)
         self.UCB1_param = UCB1_param
+        self.widening_param = widening_param
+        self.widening_exponent = widening_exponent
+        self.use_rave = use_rave
+        self.rave_equivalence = rave_equivalence
+        self.rollout_policy = rollout.ROLLOUT_POLICIES[rollout_policy]
+        self.rollout_depth = rollout_depth
+        self.virtual_loss = virtual_loss
+        # The striped locks of the statistics while several threads search the tree, otherwise None.
+        self.locks = None
         self.nodes = {}
+        self.use_symmetry = use_symmetry
+        # Hash values of the root states of earlier searches by their canonical position key,
+        # together with the symmetry that maps each root state to the canonical position.
+        self.symmetric_roots = {}
+    
+    def find_root(self, state):
+        """Find the state from which the search for the given state is run.
+        Without symmetries it is the given state itself. With symmetries, the root of an earlier search
+        from a symmetric position is reused if the given state has no node yet.
+        
+        arguments:
+        state -- The state to run the search from.
+        
+        return: The root state, the symmetry that maps the moves of the given state to the root state.
+        """
+        if not self.use_symmetry:
+            return state, symmetry.IDENTITY
+        key, transformation = symmetry.canonicalize(state)
+        if state.hash_value not in self.nodes and key in self.symmetric_roots:
+            root_hash_value, root_transformation = self.symmetric_roots[key]
+            if root_hash_value in self.nodes:
+                return self.nodes[root_hash_value].state, symmetry.compose(transformation, symmetry.inverse(root_transformation))
+        self.symmetric_roots[key] = (state.hash_value, transformation)
+        return state, symmetry.IDENTITY
     
     def make_node(self, state):
         """If state does not exist, create dangling node.
@@ -29,37 +113,213 @@ class MonteCarlo:
             state = copy.deepcopy(state)
             unexpanded_moves = state.get_legal_moves(state.player_to_move)
             node = MonteCarloNode(None, None, state, unexpanded_moves)
+            node.proven_value = state.determine_winner()
             self.nodes[state.hash_value] = node
     
-    def run_search(self, state, timeout=1):
-        """From given state, run as many simulations as possible until the time limit, building statistics.
+    def run_search(self, state, timeout=1, control=None, simulation_budget=None, node_budget=None):
+        """From given state, run simulations until the first of the given limits is reached, building statistics.
+        The time is not checked after every simulation, but about every TIME_CHECK_INTERVAL seconds
+        at the current rate of simulations.
         
         arguments:
         state -- The state to run the search from.
-        timeout -- The time to run the simulations for, in seconds.
+        timeout -- The time to run the simulations for, in seconds. None for no time limit.
+        control -- An optional SearchControl to cancel the search and to count the simulations.
+        simulation_budget -- The maximum number of simulations, None for no limit.
+        node_budget -- The maximum number of new nodes in the tree, None for no limit.
 
         return: Search statistics.
         """
+        if timeout == None and simulation_budget == None and node_budget == None:
+            raise ValueError("The search needs a timeout, a simulation budget or a node budget.")
+        state = self.find_root(state)[0]
+        self.make_node(state)
+        
+        root = self.nodes[state.hash_value]
+        start_size = len(self.nodes)
+        start_time = time.perf_counter()
+        end_time = None if timeout == None else start_time + timeout
+        total_sims, draws = self.run_simulations(state, start_time, end_time, control, simulation_budget, start_size, node_budget)
+        
+        if control != None and control.stats != None:
+            control.stats.tree_size = len(self.nodes)
+        return {"runtime": time.perf_counter() - start_time, "simulation": total_sims, "draws": draws, "tree_size": len(self.nodes),
+                "is_proven": root.proven_value != None}
+    
+    def run_parallel_search(self, state, timeout=1, thread_num=THREAD_NUM, control=None, simulation_budget=None, node_budget=None,
+                            allow_gil=False):
+        """Search the tree with several threads at once, e.g. on a Python build without the GIL (3.13t).
+        All threads share the tree: the statistics of the nodes are updated under striped locks,
+        every node on the path of a running simulation gets a virtual loss, and the children are expanded without locks.
+        With the GIL the threads could only take turns, so the search falls back to run_search.
+        
+        arguments:
+        state -- The state to run the search from.
+        timeout -- The time to run the simulations for, in seconds. None for no time limit.
+        thread_num -- The number of threads.
+        control -- An optional SearchControl to cancel the search and to count the simulations.
+        simulation_budget -- The maximum number of simulations of all threads together, None for no limit.
+        node_budget -- The maximum number of new nodes in the tree, None for no limit.
+        allow_gil -- Whether the threads are also used with the GIL, e.g. to test the parallel search.
+        
+        return: Search statistics.
+        """
+        if thread_num <= 1 or (is_gil_enabled() and not allow_gil):
+            return self.run_search(state, timeout, control, simulation_budget, node_budget)
+        if timeout == None and simulation_budget == None and node_budget == None:
+            raise ValueError("The search needs a timeout, a simulation budget or a node budget.")
+        state = self.find_root(state)[0]
         self.make_node(state)
         
+        root = self.nodes[state.hash_value]
+        start_size = len(self.nodes)
+        start_time = time.perf_counter()
+        end_time = None if timeout == None else start_time + timeout
+        # The simulation budget is divided between the threads.
+        budgets = [None] * thread_num
+        if simulation_budget != None:
+            budgets = [simulation_budget // thread_num + (1 if i < simulation_budget % thread_num else 0) for i in range(thread_num)]
+        results = [None] * thread_num
+        
+        def run_thread(index):
+            try:
+                results[index] = self.run_simulations(state, start_time, end_time, control, budgets[index], start_size, node_budget, True)
+            except Exception as exception:
+                results[index] = exception
+        
+        self.locks = [threading.Lock() for _ in range(LOCK_STRIPE_NUM)]
+        try:
+            threads = [threading.Thread(target=run_thread, args=(i,)) for i in range(thread_num)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        finally:
+            self.locks = None
+        # An exception of a thread, e.g. the cancellation of the search, is raised here.
+        for result in results:
+            if isinstance(result, Exception):
+                raise result
+        
+        if control != None and control.stats != None:
+            control.stats.tree_size = len(self.nodes)
+        return {"runtime": time.perf_counter() - start_time, "simulation": sum(result[0] for result in results),
+                "draws": sum(result[1] for result in results), "tree_size": len(self.nodes), "is_proven": root.proven_value != None}
+    
+    def run_simulations(self, state, start_time, end_time, control, simulation_budget, start_size, node_budget, is_parallel=False):
+        """Run simulations until the first limit is reached or the root is proven.
+        
+        arguments:
+        state -- The state of the root.
+        start_time -- The start time of the search (time.perf_counter).
+        end_time -- The time at which the search ends, None for no time limit.
+        control -- An optional SearchControl to cancel the search and to count the simulations.
+        simulation_budget -- The maximum number of simulations, None for no limit.
+        start_size -- The number of nodes in the tree at the start of the search.
+        node_budget -- The maximum number of new nodes in the tree, None for no limit.
+        is_parallel -- Whether other threads search the tree at the same time.
+        
+        return: The number of simulations, the number of draws.
+        """
         draws = 0
         total_sims = 0
-        
-        end_time = time.time() + timeout
-        while time.time() < end_time:
-            node = self.select(state)
-            winner = node.state.determine_winner()
+        root = self.nodes[state.hash_value]
+        next_check_num = 0
+        # Once the result of the root is proven, further simulations cannot change it.
+        while root.proven_value == None:
+            if simulation_budget != None and total_sims >= simulation_budget:
+                break
+            if node_budget != None and len(self.nodes) - start_size >= node_budget:
+                break
+            if end_time != None and total_sims >= next_check_num:
+                now = time.perf_counter()
+                if now >= end_time:
+                    break
+                rate = total_sims / (now - start_time) if now > start_time else 0
+                next_check_num = total_sims + max(1, int(rate * min(TIME_CHECK_INTERVAL, end_time - now)))
             
-            if not node.is_leaf() and winner == None:
-                node = self.expand(node)
-                winner = self.simulate(node)
-            self.backpropagate(node, winner)
+            if control != None:
+                control.count_node()
+            if is_parallel:
+                winner = self.run_parallel_simulation(state)
+            else:
+                winner = self.run_simulation(state, control)
             
             if winner == 0:
                 draws += 1
             total_sims += 1
+        return total_sims, draws
+    
+    def run_simulation(self, state, control=None):
+        """Run one simulation from the given state: selection, expansion, simulation and backpropagation.
         
-        return {"runtime": timeout, "simulation": total_sims, "draws": draws}
+        arguments:
+        state -- The state of the root.
+        control -- An optional SearchControl that measures the time of each phase.
+        
+        return: The winner of the simulation.
+        """
+        # With RAVE, the actions of the playout are collected for the all-moves-as-first statistics.
+        played_actions = set() if self.use_rave else None
+        if control == None:
+            node = self.select(state)
+            winner = self.get_proven_winner(node)
+            if not node.is_leaf() and winner == None:
+                node = self.expand(node)
+                winner = self.get_proven_winner(node)
+                if winner == None:
+                    winner = self.simulate(node, played_actions)
+            self.backpropagate(node, winner, played_actions)
+            return winner
+        
+        with control.timer("selection"):
+            node = self.select(state)
+            winner = self.get_proven_winner(node)
+        if not node.is_leaf() and winner == None:
+            with control.timer("expansion"):
+                node = self.expand(node)
+                winner = self.get_proven_winner(node)
+            if winner == None:
+                with control.timer("simulation"):
+                    winner = self.simulate(node, played_actions)
+        with control.timer("backpropagation"):
+            self.backpropagate(node, winner, played_actions)
+        return winner
+    
+    def run_parallel_simulation(self, state):
+        """Run one simulation in one of several threads that search the tree together.
+        The nodes of the selected path keep a virtual loss until the result is backpropagated.
+        The time of the phases is not measured, because the statistics are not shared between threads.
+        
+        arguments:
+        state -- The state of the root.
+        
+        return: The winner of the simulation.
+        """
+        played_actions = set() if self.use_rave else None
+        path = []
+        node = self.select(state, path)
+        winner = self.get_proven_winner(node)
+        if not node.is_leaf() and winner == None:
+            node = self.expand(node)
+            winner = self.get_proven_winner(node)
+            if winner == None:
+                winner = self.simulate(node, played_actions)
+        self.backpropagate(node, winner, played_actions, path)
+        return winner
+    
+    def get_lock(self, node):
+        """Get the lock of the statistics of a node.
+        
+        arguments:
+        node -- The node.
+        
+        return: One of the striped locks while several threads search the tree, otherwise a context without a lock.
+        """
+        if self.locks == None:
+            return NO_LOCK
+        # Objects are aligned to 16 bytes, so the lowest bits of the address are skipped.
+        return self.locks[id(node) // 16 % LOCK_STRIPE_NUM]
     
     def best_move(self, state, policy="robust child"):
         """From the available statistics, calculate the best move from the given state.
@@ -70,17 +330,41 @@ class MonteCarlo:
         
         return: The best move, according to the given policy.
         """
-        self.make_node(state)
+        return self.best_move_info(state, policy)["move"]
+    
+    def best_move_info(self, state, policy="robust child"):
+        """From the available statistics, calculate the best move from the given state together with the confidence in it.
+        The move is chosen among the expanded moves, so that there is a result at any time of the search.
+        Without any expanded move, a random legal move is returned.
         
-        #If not all children are expanded, not enough information.
-        if not self.nodes[state.hash_value].is_fully_expanded():
-            print(self.get_stats(state))
-            raise Exception("Not enough information!")
+        arguments:
+        state -- The state to get the best move from.
+        policy -- The selection policy for the "best" move.
+        
+        return: The best move and its statistics (dict): the visits of the move and their share of all visits,
+                the win rate with its standard error (None before the first visit of the move),
+                the proven result of the move (see prove) and the number of expanded moves.
+        """
+        state, transformation = self.find_root(state)
+        self.make_node(state)
         
         node = self.nodes[state.hash_value]
-        all_moves = node.all_moves()
+        all_moves = [move for move in node.all_moves() if node.children[str(move)]["node"] != None]
+        if len(all_moves) == 0:
+            move = self.random.choice(node.all_moves())
+            return {"move": symmetry.transform_move(move, symmetry.inverse(transformation)), "move_num": 0, "visit_share": 0,
+                    "win_rate": None, "win_rate_error": None, "proven_value": None, "expanded_num": 0}
         best_move = None
         
+        # Proven wins are preferred and proven losses are avoided, the policy decides between the remaining moves.
+        player = node.state.player_to_move
+        won_moves = [move for move in all_moves if node.child_node(move).proven_value == player]
+        not_lost_moves = [move for move in all_moves if node.child_node(move).proven_value != -player]
+        if len(won_moves) > 0:
+            all_moves = won_moves
+        elif len(not_lost_moves) > 0:
+            all_moves = not_lost_moves
+        
         # Most visits (robust child)
         if policy == "robust child":
             max_value = -math.inf
@@ -95,42 +379,107 @@ class MonteCarlo:
             max_value = -math.inf
             for move in all_moves:
                 child_node = node.child_node(move)
+                # A child that was expanded, but not visited yet, e.g. after a small budget, has no win rate.
+                if child_node.move_num <= 0:
+                    continue
                 ratio = child_node.win_num / child_node.move_num
                 if ratio > max_value:
                     best_move = move
                     max_value = ratio
         
-        return best_move
+        if best_move == None:
+            best_move = all_moves[0]
+        
+        child_node = node.child_node(best_move)
+        win_rate = None
+        win_rate_error = None
+        if child_node.move_num > 0:
+            win_rate = child_node.win_num / child_node.move_num
+            win_rate_error = (win_rate * (1 - win_rate) / child_node.move_num)**(1/2)
+        return {"move": symmetry.transform_move(best_move, symmetry.inverse(transformation)), "move_num": child_node.move_num,
+                "visit_share": child_node.move_num / node.move_num if node.move_num > 0 else 0, "win_rate": win_rate,
+                "win_rate_error": win_rate_error, "proven_value": child_node.proven_value, "expanded_num": node.expanded_num()}
     
-    def select(self, state):
+    def select(self, state, path=None):
         """Phase 1: Selection
-        Select until either not fully expanded or leaf node
+        Select until either not fully expanded, leaf node or proven node.
+        Children that are proven losses for the player to move are skipped.
         
         arguments:
         state -- The root state to start selection from.
+        path -- In a parallel search, the list to which the selected nodes are added. Each of them gets a virtual loss.
         
         return: The selected node.
         """
         node = self.nodes[state.hash_value]
-        while node.is_fully_expanded() and not node.is_leaf():
-            moves = node.all_moves()
+        if path != None:
+            self.add_virtual_loss(node, path)
+        while not node.is_leaf() and node.proven_value == None:
             if node.is_chance_node:
+                if not node.is_fully_expanded() and self.can_widen(node):
+                    break
                 # No explicit selection, because a random element cannot be influenced.
-                random_move = random.choice(moves)
-                node = node.child_node(random_move)
+                # A card is drawn among the expanded ones.
+                node = node.child_node(node.sample_outcome(True, self.random))
             else:
+                if not node.is_fully_expanded():
+                    break
+                moves = node.all_moves()
                 best_move = None
                 best_UCB1 = -math.inf
                 for move in moves:
-                    child_UCB1 = node.child_node(move).get_UCB1(self.UCB1_param)
+                    if node.child_node(move).proven_value == -node.state.player_to_move:
+                        continue
+                    if self.use_rave:
+                        child_UCB1 = node.child_node(move).get_RAVE_UCB1(self.UCB1_param, self.rave_equivalence)
+                    else:
+                        child_UCB1 = node.child_node(move).get_UCB1(self.UCB1_param)
                     if child_UCB1 > best_UCB1:
                         best_move = move
                         best_UCB1 = child_UCB1
-            
+                # In a parallel search, another thread may have proven the last child a loss
+                # before it proves the node itself. Then the node is proven here and the selection stops at it.
+                if best_move == None:
+                    self.prove(node)
+                    break
+
                 node = node.child_node(best_move)
             
+            if path != None:
+                self.add_virtual_loss(node, path)
+            
         return node
     
+    def add_virtual_loss(self, node, path):
+        """Add a virtual loss to a node of the selected path of a parallel search.
+        
+        arguments:
+        node -- The selected node.
+        path -- The selected nodes, to which the node is added.
+        """
+        with self.get_lock(node):
+            node.move_num += self.virtual_loss
+        path.append(node)
+    
+    def can_widen(self, node):
+        """Whether another drawn card may be expanded at a chance node (progressive widening).
+        The cards cannot be grouped into fewer outcomes, because every card of the stack is unique
+        and the drawn card stays in the hand of the drawer for the rest of the game.
+        Once all expanded cards are proven, the simulations through them cannot teach anything new,
+        so the next card is expanded regardless of the limit and the chance node can be proven eventually.
+        
+        arguments:
+        node -- The chance node.
+        
+        return: Whether the number of expanded cards is below the limit for the visits of the node
+                or all expanded cards are proven.
+        """
+        if self.widening_param == None:
+            return True
+        if node.expanded_num() < math.ceil(self.widening_param * max(node.move_num, 1)**self.widening_exponent):
+            return True
+        return all(child["node"] == None or child["node"].proven_value != None for child in node.children.values())
+    
     def expand(self, node):
         """Phase 2: Expansion
         Of the given node, expand a random unexpanded child node
@@ -140,23 +489,35 @@ class MonteCarlo:
         
         return: The new expanded child node.
         """
-        moves = node.unexpanded_moves()
-        move = random.choice(moves)
+        # In a parallel search, other threads may have expanded the last children since the selection.
+        # Then the simulation continues from the node itself.
+        if node.is_chance_node:
+            move = node.sample_outcome(False, self.random)
+            if move == None:
+                return node
+        else:
+            moves = node.unexpanded_moves()
+            if len(moves) == 0:
+                return node
+            move = self.random.choice(moves)
         
         child_state = copy.deepcopy(node.state)
         if node.is_chance_node:
             child_state.execute_move(node.move, child_state.player_to_move, move)
             child_unexpanded_moves = child_state.get_legal_moves(child_state.player_to_move)
             child_node = node.expand(move, child_state, child_unexpanded_moves)
+            child_node.proven_value = child_state.determine_winner()
             self.nodes[child_state.hash_value] = child_node
         
         elif move == None or not move[0]:
             child_state.execute_move(move, child_state.player_to_move)
             child_unexpanded_moves = child_state.get_legal_moves(child_state.player_to_move)
             child_node = node.expand(move, child_state, child_unexpanded_moves)
+            child_node.proven_value = child_state.determine_winner()
             self.nodes[child_state.hash_value] = child_node
         
         else: # Draw a direction card and create chance node.
+            # The outcomes of the chance node are the indices of the cards in the stack.
             child_unexpanded_moves = list(range(len(child_state.drawable_power_cards)))
             child_node = node.expand(move, child_state, child_unexpanded_moves, True)
             # Add str(move) because here is no execute_move to update the hash-value.
@@ -164,12 +525,14 @@ class MonteCarlo:
             
         return child_node
     
-    def simulate(self, node):
+    def simulate(self, node, played_actions=None):
         """Phase 3: Simulation
-        From given node, play the game until a terminal state, then return winner
+        From given node, play the game with the rollout policy until a terminal state, then return winner.
+        A truncated rollout is scored with the heuristic value of its last position.
         
         arguments:
         node -- The node to simulate from.
+        played_actions -- An optional set to which the played moves are added as tuples of the player and the action index.
         
         return: The winner of the terminal game state (0 for draw).
         """
@@ -177,32 +540,114 @@ class MonteCarlo:
         winner = new_state.determine_winner()
         if node.is_chance_node:
             moves = list(range(len(new_state.drawable_power_cards)))
-            move = random.choice(moves)
+            move = self.random.choice(moves)
             new_state.execute_move(node.move, new_state.player_to_move, move)
             winner = new_state.determine_winner()
+        ply_num = 0
         while winner == None:
+            if ply_num == self.rollout_depth:
+                return rollout.sample_winner(new_state, self.random)
+            ply_num += 1
             moves = new_state.get_legal_moves(new_state.player_to_move)
-            move = random.choice(moves)
-            new_state.execute_move(move, new_state.player_to_move)
+            move = self.rollout_policy(new_state, moves, self.random)
+            if played_actions != None:
+                played_actions.add((new_state.player_to_move, actions.get_action_from_move(move)))
+            # The drawn card is chosen here, so that it depends on the generator of the tree.
+            power_card_index = None
+            if move != None and move[0]:
+                power_card_index = self.random.randrange(len(new_state.drawable_power_cards))
+            new_state.execute_move(move, new_state.player_to_move, power_card_index)
             winner = new_state.determine_winner()
         
         return winner
     
-    def backpropagate(self, node, winner):
+    def backpropagate(self, node, winner, played_actions=None, path=None):
         """Phase 4: Backpropagation
         From given node, propagate plays and winner to ancestors' statistics
         
         arguments:
         node - The node to backpropagate from. Typically leaf.
         winner - The winner to propagate. A draw is ignored.
+        played_actions - With RAVE, the actions of the playout (see simulate). The moves of the path are added on the way up,
+                         so that every node gets the actions that were played below it.
+        path -- In a parallel search, the selected nodes whose virtual loss is removed (see select).
         """
+        virtual_nodes = set(path) if path != None else ()
+        # The proofs are continued upwards as long as the nodes can be proven.
+        is_proving = True
         while node != None:
-            node.move_num += 1
-            if node.state.player_to_move == -winner:
-                node.win_num += 1
+            with self.get_lock(node):
+                if node in virtual_nodes:
+                    node.move_num -= self.virtual_loss
+                node.move_num += 1
+                if node.state.player_to_move == -winner:
+                    node.win_num += 1
+                elif winner == 0:
+                    node.draw_num += 1
+                # The outcomes of a chance node are no actions of a player.
+                if played_actions != None and not node.is_chance_node:
+                    node.update_amaf(played_actions, winner)
+            if is_proving:
+                is_proving = self.prove(node)
+            if played_actions != None:
+                if node.parent != None and not node.parent.is_chance_node:
+                    played_actions.add((node.parent.state.player_to_move, actions.get_action_from_move(node.move)))
             
             node = node.parent
     
+    def prove(self, node):
+        """Try to determine the exact result of a node from its children (MCTS-Solver).
+        A node is a proven win for the player to move as soon as one child is a proven win for this player,
+        otherwise it is proven when all children are proven. A chance node is proven with the average of its outcomes
+        when all outcomes are proven, because each of them is one card of the stack.
+        
+        arguments:
+        node -- The node.
+        
+        return: Whether the result of the node is proven.
+        """
+        if node.proven_value != None:
+            return True
+        
+        if node.is_chance_node:
+            value_sum = 0
+            for child in node.children.values():
+                if child["node"] == None or child["node"].proven_value == None:
+                    return False
+                value_sum += child["node"].proven_value
+            node.proven_value = value_sum / len(node.children)
+            return True
+        
+        player = node.state.player_to_move
+        best_value = -math.inf
+        for child in node.children.values():
+            value = None if child["node"] == None else child["node"].proven_value
+            if value == None:
+                best_value = None
+            elif value == player:
+                node.proven_value = player
+                return True
+            elif best_value != None:
+                best_value = max(best_value, value * player)
+        if best_value == None:
+            return False
+        node.proven_value = best_value * player
+        return True
+    
+    def get_proven_winner(self, node):
+        """Get the winner of a simulation that reaches a proven node.
+        For the average result of a chance node, the winner is drawn so that its expected value is the result.
+        
+        arguments:
+        node -- The node.
+        
+        return: The winner, None if the node is not proven.
+        """
+        value = node.proven_value
+        if value == None or value in [-1, 0, 1]:
+            return value
+        return 1 if self.random.random() < (1 + value) / 2 else -1
+    
     def get_stats(self, state):
         """Return MCTS statistics for this node and children nodes.
         
@@ -211,12 +656,14 @@ class MonteCarlo:
         
         return: The MCTS statistics.
         """
+        state = self.find_root(state)[0]
         node = self.nodes[state.hash_value]
-        stats = {"move_num": node.move_num, "win_num": node.win_num, "children": []}
+        stats = {"move_num": node.move_num, "win_num": node.win_num, "proven_value": node.proven_value, "children": []}
         for child in node.children.values():
             if child["node"] == None:
                 stats["children"].append({"move": child["move"], "move_num": None, "win_num": None})
             else:
-                stats["children"].append({"move": child["move"], "move_num": child["node"].move_num, "win_num": child["node"].win_num})
+                stats["children"].append({"move": child["move"], "move_num": child["node"].move_num, "win_num": child["node"].win_num,
+                                          "proven_value": child["node"].proven_value})
         
         return stats
@@ -1,4 +1,6 @@
 import math
+import numpy as np
+import actions
 
 class MonteCarloNode:
     """Class representing a node in the search tree.
@@ -12,7 +14,7 @@ class MonteCarloNode:
         parent -- The parent node.
         move -- Last move played to get to this state.
         state -- The corresponding state.
-        unexpanded_moves -- The node's unexpanded child moves.
+        unexpanded_moves -- The node's unexpanded child moves. For a chance node these are the indices of the drawable cards.
         is_chance_node -- Indicates whether a random element is to be considered at the node.
         """
         self.move = move
@@ -20,6 +22,7 @@ class MonteCarloNode:
         
         self.move_num = 0
         self.win_num = 0
+        self.draw_num = 0
         
         self.parent = parent
         self.children = {}
@@ -27,6 +30,14 @@ class MonteCarloNode:
             self.children[str(move)] = {"move": move, "node": None}
             
         self.is_chance_node = is_chance_node
+        
+        # The exact result of the node (MCTS-Solver): the winner of a finished game or of a proven subtree,
+        # the expected winner for a chance node. None as long as the result is unknown.
+        self.proven_value = None
+        
+        # All-moves-as-first statistics by action index (see actions.py), only used with RAVE.
+        self.amaf_move_nums = None
+        self.amaf_win_nums = None
     
     def child_node(self, move):
         """Get the MonteCarloNode corresponding to the given play.
@@ -60,9 +71,35 @@ class MonteCarloNode:
         if str(move) not in self.children:
             raise Exception("No such move!")
         child_node = MonteCarloNode(self, move, child_state, unexpanded_moves, is_chance_node)
-        self.children[str(move)] = {"move": move, "node": child_node}
+        child = self.children[str(move)]
+        # When several threads expand the same move at the same time (see MonteCarlo.run_parallel_search),
+        # the atomic setdefault keeps the node of the first one and all of them continue with it.
+        child_node = child.setdefault("first_node", child_node)
+        child["node"] = child_node
         return child_node
     
+    def sample_outcome(self, is_expanded, rng):
+        """Draw a random card at a chance node among the cards that are expanded or among those that are not.
+        
+        arguments:
+        is_expanded -- Whether the card is drawn from the expanded cards or from the unexpanded ones.
+        rng -- The random number generator of the tree.
+        
+        return: The index of the card in the stack.
+                None if there is no such card, e.g. because other threads have expanded all of them.
+        """
+        outcomes = [child["move"] for child in self.children.values() if (child["node"] != None) == is_expanded]
+        if len(outcomes) == 0:
+            return None
+        return rng.choice(outcomes)
+    
+    def expanded_num(self):
+        """Get the number of expanded children.
+        
+        return: The number of expanded children.
+        """
+        return sum(child["node"] != None for child in self.children.values())
+    
     def all_moves(self):
         """Get all legal moves from this node.
         
@@ -103,6 +140,37 @@ class MonteCarloNode:
             return True
         return False
     
+    def update_amaf(self, played_actions, winner):
+        """Add a simulation to the all-moves-as-first statistics of the actions
+        that the player to move at this node played later in the simulation.
+        
+        arguments:
+        played_actions -- The actions played below this node (set of tuples of the player and the action index).
+        winner -- The winner of the simulation.
+        """
+        if self.amaf_move_nums is None:
+            self.amaf_move_nums = np.zeros(actions.ACTION_NUM)
+            self.amaf_win_nums = np.zeros(actions.ACTION_NUM)
+        player = self.state.player_to_move
+        for action_player, action in played_actions:
+            if action_player == player:
+                self.amaf_move_nums[action] += 1
+                if winner == player:
+                    self.amaf_win_nums[action] += 1
+    
+    def get_amaf(self, move):
+        """Get the all-moves-as-first statistics of a move of the player to move at this node.
+        
+        arguments:
+        move -- The move.
+        
+        return: The number of simulations in which the move was played, the number of them that were won.
+        """
+        if self.amaf_move_nums is None:
+            return 0, 0
+        action = actions.get_action_from_move(move)
+        return self.amaf_move_nums[action], self.amaf_win_nums[action]
+    
     def get_UCB1(self, param):
         """Get the UCB1 value for this node.
         
@@ -111,6 +179,31 @@ class MonteCarloNode:
         
         return: The UCB1 value of this node.
         """
+        # A node that another thread has just expanded, or its parent before the first visit.
+        if self.move_num <= 0 or self.parent.move_num <= 0:
+            return math.inf
+        exploitation_value = self.win_num / self.move_num
+        exploration_value = param * (math.log(self.parent.move_num) / self.move_num)**(1/2)
+        return exploitation_value + exploration_value
+    
+    def get_RAVE_UCB1(self, param, equivalence):
+        """Get the UCB1 value for this node, with the win rate blended with the all-moves-as-first win rate
+        of its move at the parent node (RAVE). The weight of the AMAF win rate is sqrt(k / (3n + k))
+        for n visits of this node, it falls to 1/2 at n = k/3 visits.
+        
+        arguments:
+        param -- The exploration parameter in the UCB1 algorithm.
+        equivalence -- The equivalence parameter k of the schedule.
+        
+        return: The UCB1 value of this node.
+        """
+        # A node that another thread has just expanded, or its parent before the first visit.
+        if self.move_num <= 0 or self.parent.move_num <= 0:
+            return math.inf
         exploitation_value = self.win_num / self.move_num
+        amaf_move_num, amaf_win_num = self.parent.get_amaf(self.move)
+        if amaf_move_num > 0:
+            beta = (equivalence / (3*self.move_num + equivalence))**(1/2)
+            exploitation_value = (1-beta) * exploitation_value + beta * amaf_win_num / amaf_move_num
         exploration_value = param * (math.log(self.parent.move_num) / self.move_num)**(1/2)
-        return exploitation_value + exploration_value
\ No newline at end of file
+        return exploitation_value + exploration_value
@@ -0,0 +1,284 @@
+import os
+import json
+import math
+import copy
+import random
+import hashlib
+from multiprocessing import Pool
+import numpy as np
+from tqdm import tqdm
+from game import Game
+import players
+import actions
+import symmetry
+
+BOOK_PATH = "books/opening_book.npz"
+DEAL_NUM = 100
+PLY_NUM = 2
+PROCESS_NUM = os.cpu_count()
+
+# Loaded books by their path.
+book_cache = {}
+# The data of each process is kept here.
+worker = {}
+
+
+def hash_key(key):
+    """Compress a position key into a 64-bit number for the index of the book.
+
+    arguments:
+    key -- The position key (bytes).
+
+    return: The hashed key.
+    """
+    return int.from_bytes(hashlib.blake2b(key, digest_size=8).digest(), "little")
+
+def load_book(path):
+    """Load an opening book. Each book is only loaded once per process.
+
+    arguments:
+    path -- The path of the book.
+
+    return: The book, None if the file does not exist.
+    """
+    if path not in book_cache:
+        book_cache[path] = OpeningBook.load(path) if os.path.exists(path) else None
+    return book_cache[path]
+
+
+class OpeningBook:
+    """Class for a book of precalculated moves for the first plies.
+    The positions are stored canonicalized by the board symmetries (see symmetry.py),
+    as sorted 64-bit hashes with the action, the value and the search depth of the best move.
+    A position includes the cards of both hands and of the stack, so positions of different deals never coincide,
+    and a book only serves the seeded deals it was built for, e.g. to speed up benchmarks with arena.play_games.
+    Games with random deals, like those of the GUI, never find their positions in it.
+    """
+
+    def __init__(self, spec, keys=None, actions=None, values=None, depths=None, piece_nums=None):
+        """Create a book.
+
+        arguments:
+        spec -- The specification of the search player that calculated the moves (dict).
+        keys -- The hashed canonical position keys (sorted).
+        actions -- The actions of the best moves in the canonical positions.
+        values -- The values of the best moves for the player to move.
+        depths -- The search depths.
+        piece_nums -- The number of pieces on the board in each position.
+        """
+        self.spec = spec
+        self.keys = np.zeros(0, dtype=np.uint64) if keys is None else keys
+        self.actions = np.zeros(0, dtype=np.uint8) if actions is None else actions
+        self.values = np.zeros(0, dtype=np.float32) if values is None else values
+        self.depths = np.zeros(0, dtype=np.uint8) if depths is None else depths
+        self.piece_nums = np.zeros(0, dtype=np.uint8) if piece_nums is None else piece_nums
+        self.max_piece_num = int(self.piece_nums.max()) if len(self.piece_nums) > 0 else -1
+
+    @classmethod
+    def load(cls, path):
+        """Load a book from a file.
+
+        arguments:
+        path -- The path of the book.
+
+        return: The book.
+        """
+        with np.load(path) as data:
+            return cls(json.loads(str(data["spec"])), data["keys"], data["actions"], data["values"], data["depths"], data["piece_nums"])
+
+    def save(self, path):
+        """Save the book into a compressed file.
+
+        arguments:
+        path -- The path of the book.
+        """
+        directory = os.path.dirname(path)
+        if directory != "":
+            os.makedirs(directory, exist_ok=True)
+        np.savez_compressed(path, spec=json.dumps(self.spec, sort_keys=True), keys=self.keys, actions=self.actions,
+                            values=self.values, depths=self.depths, piece_nums=self.piece_nums)
+
+    def __len__(self):
+        return len(self.keys)
+
+    def find(self, hashed_key):
+        """Find the index of a position in the book.
+
+        arguments:
+        hashed_key -- The hashed canonical position key.
+
+        return: The index, None if the position is not in the book.
+        """
+        index = np.searchsorted(self.keys, np.uint64(hashed_key))
+        if index < len(self.keys) and self.keys[index] == hashed_key:
+            return index
+        return None
+
+    def lookup(self, state, mode, depth, hero_card_discount):
+        """Look up the best move for the player to move.
+        Only moves of the same search algorithm with at least the requested depth are returned.
+
+        arguments:
+        state -- The current game state.
+        mode -- The search algorithm of the player ("minimax", "alphabeta" or "expectiminimax").
+        depth -- The search depth of the player.
+        hero_card_discount -- The value that is added to the points per hero card.
+
+        return: The move and its value, None if the position is not in the book.
+        """
+        if mode != self.spec["mode"] or hero_card_discount != self.spec["hero_card_discount"]:
+            return None
+        # Later positions can be excluded without canonicalizing the state.
+        if Game.PIECES_NUM - state.playable_pieces_num > self.max_piece_num:
+            return None
+
+        key, transformation = symmetry.canonicalize(state)
+        index = self.find(hash_key(key))
+        if index == None or self.depths[index] < depth:
+            return None
+        move = symmetry.from_canonical_move(actions.get_move_from_action(int(self.actions[index])), transformation)
+        # Protection against hash collisions.
+        if str(move) not in map(str, state.get_legal_moves(state.player_to_move)):
+            return None
+        return move, float(self.values[index])
+
+    def add_entries(self, entries):
+        """Add calculated positions to the book. Existing positions are replaced.
+
+        arguments:
+        entries -- A list of tuples (hashed key, action, value, depth, number of pieces).
+        """
+        if len(entries) == 0:
+            return
+        new_keys = np.array([entry[0] for entry in entries], dtype=np.uint64)
+        is_old = ~np.isin(self.keys, new_keys)
+        keys = np.concatenate((self.keys[is_old], new_keys))
+        order = np.argsort(keys, kind="stable")
+        self.keys = keys[order]
+        self.actions = np.concatenate((self.actions[is_old], np.array([entry[1] for entry in entries], dtype=np.uint8)))[order]
+        self.values = np.concatenate((self.values[is_old], np.array([entry[2] for entry in entries], dtype=np.float32)))[order]
+        self.depths = np.concatenate((self.depths[is_old], np.array([entry[3] for entry in entries], dtype=np.uint8)))[order]
+        self.piece_nums = np.concatenate((self.piece_nums[is_old], np.array([entry[4] for entry in entries], dtype=np.uint8)))[order]
+        self.max_piece_num = int(self.piece_nums.max())
+
+
+def deal(seed):
+    """Create the starting position of a game with the given seed, as arena.play_game does.
+
+    arguments:
+    seed -- The seed of the game.
+
+    return: The game state.
+    """
+    random.seed(seed)
+    np.random.seed(seed)
+    return Game()
+
+def collect_positions(start_states, ply_num):
+    """Collect all positions within the first plies after the given starting positions.
+    Both players can start. Drawing a card leads to a random card, so these positions are not expanded.
+    Symmetric positions and positions with only one legal move are left out.
+
+    arguments:
+    start_states -- The starting positions.
+    ply_num -- The number of plies to expand.
+
+    return: The canonical game states.
+    """
+    positions = {}
+    for start_state in start_states:
+        states = []
+        for starting_player in [-1, 1]:
+            state = copy.deepcopy(start_state)
+            state.player_to_move = starting_player
+            states.append(state)
+
+        for ply in range(ply_num + 1):
+            next_states = []
+            for state in states:
+                moves = state.get_legal_moves(state.player_to_move)
+                if len(moves) > 1:
+                    canonical_state, transformation = symmetry.canonical_state(state)
+                    positions.setdefault(canonical_state.position_key(), canonical_state)
+                if ply == ply_num:
+                    continue
+                for move in moves:
+                    if move == None or move[0]:
+                        continue
+                    child_state = copy.deepcopy(state)
+                    child_state.execute_move(move, state.player_to_move)
+                    next_states.append(child_state)
+            states = next_states
+    return list(positions.values())
+
+
+def init_worker(spec):
+    """Initialise a worker process of the book builder.
+
+    arguments:
+    spec -- The specification of the search player (dict).
+    """
+    worker["spec"] = spec
+
+def search_position(state):
+    """Calculate the best move and its value in a canonical position.
+
+    arguments:
+    state -- The canonical game state.
+
+    return: The book entry (hashed key, action, value, depth, number of pieces).
+    """
+    spec = worker["spec"]
+    player = state.player_to_move
+    if spec["mode"] == "minimax":
+        value, move = players.minimax(state, spec["depth"], player, spec["hero_card_discount"])
+    elif spec["mode"] == "alphabeta":
+        value, move = players.alphabeta(state, spec["depth"], -math.inf, math.inf, player, spec["hero_card_discount"])
+    else:
+        value, move = players.expectiminimax(state, spec["depth"], -math.inf, math.inf, player, spec["hero_card_discount"])
+    return (hash_key(state.position_key()), actions.get_action_from_move(move), value, spec["depth"], Game.PIECES_NUM - state.playable_pieces_num)
+
+def build_book(seeds, spec, path=BOOK_PATH, ply_num=PLY_NUM, process_num=PROCESS_NUM):
+    """Calculate the book moves for the first plies of the games with the given seeds in parallel.
+    The number of possible deals is far too large to cover all of them, so the book only contains the deals
+    of seeded matches (e.g. arena.play_games with the same seeds). An existing book is extended,
+    positions that are already calculated with the same depth are skipped.
+
+    arguments:
+    seeds -- The seeds of the games.
+    spec -- The specification of the search player (dict) with the mode ("minimax", "alphabeta" or "expectiminimax"),
+            the depth and the hero card discount.
+    path -- The path of the book.
+    ply_num -- The number of plies after the deal that are covered.
+    process_num -- The number of worker processes.
+
+    return: The book.
+    """
+    spec = {"mode": spec["mode"], "depth": spec["depth"], "hero_card_discount": spec["hero_card_discount"]}
+    book = OpeningBook(spec)
+    if os.path.exists(path):
+        book = OpeningBook.load(path)
+        if book.spec["mode"] != spec["mode"] or book.spec["hero_card_discount"] != spec["hero_card_discount"]:
+            raise ValueError(f"The book {path} was calculated by another search player: {book.spec}")
+        book.spec["depth"] = spec["depth"]
+
+    positions = []
+    for state in collect_positions([deal(seed) for seed in seeds], ply_num):
+        index = book.find(hash_key(state.position_key()))
+        if index == None or book.depths[index] < spec["depth"]:
+            positions.append(state)
+
+    entries = []
+    with Pool(process_num, initializer=init_worker, initargs=(spec,)) as pool:
+        for entry in tqdm(pool.imap_unordered(search_position, positions), total=len(positions), desc="Build Book"):
+            entries.append(entry)
+    book.add_entries(entries)
+    book.save(path)
+    book_cache.pop(path, None)
+    return book
+
+
+if __name__ == "__main__":
+    # The deals of arena.play_games with seed=0.
+    book = build_book(range(DEAL_NUM), {"mode": "alphabeta", "depth": 7, "hero_card_discount": 30})
+    print(f"Positions in the book: {len(book)}")
@@ -0,0 +1,189 @@
+import os
+import copy
+import time
+import random
+from multiprocessing import Pool
+import numpy as np
+from tqdm import tqdm
+from game import Game
+import actions
+import state_codec
+import symmetry
+
+SEED_NUM = 32
+DEPTH = 3
+PROCESS_NUM = os.cpu_count()
+# The positions are taken after a random number of random moves up to this number.
+MAX_PLY_NUM = 120
+
+# The engines are functions that convert a position of the reference Game into the engine's own state.
+# The states must offer the methods of Game that are used by perft.
+ENGINES = {
+    "reference": copy.deepcopy,
+    "state_codec": lambda state: state_codec.decode(state_codec.encode(state)),
+    "symmetry": lambda state: symmetry.transform_state(state, 1),
+}
+
+COUNT_NAMES = ["nodes", "leaves", "terminals", "terminal_score", "leaf_score", "chance_nodes", "draws",
+               "reshuffles", "hero_moves", "sit_outs"]
+
+
+def create_position(seed):
+    """Create a reproducible position by playing a random number of random moves.
+
+    arguments:
+    seed -- The seed of the position.
+
+    return: The game state.
+    """
+    rng = random.Random(seed)
+    np.random.seed(seed)
+    state = Game()
+    state.player_to_move = rng.choice([-1, 1])
+    for _ in range(rng.randrange(MAX_PLY_NUM)):
+        if state.is_game_over():
+            break
+        state.execute_move(rng.choice(state.get_legal_moves(state.player_to_move)), state.player_to_move)
+    return state
+
+def perft(state, depth, counts=None):
+    """Count the positions of the game tree up to the given depth.
+    Drawing a card is a chance node that is expanded over every card in the stack.
+    Besides the number of nodes, the tree is summarised by the number of special moves,
+    the sum of the winners of all finished games and the sum of the heuristic values of all leaves,
+    so that differences in the rules or in the evaluation are noticed as well.
+
+    arguments:
+    state -- The game state.
+    depth -- The number of moves to search.
+    counts -- The counts to which the tree is added.
+
+    return: The counts (dict).
+    """
+    if counts == None:
+        counts = {name: 0 for name in COUNT_NAMES}
+    counts["nodes"] += 1
+
+    winner = state.determine_winner()
+    if winner != None:
+        counts["leaves"] += 1
+        counts["terminals"] += 1
+        counts["terminal_score"] += winner
+        return counts
+    if depth == 0:
+        counts["leaves"] += 1
+        counts["leaf_score"] += float(state.calc_heuristic(Game.HERO_CARD_DISCOUNT, 1))
+        return counts
+
+    player = state.player_to_move
+    for move in state.get_legal_moves(player):
+        if move == None:
+            counts["sit_outs"] += 1
+        elif move[0]:
+            counts["chance_nodes"] += 1
+            drawable_power_cards_num = len(state.drawable_power_cards)
+            for i in range(drawable_power_cards_num):
+                counts["draws"] += 1
+                new_state = copy.deepcopy(state)
+                new_state.execute_move(move, player, i)
+                # The played cards are shuffled into the stack when its last card is drawn.
+                if len(new_state.drawable_power_cards) != drawable_power_cards_num - 1:
+                    counts["reshuffles"] += 1
+                perft(new_state, depth-1, counts)
+            continue
+        elif move[1]:
+            counts["hero_moves"] += 1
+        new_state = copy.deepcopy(state)
+        new_state.execute_move(move, player)
+        perft(new_state, depth-1, counts)
+    return counts
+
+def divide(state, depth):
+    """Count the positions below each move of a position separately, to find the move at which two engines differ.
+
+    arguments:
+    state -- The game state.
+    depth -- The number of moves to search, including the first move.
+
+    return: The counts by action index of the first move (dict).
+    """
+    player = state.player_to_move
+    results = {}
+    for move in state.get_legal_moves(player):
+        counts = {name: 0 for name in COUNT_NAMES}
+        if move != None and move[0]:
+            for i in range(len(state.drawable_power_cards)):
+                new_state = copy.deepcopy(state)
+                new_state.execute_move(move, player, i)
+                perft(new_state, depth-1, counts)
+        else:
+            new_state = copy.deepcopy(state)
+            new_state.execute_move(move, player)
+            perft(new_state, depth-1, counts)
+        results[actions.get_action_from_move(move)] = counts
+    return results
+
+def run_perft(task):
+    """Run perft for one position and one engine in a worker process.
+
+    arguments:
+    task -- The seed of the position, the name of the engine and the depth.
+
+    return: The seed, the name of the engine, the counts and the elapsed time.
+    """
+    seed, engine_name, depth = task
+    state = ENGINES[engine_name](create_position(seed))
+    start_time = time.perf_counter()
+    counts = perft(state, depth)
+    return seed, engine_name, counts, time.perf_counter() - start_time
+
+def compare_engines(seeds, depth=DEPTH, engine_names=None, process_num=PROCESS_NUM):
+    """Run perft for all engines on the positions of the given seeds in parallel and compare the counts with the reference.
+
+    arguments:
+    seeds -- The seeds of the positions.
+    depth -- The number of moves to search.
+    engine_names -- The names of the engines in ENGINES, by default all of them.
+    process_num -- The number of worker processes.
+
+    return: The differences to the reference (list of dicts with the seed, the engine and both counts),
+            the nodes per second of each engine (dict).
+    """
+    engine_names = list(ENGINES) if engine_names == None else engine_names
+    if "reference" not in engine_names:
+        engine_names = ["reference"] + engine_names
+    tasks = [(seed, engine_name, depth) for seed in seeds for engine_name in engine_names]
+
+    counts = {}
+    node_nums = {engine_name: 0 for engine_name in engine_names}
+    elapsed_times = {engine_name: 0 for engine_name in engine_names}
+    with Pool(process_num) as pool:
+        for seed, engine_name, engine_counts, elapsed_time in tqdm(pool.imap_unordered(run_perft, tasks), total=len(tasks), desc="Perft"):
+            counts[seed, engine_name] = engine_counts
+            node_nums[engine_name] += engine_counts["nodes"]
+            elapsed_times[engine_name] += elapsed_time
+
+    differences = []
+    for seed in seeds:
+        reference_counts = counts[seed, "reference"]
+        for engine_name in engine_names:
+            engine_counts = counts[seed, engine_name]
+            # The heuristic values are summed in floating point, so they may differ in the last digits.
+            is_equal = all(np.isclose(engine_counts[name], reference_counts[name]) if name == "leaf_score"
+                           else engine_counts[name] == reference_counts[name] for name in COUNT_NAMES)
+            if not is_equal:
+                differences.append({"seed": seed, "engine": engine_name, "reference": reference_counts, "counts": engine_counts})
+    nodes_per_second = {engine_name: node_nums[engine_name] / elapsed_times[engine_name] for engine_name in engine_names}
+    return differences, nodes_per_second
+
+
+if __name__ == "__main__":
+    differences, nodes_per_second = compare_engines(range(SEED_NUM))
+    for engine_name, rate in nodes_per_second.items():
+        print(f"{engine_name}: {rate:.0f} nodes/s")
+    for difference in differences:
+        print(f"Seed {difference['seed']}, engine {difference['engine']}:")
+        for name in COUNT_NAMES:
+            if difference["counts"][name] != difference["reference"][name]:
+                print(f"    {name}: {difference['counts'][name]} instead of {difference['reference'][name]}")
+    print(f"Positions with differences: {len(differences)}")
@@ -0,0 +1,379 @@
+import math
+import json
+from collections import OrderedDict
+from sb3_contrib.ppo_mask import MaskablePPO
+import players
+import monte_carlo
+from monte_carlo import MonteCarlo
+import game_env
+import ponder
+import opening_book
+import endgame
+import evaluation
+
+MODEL_CACHE_SIZE = 8
+PLAYER_CACHE_SIZE = 8
+
+# All available player types by their mode.
+PLAYER_TYPES = {}
+# Loaded RL models by their path, the least recently used model is removed first.
+model_cache = OrderedDict()
+# Created players by their side and specification, so that models and caches are reused across games.
+# The least recently used player is removed first.
+player_cache = OrderedDict()
+
+
+def register_player(player_class):
+    """Register a player type, so that it can be created from a specification.
+    Can be used as a class decorator.
+
+    arguments:
+    player_class -- The class of the player type.
+
+    return: The class of the player type.
+    """
+    PLAYER_TYPES[player_class.MODE] = player_class
+    return player_class
+
+def create_player(spec):
+    """Create a new player from a specification.
+
+    arguments:
+    spec -- The specification of the player (dict) with its mode, an optional name and its parameters,
+            e.g. {"mode": "alphabeta", "depth": 4, "hero_card_discount": 30}.
+            Parameters that are not given get the default values of the player type.
+
+    return: The new player.
+    """
+    parameters = dict(spec)
+    mode = parameters.pop("mode")
+    parameters.pop("name", None)
+    if mode not in PLAYER_TYPES:
+        raise ValueError(f"Unknown player mode: {mode}")
+    return PLAYER_TYPES[mode](**parameters)
+
+def complete_spec(spec):
+    """Add the default values of all parameters that are not given in a specification.
+
+    arguments:
+    spec -- The specification of the player (dict).
+
+    return: The complete specification without the optional name.
+    """
+    complete_spec = {"mode": spec["mode"]}
+    complete_spec.update(PLAYER_TYPES[spec["mode"]].PARAMETERS)
+    complete_spec.update(spec)
+    complete_spec.pop("name", None)
+    return complete_spec
+
+def get_player(spec, side=None):
+    """Return the player for a specification. Each player is only created once per side and process,
+    so that its expensive resources (models, caches) are reused across games. The two sides of a game
+    never share one player, even with equal specifications, because a player keeps its tree and its pondering
+    for its own side. Frequently used players are kept in memory.
+
+    arguments:
+    spec -- The specification of the player (dict).
+    side -- The side for which the player plays (-1 or 1), None if the player is not bound to a side.
+
+    return: The player.
+    """
+    key = (side, json.dumps(spec, sort_keys=True))
+    if key in player_cache:
+        player_cache.move_to_end(key)
+        return player_cache[key]
+
+    player = create_player(spec)
+    player_cache[key] = player
+    if len(player_cache) > PLAYER_CACHE_SIZE:
+        player_cache.popitem(last=False)[1].stop_pondering()
+    return player
+
+def lookup_book(player, state, depth):
+    """Look up the move of a minimax-based player in its opening book.
+
+    arguments:
+    player -- The player with the parameters "book_path" and "hero_card_discount".
+    state -- The current game state.
+    depth -- The search depth of the player.
+
+    return: The move from the book and its value, None if the player has no book or the position is not in the book.
+    """
+    if player.parameters["book_path"] == None:
+        return None
+    book = opening_book.load_book(player.parameters["book_path"])
+    if book == None:
+        return None
+    return book.lookup(state, player.MODE, depth, player.parameters["hero_card_discount"])
+
+def load_model(model_path):
+    """Load an RL model. Frequently used models are kept in memory.
+
+    arguments:
+    model_path -- The path of the saved model.
+
+    return: The loaded model.
+    """
+    if model_path in model_cache:
+        model_cache.move_to_end(model_path)
+        return model_cache[model_path]
+
+    model = MaskablePPO.load(model_path)
+    model_cache[model_path] = model
+    if len(model_cache) > MODEL_CACHE_SIZE:
+        model_cache.popitem(last=False)
+    return model
+
+
+class Player:
+    """Base class for all player types.
+    Each player type declares its mode and its parameters with their default values.
+    """
+
+    MODE = None
+    PARAMETERS = {}
+    # Whether the player thinks on the opponent's time (see ponder).
+    CAN_PONDER = False
+
+    def __init__(self, **parameters):
+        """Create a player with the given parameters.
+
+        arguments:
+        parameters -- The values of the declared parameters.
+        """
+        unknown_parameters = set(parameters) - set(self.PARAMETERS)
+        if len(unknown_parameters) > 0:
+            raise ValueError(f"Unknown parameters for the player mode {self.MODE}: {sorted(unknown_parameters)}")
+        self.parameters = dict(self.PARAMETERS)
+        self.parameters.update(parameters)
+
+    def get_spec(self):
+        """Return the specification of the player.
+
+        return: The specification (dict) with the mode and all parameters.
+        """
+        spec = {"mode": self.MODE}
+        spec.update(self.parameters)
+        return spec
+
+    def choose_move(self, state, budget=None, control=None):
+        """Calculate a move for the player whose turn it is.
+
+        arguments:
+        state -- The current game state.
+        budget -- An optional limit for the calculation that replaces the default of the player
+                  (search depth for minimax-based players, seconds for MCTS). Players without a search ignore it.
+        control -- An optional SearchControl (see search_control.py) to cancel the search and to read its progress.
+                   If the search is cancelled, SearchCancelled is raised.
+
+        return: The chosen move.
+        """
+        raise NotImplementedError()
+
+    def ponder(self, state, duration=None):
+        """Called when the opponent is to move, so that the player can think on the opponent's time.
+        Most player types do nothing here, they set CAN_PONDER to False.
+
+        arguments:
+        state -- The current game state, in which the opponent is to move.
+        duration -- If given, the call returns only after thinking for this time in seconds (or when there is nothing
+                    left to think about). The thinking continues in the background until the player's own move.
+        """
+        pass
+
+    def stop_pondering(self):
+        """Called when the game is over to stop thinking on the opponent's time.
+        """
+        pass
+
+    def new_game(self):
+        """Called between games to release what only belongs to the last game, e.g. the tree of an MCTS player.
+        Most player types do nothing here.
+        """
+        pass
+
+
+@register_player
+class RandomPlayer(Player):
+    """Player that chooses a random move."""
+
+    MODE = "random"
+
+    def choose_move(self, state, budget=None, control=None):
+        return players.random(state, state.player_to_move)
+
+
+class SearchPlayer(Player):
+    """Base class for the minimax-based players.
+    Before searching, they consult their opening book (see opening_book.py)
+    and solve the endgame exactly if it is short enough (see endgame.py).
+    With a weights file the positions are evaluated by a tuned Evaluator (see evaluation.py)
+    instead of Game.calc_heuristic.
+    """
+
+    PARAMETERS = {"depth": 4, "hero_card_discount": 30, "book_path": None, "endgame_threshold": None, "weights_path": None}
+
+    def __init__(self, **parameters):
+        super().__init__(**parameters)
+        # The solved positions are kept across moves, so that the rest of the endgame is answered immediately.
+        self.endgame_solver = endgame.EndgameSolver()
+        self.evaluator = None
+        if self.parameters["weights_path"] != None:
+            self.evaluator = evaluation.load_evaluator(self.parameters["weights_path"])
+
+    def choose_move(self, state, budget=None, control=None):
+        depth = self.parameters["depth"] if budget == None else budget
+        book_entry = lookup_book(self, state, depth)
+        if book_entry != None:
+            if control != None:
+                control.report(depth, book_entry[0], book_entry[1])
+            return book_entry[0]
+
+        endgame_threshold = self.parameters["endgame_threshold"]
+        if endgame_threshold != None and endgame.is_endgame(state, endgame_threshold):
+            solution = self.endgame_solver.try_solve(state, control)
+            if solution != None:
+                if control != None:
+                    control.report(endgame.calc_horizon(state), solution[1], solution[0] * endgame.WIN_VALUE)
+                return solution[1]
+
+        return self.search(state, depth, control)
+
+    def search(self, state, depth, control=None):
+        """Calculate a move with the search algorithm of the player.
+
+        arguments:
+        state -- The current game state.
+        depth -- The search depth.
+        control -- An optional SearchControl to cancel the search and to read its progress.
+
+        return: The chosen move.
+        """
+        raise NotImplementedError()
+
+
+@register_player
+class MinimaxPlayer(SearchPlayer):
+    """Player that uses the minimax algorithm."""
+
+    MODE = "minimax"
+
+    def search(self, state, depth, control=None):
+        return players.minimax(state, depth, state.player_to_move, self.parameters["hero_card_discount"], control, self.evaluator)[1]
+
+
+@register_player
+class AlphabetaPlayer(SearchPlayer):
+    """Player that uses the minimax algorithm with alpha-beta pruning.
+    With iterative deepening the best move is known after each depth, e.g. to show the progress in the GUI.
+    """
+
+    MODE = "alphabeta"
+    PARAMETERS = dict(SearchPlayer.PARAMETERS, iterative_deepening=False)
+
+    def search(self, state, depth, control=None):
+        if self.parameters["iterative_deepening"]:
+            return players.iterative_alphabeta(state, depth, state.player_to_move, self.parameters["hero_card_discount"], control, self.evaluator)[1]
+        return players.alphabeta(state, depth, -math.inf, math.inf, state.player_to_move, self.parameters["hero_card_discount"], control, self.evaluator)[1]
+
+
+@register_player
+class PvsPlayer(SearchPlayer):
+    """Player that uses the principal variation search with iterative deepening and aspiration windows."""
+
+    MODE = "pvs"
+    PARAMETERS = dict(SearchPlayer.PARAMETERS, aspiration_window=players.ASPIRATION_WINDOW)
+
+    def search(self, state, depth, control=None):
+        return players.iterative_pvs(state, depth, self.parameters["hero_card_discount"], control, self.parameters["aspiration_window"], self.evaluator)[1]
+
+
+@register_player
+class ExpectiminimaxPlayer(SearchPlayer):
+    """Player that uses the expectiminimax algorithm with alpha-beta pruning."""
+
+    MODE = "expectiminimax"
+
+    def search(self, state, depth, control=None):
+        return players.expectiminimax(state, depth, -math.inf, math.inf, state.player_to_move, self.parameters["hero_card_discount"], control, self.evaluator)[1]
+
+
+@register_player
+class MctsPlayer(Player):
+    """Player that uses a Monte Carlo tree search. The tree is kept across the moves of a game."""
+
+    MODE = "mcts"
+    PARAMETERS = {"timeout": 1, "selection_mode": "robust child", "UCB1_param": 2**(1/2), "use_symmetry": False,
+                  "widening_param": monte_carlo.WIDENING_PARAM, "widening_exponent": monte_carlo.WIDENING_EXPONENT,
+                  "use_rave": False, "rave_equivalence": monte_carlo.RAVE_EQUIVALENCE,
+                  "rollout_policy": "random", "rollout_depth": None, "seed": None, "simulation_budget": None, "node_budget": None,
+                  "thread_num": 1}
+
+    def __init__(self, **parameters):
+        super().__init__(**parameters)
+        self.mcts = self.create_tree()
+
+    def create_tree(self):
+        """Create an empty Monte Carlo tree with the parameters of the player.
+
+        return: The tree.
+        """
+        return MonteCarlo(self.parameters["UCB1_param"], self.parameters["use_symmetry"],
+                          self.parameters["widening_param"], self.parameters["widening_exponent"],
+                          self.parameters["use_rave"], self.parameters["rave_equivalence"],
+                          self.parameters["rollout_policy"], self.parameters["rollout_depth"], self.parameters["seed"])
+
+    def choose_move(self, state, budget=None, control=None):
+        timeout = self.parameters["timeout"] if budget == None else budget
+        return players.mcts(state, self.mcts, timeout, self.parameters["selection_mode"], control,
+                            self.parameters["simulation_budget"], self.parameters["node_budget"], self.parameters["thread_num"])
+
+    def new_game(self):
+        # The positions of another deal never occur again, so the tree would only grow.
+        self.mcts = self.create_tree()
+
+
+@register_player
+class RLPlayer(Player):
+    """Player that uses a trained RL model."""
+
+    MODE = "rl"
+    PARAMETERS = {"model_path": "models/trained_models/model2.zip", "env_model": 2}
+
+    def __init__(self, **parameters):
+        super().__init__(**parameters)
+        self.env = game_env.GameEnv(model=self.parameters["env_model"])
+        self.model = load_model(self.parameters["model_path"])
+
+    def choose_move(self, state, budget=None, control=None):
+        return players.rl(state, self.env, self.model)
+
+
+@register_player
+class PonderingPlayer(Player):
+    """Player that lets another player think on the opponent's time (see ponder.py)."""
+
+    MODE = "ponder"
+    CAN_PONDER = True
+    PARAMETERS = {"player": {"mode": "alphabeta", "depth": 4, "hero_card_discount": 30}, "max_positions": None}
+
+    def __init__(self, **parameters):
+        super().__init__(**parameters)
+        # The player is not shared with other players, because its tree is used in the background.
+        self.ponderer = ponder.Ponderer(create_player(self.parameters["player"]), self.parameters["max_positions"])
+
+    def choose_move(self, state, budget=None, control=None):
+        return self.ponderer.choose_move(state, budget, control)
+
+    def ponder(self, state, duration=None):
+        self.ponderer.start(state)
+        if duration != None:
+            self.ponderer.wait(duration)
+
+    def stop_pondering(self):
+        self.ponderer.stop()
+
+    def new_game(self):
+        self.ponderer.stop()
+        self.ponderer.join()
+        self.ponderer.player.new_game()
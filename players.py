@@ -3,6 +3,15 @@ import copy
 from random import choice
 import numpy as np
 from sb3_contrib.common.wrappers import ActionMasker
+import rollout
+
+# Width of the null window of the principal variation search. The values of Game.calc_heuristic are integers
+# for an integer hero card discount, so a window of width 1 is a null window. A fractional discount
+# and evaluators with fractional weights need a much smaller one.
+NULL_WINDOW = 1
+FRACTIONAL_NULL_WINDOW = 1e-6
+# Distance of the bounds of the aspiration windows from the value of the previous iteration.
+ASPIRATION_WINDOW = 20
 
 
 def rl(state, env, model):
@@ -22,16 +31,23 @@ def rl(state, env, model):
     move = env.get_move_from_action(action)
     return move
 
-def mcts(state, mct, timeout, policy):
+def mcts(state, mct, timeout, policy, control=None, simulation_budget=None, node_budget=None, thread_num=1):
     """Search for the best move with the given tree as long as timeout is specified.
     
     arguments:
     state -- The current game state.
     mct -- The tree to perform the Monte Carlo Search.
+    control -- An optional SearchControl to cancel the search and to count the simulations.
+    simulation_budget -- An optional maximum number of simulations.
+    node_budget -- An optional maximum number of new nodes in the tree.
+    thread_num -- The number of threads that search the tree together (only without the GIL).
     
     return: The "best" calculated move.
     """
-    mct.run_search(state, timeout)
+    if thread_num > 1:
+        mct.run_parallel_search(state, timeout, thread_num, control, simulation_budget, node_budget)
+    else:
+        mct.run_search(state, timeout, control, simulation_budget, node_budget)
     move = mct.best_move(state, policy)
     return move
 
@@ -49,7 +65,73 @@ def random(state, player):
         return choice(moves)
     return None
 
-def minimax(state, depth, player, hero_card_discount):
+def evaluate(state, player, hero_card_discount, evaluator=None, control=None):
+    """Evaluate a state for the minimax-based algorithms.
+    
+    arguments:
+    state -- The current game state.
+    player -- The player from whose point of view the state is evaluated.
+    hero_card_discount -- The value that is added to the points per hero card.
+    evaluator -- An optional Evaluator (see evaluation.py), otherwise Game.calc_heuristic is used.
+    control -- An optional SearchControl that collects the statistics of the search.
+    
+    return: The value of the state, 1000000/-1000000 for decided games.
+    """
+    if control == None:
+        if evaluator == None:
+            return state.calc_heuristic(hero_card_discount, player, with_inf=True)
+        return evaluator.evaluate(state, player, with_inf=True)
+    
+    control.count_evaluation()
+    with control.timer("evaluation"):
+        if evaluator == None:
+            return state.calc_heuristic(hero_card_discount, player, with_inf=True)
+        return evaluator.evaluate(state, player, with_inf=True)
+
+def generate_moves(state, player, control=None):
+    """Generate the legal moves for the minimax-based algorithms.
+    
+    arguments:
+    state -- The current game state.
+    player -- The player whose moves are generated.
+    control -- An optional SearchControl that collects the statistics of the search.
+    
+    return: All the legal moves for the given player.
+    """
+    if control == None:
+        return state.get_legal_moves(player)
+    with control.timer("move_generation"):
+        return state.get_legal_moves(player)
+
+def is_game_over(state, control=None):
+    """Check whether the game is over, which is part of the move generation.
+    
+    arguments:
+    state -- The current game state.
+    control -- An optional SearchControl that collects the statistics of the search.
+    
+    return: Whether the game is over.
+    """
+    if control == None:
+        return state.is_game_over()
+    with control.timer("move_generation"):
+        return state.is_game_over()
+
+def copy_state(state, control=None):
+    """Copy a state before a move is executed in it.
+    
+    arguments:
+    state -- The current game state.
+    control -- An optional SearchControl that collects the statistics of the search.
+    
+    return: The copied game state.
+    """
+    if control == None:
+        return copy.deepcopy(state)
+    with control.timer("copying"):
+        return copy.deepcopy(state)
+
+def minimax(state, depth, player, hero_card_discount, control=None, evaluator=None):
     """Execute the minimax algorithm with alpha-beta pruning for the given depth.
     
     arguments:
@@ -57,21 +139,25 @@ def minimax(state, depth, player, hero_card_discount):
     depth -- Specifies how many moves should be calculated in advance.
     player -- The player whose turn it is.
     hero_card_discount -- The value that is added to the points per hero card.
+    control -- An optional SearchControl to cancel the search and to count the visited nodes.
+    evaluator -- An optional Evaluator (see evaluation.py) that replaces Game.calc_heuristic.
     
     return: The "best" calculated move.
     """
-    if depth == 0 or state.is_game_over():
-        return state.calc_heuristic(hero_card_discount, player, with_inf=True), None
+    if control != None:
+        control.count_node(depth)
+    if depth == 0 or is_game_over(state, control):
+        return evaluate(state, player, hero_card_discount, evaluator, control), None
     
     if player == state.player_to_move:
         value = -math.inf
-        moves = state.get_legal_moves(player)
+        moves = generate_moves(state, player, control)
         best_move = moves[0]
         
         for move in moves:
-            new_state = copy.deepcopy(state)
+            new_state = copy_state(state, control)
             new_state.execute_move(move, player)
-            new_value = minimax(new_state, depth-1, player, hero_card_discount)[0]
+            new_value = minimax(new_state, depth-1, player, hero_card_discount, control, evaluator=evaluator)[0]
             
             if new_value > value:
                 value = new_value
@@ -81,19 +167,19 @@ def minimax(state, depth, player, hero_card_discount):
     
     else:
         value = math.inf
-        moves = state.get_legal_moves(-player)
+        moves = generate_moves(state, -player, control)
         
         for move in moves:
-            new_state = copy.deepcopy(state)
+            new_state = copy_state(state, control)
             new_state.execute_move(move, -player)
-            new_value = minimax(new_state, depth-1, player, hero_card_discount)[0]
+            new_value = minimax(new_state, depth-1, player, hero_card_discount, control, evaluator=evaluator)[0]
             
             if new_value < value:
                 value = new_value
         
         return value, None
 
-def alphabeta(state, depth, alpha, beta, player, hero_card_discount):
+def alphabeta(state, depth, alpha, beta, player, hero_card_discount, control=None, evaluator=None):
     """Execute the minimax algorithm with alpha-beta pruning for the given depth.
     
     arguments:
@@ -103,51 +189,217 @@ def alphabeta(state, depth, alpha, beta, player, hero_card_discount):
     beta -- maximum possible value.
     player -- The player whose turn it is.
     hero_card_discount -- The value that is added to the points per hero card.
+    control -- An optional SearchControl to cancel the search and to count the visited nodes.
+    evaluator -- An optional Evaluator (see evaluation.py) that replaces Game.calc_heuristic.
     
     return: The "best" calculated move.
     """
-    if depth == 0 or state.is_game_over():
-        return state.calc_heuristic(hero_card_discount, player, with_inf=True), None
-    
+    # The search runs in negamax form, whose values are always seen from the player to move.
     if player == state.player_to_move:
+        return negamax(state, depth, alpha, beta, hero_card_discount, control, evaluator=evaluator)
+    return -negamax(state, depth, -beta, -alpha, hero_card_discount, control, evaluator=evaluator)[0], None
+
+def negamax(state, depth, alpha, beta, hero_card_discount, control=None, evaluator=None):
+    """Execute the minimax algorithm with alpha-beta pruning in negamax form:
+    The values are always calculated from the point of view of the player to move,
+    so the value of a move is the negated value of the following position.
+    
+    arguments:
+    state -- The current game state.
+    depth -- Specifies how many moves should be calculated in advance.
+    alpha -- minimum possible value.
+    beta -- maximum possible value.
+    hero_card_discount -- The value that is added to the points per hero card.
+    control -- An optional SearchControl to cancel the search and to count the visited nodes.
+    evaluator -- An optional Evaluator (see evaluation.py) that replaces Game.calc_heuristic.
+    
+    return: The value for the player to move, the "best" calculated move.
+    """
+    if control != None:
+        control.count_node(depth)
+    if depth == 0 or is_game_over(state, control):
+        return evaluate(state, state.player_to_move, hero_card_discount, evaluator, control), None
+    
+    player = state.player_to_move
+    value = -math.inf
+    moves = generate_moves(state, player, control)
+    best_move = moves[0]
+    
+    for i, move in enumerate(moves):
+        new_state = copy_state(state, control)
+        new_state.execute_move(move, player)
+        new_value = -negamax(new_state, depth-1, -beta, -alpha, hero_card_discount, control, evaluator=evaluator)[0]
+        
+        if new_value > value:
+            value = new_value
+            best_move = move
+        if value >= beta:
+            if control != None:
+                control.count_cutoff(depth, i)
+            break # beta cutoff
+        if value > alpha:
+            alpha = value
+    
+    return value, best_move
+
+def pvs(state, depth, alpha, beta, hero_card_discount, control=None, first_move=None, evaluator=None):
+    """Execute the principal variation search (NegaScout) in negamax form.
+    The first move is searched with the full window, all other moves only with a null window
+    to prove that they are not better. Only if a move turns out to be better, it is searched again with the full window.
+    
+    arguments:
+    state -- The current game state.
+    depth -- Specifies how many moves should be calculated in advance.
+    alpha -- minimum possible value.
+    beta -- maximum possible value.
+    hero_card_discount -- The value that is added to the points per hero card.
+    control -- An optional SearchControl to cancel the search and to count the visited nodes.
+    first_move -- An optional move that is searched first, usually the best move of the previous iteration.
+    evaluator -- An optional Evaluator (see evaluation.py) that replaces Game.calc_heuristic.
+    
+    return: The value for the player to move, the "best" calculated move.
+    """
+    if control != None:
+        control.count_node(depth)
+    if depth == 0 or is_game_over(state, control):
+        return evaluate(state, state.player_to_move, hero_card_discount, evaluator, control), None
+    
+    player = state.player_to_move
+    value = -math.inf
+    moves = generate_moves(state, player, control)
+    if depth > 1 and len(moves) > 1:
+        gains = rollout.calc_field_gains(state, moves, True)
+        moves = [moves[i] for i in np.argsort(-gains, kind="stable")]
+    if first_move != None and first_move in moves:
+        # The null windows only pay off if the best move is searched first.
+        moves.remove(first_move)
+        moves.insert(0, first_move)
+    best_move = moves[0]
+    if evaluator != None:
+        has_integer_values = evaluator.has_integer_values()
+    else:
+        has_integer_values = float(hero_card_discount).is_integer()
+    null_window = NULL_WINDOW if has_integer_values else FRACTIONAL_NULL_WINDOW
+    
+    for i, move in enumerate(moves):
+        # As in negamax, a child is only created when it is searched, so a cutoff saves the copies of the others.
+        new_state = copy_state(state, control)
+        new_state.execute_move(move, player)
+        if i == 0:
+            new_value = -pvs(new_state, depth-1, -beta, -alpha, hero_card_discount, control, evaluator=evaluator)[0]
+        else:
+            new_value = -pvs(new_state, depth-1, -alpha-null_window, -alpha, hero_card_discount, control, evaluator=evaluator)[0]
+            if alpha < new_value < beta:
+                new_value = -pvs(new_state, depth-1, -beta, -alpha, hero_card_discount, control, evaluator=evaluator)[0]
+        
+        if new_value > value:
+            value = new_value
+            best_move = move
+        if value >= beta:
+            if control != None:
+                control.count_cutoff(depth, i)
+            break # beta cutoff
+        if value > alpha:
+            alpha = value
+    
+    return value, best_move
+
+def iterative_pvs(state, max_depth, hero_card_discount, control=None, aspiration_window=ASPIRATION_WINDOW, evaluator=None):
+    """Execute the principal variation search with iterative deepening up to the given depth.
+    Each iteration starts with an aspiration window around the value of the previous iteration
+    and searches the previous best move first. If the value falls outside the window, the search is repeated
+    with the window opened to that side. After each depth the best move is reported to the control.
+    
+    arguments:
+    state -- The current game state.
+    max_depth -- The maximum number of moves that should be calculated in advance.
+    hero_card_discount -- The value that is added to the points per hero card.
+    control -- An optional SearchControl to cancel the search and to read the progress.
+    aspiration_window -- The distance of the window bounds from the previous value, None for full windows.
+    evaluator -- An optional Evaluator (see evaluation.py) that replaces Game.calc_heuristic.
+    
+    return: The value for the player to move, the "best" calculated move.
+    """
+    best_value = None
+    best_move = None
+    
+    for depth in range(1, max_depth+1):
+        alpha = -math.inf
+        beta = math.inf
+        if aspiration_window != None and best_value != None:
+            alpha = best_value - aspiration_window
+            beta = best_value + aspiration_window
+        
+        while True:
+            value, move = pvs(state, depth, alpha, beta, hero_card_discount, control, best_move, evaluator)
+            if value <= alpha:
+                alpha = -math.inf # fail low
+            elif value >= beta:
+                beta = math.inf # fail high
+            else:
+                break
+        
+        best_value = value
+        best_move = move
+        if control != None:
+            control.report(depth, best_move, best_value)
+        # The result is certain if the game is decided.
+        if abs(best_value) >= 1000000:
+            break
+    
+    return best_value, best_move
+
+def iterative_alphabeta(state, max_depth, player, hero_card_discount, control=None, evaluator=None):
+    """Execute the alpha-beta search with iterative deepening up to the given depth.
+    After each depth the best move is reported to the control, and it is searched first in the next depth.
+    
+    arguments:
+    state -- The current game state.
+    max_depth -- The maximum number of moves that should be calculated in advance.
+    player -- The player whose turn it is.
+    hero_card_discount -- The value that is added to the points per hero card.
+    control -- An optional SearchControl to cancel the search and to read the progress.
+    evaluator -- An optional Evaluator (see evaluation.py) that replaces Game.calc_heuristic.
+    
+    return: The "best" calculated move.
+    """
+    moves = generate_moves(state, player, control)
+    best_value = None
+    best_move = moves[0]
+    
+    for depth in range(1, max_depth+1):
+        alpha = -math.inf
         value = -math.inf
-        moves = state.get_legal_moves(player)
-        best_move = moves[0]
+        depth_best_move = moves[0]
         
         for move in moves:
-            new_state = copy.deepcopy(state)
+            new_state = copy_state(state, control)
             new_state.execute_move(move, player)
-            new_value = alphabeta(new_state, depth-1, alpha, beta, player, hero_card_discount)[0]
+            new_value = alphabeta(new_state, depth-1, alpha, math.inf, player, hero_card_discount, control, evaluator=evaluator)[0]
             
             if new_value > value:
                 value = new_value
-                best_move = move
-            if value >= beta:
-                break # beta cutoff
-            if value > alpha:
+                depth_best_move = move
                 alpha = value
+                # Within the first depth there is no better result yet.
+                if control != None and depth == 1:
+                    control.report(depth, depth_best_move, value)
         
-        return value, best_move
-    
-    else:
-        value = math.inf
-        moves = state.get_legal_moves(-player)
+        best_value = value
+        best_move = depth_best_move
+        if control != None:
+            control.report(depth, best_move, best_value)
+        # Search the best move first in the next depth, so that more branches are cut off.
+        moves.remove(best_move)
+        moves.insert(0, best_move)
         
-        for move in moves:
-            new_state = copy.deepcopy(state)
-            new_state.execute_move(move, -player)
-            new_value = alphabeta(new_state, depth-1, alpha, beta, player, hero_card_discount)[0]
-            
-            if new_value < value:
-                value = new_value
-            if value <= alpha:
-                break # alpha cutoff
-            if value < beta:
-                beta = value
-        
-        return value, None
+        # The result is certain if the game is decided.
+        if abs(best_value) >= 1000000:
+            break
+    
+    return best_value, best_move
 
-def expectiminimax(state, depth, alpha, beta, player, hero_card_discount):
+def expectiminimax(state, depth, alpha, beta, player, hero_card_discount, control=None, evaluator=None):
     """Execute the expectiminimax algorithm with alpha-beta pruning for the given depth.
     In contrast to the minimax algorithm, consider all possible outcomes for a random event.
     
@@ -158,39 +410,47 @@ def expectiminimax(state, depth, alpha, beta, player, hero_card_discount):
     beta -- maximum possible value.
     player -- The player whose turn it is.
     hero_card_discount -- The value that is added to the points per hero card.
+    control -- An optional SearchControl to cancel the search and to count the visited nodes.
+    evaluator -- An optional Evaluator (see evaluation.py) that replaces Game.calc_heuristic.
     
     return: The "best" calculated move.
     """
-    if depth == 0 or state.is_game_over():
-        return state.calc_heuristic(hero_card_discount, player, with_inf=True), None
+    if control != None:
+        control.count_node(depth)
+    if depth == 0 or is_game_over(state, control):
+        return evaluate(state, player, hero_card_discount, evaluator, control), None
     
     if player == state.player_to_move:
         value = -math.inf
-        moves = state.get_legal_moves(player)
+        moves = generate_moves(state, player, control)
         best_move = moves[0]
         
-        for move in moves:
+        for move_index, move in enumerate(moves):
             new_value = 0
             if move == None or not move[0]:
-                new_state = copy.deepcopy(state)
+                new_state = copy_state(state, control)
                 new_state.execute_move(move, player)
-                new_value = expectiminimax(new_state, depth-1, alpha, beta, player, hero_card_discount)[0]
+                new_value = expectiminimax(new_state, depth-1, alpha, beta, player, hero_card_discount, control, evaluator=evaluator)[0]
             
             else: # Draw a card.
                 # Manually draw each card from the pile once and calculate
                 # the minimax value for each of the resulting states.
                 # Then take the average of all these values.
                 drawable_power_cards_num = len(state.drawable_power_cards)
+                if control != None:
+                    control.count_chance_node()
                 for i in range(drawable_power_cards_num):
-                    new_state = copy.deepcopy(state)
+                    new_state = copy_state(state, control)
                     new_state.execute_move(move, player, i)
-                    new_value += expectiminimax(new_state, depth-1, alpha, beta, player, hero_card_discount)[0]
+                    new_value += expectiminimax(new_state, depth-1, alpha, beta, player, hero_card_discount, control, evaluator=evaluator)[0]
                 new_value /= drawable_power_cards_num
             
             if new_value > value:
                 value = new_value
                 best_move = move
             if value >= beta:
+                if control != None:
+                    control.count_cutoff(depth, move_index)
                 break # beta cutoff
             if value > alpha:
                 alpha = value
@@ -199,29 +459,33 @@ def expectiminimax(state, depth, alpha, beta, player, hero_card_discount):
     
     else:
         value = math.inf
-        moves = state.get_legal_moves(-player)
+        moves = generate_moves(state, -player, control)
         
-        for move in moves:
+        for move_index, move in enumerate(moves):
             new_value = 0
             if move == None or not move[0]:
-                new_state = copy.deepcopy(state)
+                new_state = copy_state(state, control)
                 new_state.execute_move(move, -player)
-                new_value = expectiminimax(new_state, depth-1, alpha, beta, player, hero_card_discount)[0]
+                new_value = expectiminimax(new_state, depth-1, alpha, beta, player, hero_card_discount, control, evaluator=evaluator)[0]
             
             else: # Draw a card.
                 # Manually draw each card from the pile once and calculate
                 # the minimax value for each of the resulting states.
                 # Then take the average of all these values.
                 drawable_power_cards_num = len(state.drawable_power_cards)
+                if control != None:
+                    control.count_chance_node()
                 for i in range(drawable_power_cards_num):
-                    new_state = copy.deepcopy(state)
+                    new_state = copy_state(state, control)
                     new_state.execute_move(move, -player, i)
-                    new_value += expectiminimax(new_state, depth-1, alpha, beta, player, hero_card_discount)[0]
+                    new_value += expectiminimax(new_state, depth-1, alpha, beta, player, hero_card_discount, control, evaluator=evaluator)[0]
                 new_value /= drawable_power_cards_num
             
             if new_value < value:
                 value = new_value
             if value <= alpha:
+                if control != None:
+                    control.count_cutoff(depth, move_index, is_beta=False)
                 break # alpha cutoff
             if value < beta:
                 beta = value
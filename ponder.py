@@ -0,0 +1,207 @@
+import copy
+import threading
+from search_control import SearchControl, SearchCancelled
+import symmetry
+import profiling
+
+# Duration of one MCTS search slice while pondering, after which a stop request is checked.
+MCTS_PONDER_SLICE = 0.1
+# Interval in seconds at which a caller that waits for a pondered position checks whether the thread is still alive.
+WAIT_INTERVAL = 0.1
+
+
+class Ponderer:
+    """Class to let a player think on the opponent's time.
+    While the opponent is to move, a background thread searches the positions after the likely replies
+    and caches the results by position. Symmetric positions share one cache entry (see symmetry.py).
+    An MCTS player instead keeps growing its tree from the current position.
+    """
+
+    def __init__(self, player, max_positions=None):
+        """Create a ponderer for the given player.
+
+        arguments:
+        player -- The player from player_registry.py for whom moves are precalculated.
+        max_positions -- The maximum number of positions to search in advance, None for no limit.
+        """
+        self.player = player
+        self.max_positions = max_positions
+
+        self.cache = {}
+        self.current_key = None # key of the position that is searched at the moment
+        self.control = None # control of the search that runs at the moment
+        self.condition = threading.Condition()
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    def start(self, state):
+        """Start pondering in the given position, in which the opponent is to move.
+
+        arguments:
+        state -- The current game state.
+        """
+        # The player must not be used by two threads at once, e.g. the environment of an RL player
+        # or the cache of the endgame solver.
+        self.stop()
+        self.join()
+        with self.condition:
+            self.stop_event = threading.Event()
+            self.cache = {}
+            self.current_key = None
+        # The thread continues the profiling label of the caller, e.g. the player in the arena (see profiling.py).
+        label = profiling.get_label()
+        self.thread = threading.Thread(target=self.ponder, args=(copy.deepcopy(state), self.stop_event, label), daemon=True)
+        self.thread.start()
+
+    def stop(self, keep_key=None):
+        """Request the background thread to stop and cancel its running search.
+
+        arguments:
+        keep_key -- The position key of a search that is finished and cached instead of being cancelled.
+        """
+        with self.condition:
+            self.stop_event.set()
+            if self.control != None and self.current_key != keep_key:
+                self.control.cancel()
+
+    def join(self):
+        """Wait until the background thread has stopped.
+        """
+        if self.thread != None:
+            self.thread.join()
+            self.thread = None
+
+    def wait(self, timeout):
+        """Wait until the background thread has stopped or the timeout has passed. The thread is not stopped.
+
+        arguments:
+        timeout -- The maximum time to wait in seconds.
+        """
+        if self.thread != None:
+            self.thread.join(timeout)
+
+    def ponder(self, state, stop_event, label=None):
+        """Background thread: precalculate the moves for the likely positions after the opponent's move.
+
+        arguments:
+        state -- The game state in which the opponent is to move.
+        stop_event -- The event that signals the thread to stop.
+        label -- The profiling label of the pondering, None if the process is not profiled.
+        """
+        if label == None:
+            self.search_ahead(state, stop_event)
+            return
+        with profiling.attribute(f"{label}:ponder"):
+            self.search_ahead(state, stop_event)
+
+    def search_ahead(self, state, stop_event):
+        """Precalculate the moves for the likely positions after the opponent's move (see ponder).
+
+        arguments:
+        state -- The game state in which the opponent is to move.
+        stop_event -- The event that signals the thread to stop.
+        """
+        if hasattr(self.player, "mcts"):
+            # The tree is shared with the subsequent search, so it is simply grown further.
+            while not stop_event.is_set() and state.determine_winner() == None:
+                # Once the result is proven, the tree cannot grow any further.
+                if self.player.mcts.run_search(state, MCTS_PONDER_SLICE)["is_proven"]:
+                    return
+            return
+
+        for child_state in self.get_likely_positions(state):
+            if stop_event.is_set():
+                return
+            key, transformation = symmetry.canonicalize(child_state)
+            control = SearchControl()
+            with self.condition:
+                if stop_event is not self.stop_event:
+                    return
+                if key in self.cache:
+                    continue
+                self.current_key = key
+                self.control = control
+            is_searched = False
+            try:
+                move = self.player.choose_move(child_state, control=control)
+                is_searched = True
+            except SearchCancelled:
+                pass
+            finally:
+                # Also after an error of the search, a caller that waits for this position must not wait forever.
+                with self.condition:
+                    is_current = stop_event is self.stop_event
+                    if is_current:
+                        if is_searched and not control.is_cancelled():
+                            self.cache[key] = symmetry.to_canonical_move(move, transformation)
+                        self.current_key = None
+                        self.control = None
+                        self.condition.notify_all()
+            if not is_current or control.is_cancelled():
+                return
+
+    def get_likely_positions(self, state):
+        """Determine the positions after the opponent's replies, the most likely ones first.
+        The replies are ordered by the heuristic value for the opponent after one move.
+        Drawing a card leads to one position for every drawable card, which are searched last.
+
+        arguments:
+        state -- The game state in which the opponent is to move.
+
+        return: The list of positions in which the player has to choose between several moves.
+        """
+        opponent = state.player_to_move
+        positions = []
+        draw_positions = []
+        for move in state.get_legal_moves(opponent):
+            if move != None and move[0]:
+                for power_card_index in range(len(state.drawable_power_cards)):
+                    child_state = copy.deepcopy(state)
+                    child_state.execute_move(move, opponent, power_card_index)
+                    draw_positions.append(child_state)
+            else:
+                child_state = copy.deepcopy(state)
+                child_state.execute_move(move, opponent)
+                value = child_state.calc_heuristic(child_state.HERO_CARD_DISCOUNT, opponent, with_inf=True)
+                positions.append((value, child_state))
+
+        positions = [child_state for value, child_state in sorted(positions, key=lambda position: -position[0])]
+        positions = [child_state for child_state in positions + draw_positions
+                     if len(child_state.get_legal_moves(child_state.player_to_move)) > 1]
+        if self.max_positions != None:
+            positions = positions[:self.max_positions]
+        return positions
+
+    def choose_move(self, state, budget=None, control=None):
+        """Calculate the move of the player, answering from the cache if the position was pondered.
+        If the position is being searched at the moment, wait for this search instead of starting a new one.
+        Searches of other positions are cancelled.
+
+        arguments:
+        state -- The current game state, in which the player is to move.
+        budget -- An optional limit for the calculation (see player_registry.Player.choose_move).
+        control -- An optional SearchControl for the search (see player_registry.Player.choose_move).
+
+        return: The chosen move.
+        """
+        if hasattr(self.player, "mcts") or budget != None:
+            # The tree is searched directly, and the cached moves were calculated with the default budget of the player.
+            self.stop()
+            self.join()
+            return self.player.choose_move(state, budget, control)
+
+        key, transformation = symmetry.canonicalize(state)
+        self.stop(keep_key=key)
+        thread = self.thread
+
+        def is_searched():
+            return key in self.cache or self.current_key != key or thread == None or not thread.is_alive()
+
+        with self.condition:
+            # The predicate is checked again from time to time, in case the thread has died without notifying.
+            while not self.condition.wait_for(is_searched, WAIT_INTERVAL):
+                pass
+            if key in self.cache:
+                return symmetry.from_canonical_move(self.cache[key], transformation)
+        self.join()
+        return self.player.choose_move(state, budget, control)
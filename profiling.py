@@ -0,0 +1,200 @@
+import os
+import sys
+import time
+import threading
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+
+# Interval between two samples in seconds. The sampling thread needs the GIL,
+# so a busy main thread is sampled at most every sys.getswitchinterval() seconds (5 ms by default).
+SAMPLE_INTERVAL = 0.005
+# Label of the time that is not attributed to a player, e.g. executing moves and recording the game.
+OTHER_LABEL = "other"
+# Labels of the training (see train_model.py): the policy and its updates, the moves of the opponents
+# and the work of the environment for the learner's moves.
+LEARNER_LABEL = "learner"
+OPPONENT_LABEL = "opponent"
+ENVIRONMENT_LABEL = "environment"
+
+# The profiler of this process while it is running, see attribute.
+active_profiler = None
+
+
+class Profiler:
+    """Class for a sampling profiler of a process.
+    A background thread takes the call stacks at regular intervals and counts each stack
+    in the collapsed format of flamegraph tools ("root;caller;callee count"). The root of each stack is the
+    label of the current player, so that the flamegraph is split by player.
+    The thread that starts the profiler is always sampled, other threads (e.g. the pondering thread of ponder.py)
+    while they attribute their work to a label, so that idle background threads do not fill the flamegraph.
+    In addition, the CPU time of each thread is measured for its labels. Nested labels are exclusive,
+    i.e. the time of the inner label is not added to the outer one.
+    The data of profilers in several processes can be merged (see to_data and merge).
+    """
+
+    def __init__(self, interval=SAMPLE_INTERVAL):
+        """Create a stopped profiler.
+
+        arguments:
+        interval -- The interval between two samples in seconds.
+        """
+        self.interval = interval
+        self.stacks = Counter()
+        self.cpu_times = {}
+        self.labels = {} # by thread id
+        self.thread_id = None
+        self.sampler = None
+        self.stop_event = None
+        self.last_cpu_times = {} # by thread id
+
+    def start(self):
+        """Start profiling the calling thread and make this profiler the active one of the process.
+        """
+        global active_profiler
+        self.thread_id = threading.get_ident()
+        self.last_cpu_times[self.thread_id] = time.thread_time()
+        self.stop_event = threading.Event()
+        self.sampler = threading.Thread(target=self.sample, daemon=True)
+        self.sampler.start()
+        active_profiler = self
+
+    def stop(self):
+        """Stop profiling.
+        """
+        global active_profiler
+        self.charge_cpu_time()
+        self.stop_event.set()
+        self.sampler.join()
+        if active_profiler is self:
+            active_profiler = None
+
+    def get_label(self, thread_id=None):
+        """Return the current label of a thread.
+
+        arguments:
+        thread_id -- The id of the thread, by default the calling thread.
+
+        return: The innermost label, OTHER_LABEL outside of all labels.
+        """
+        labels = self.labels.get(threading.get_ident() if thread_id == None else thread_id, [])
+        return labels[-1] if len(labels) > 0 else OTHER_LABEL
+
+    def sample(self):
+        """Take samples of the profiled threads until the profiler is stopped. Runs in the sampling thread.
+        """
+        while not self.stop_event.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id != self.thread_id and len(self.labels.get(thread_id, [])) == 0:
+                    continue
+                names = []
+                while frame != None:
+                    code = frame.f_code
+                    names.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                    frame = frame.f_back
+                names.append(self.get_label(thread_id))
+                # Spaces would separate the stack from its count.
+                self.stacks[";".join(reversed(names)).replace(" ", "_")] += 1
+
+    def charge_cpu_time(self):
+        """Add the CPU time of the calling thread since the last change of its label to the current label.
+        The CPU time of another thread before its first label is not counted.
+        """
+        thread_id = threading.get_ident()
+        cpu_time = time.thread_time()
+        if thread_id in self.last_cpu_times:
+            label = self.get_label(thread_id)
+            self.cpu_times[label] = self.cpu_times.get(label, 0) + cpu_time - self.last_cpu_times[thread_id]
+        self.last_cpu_times[thread_id] = cpu_time
+
+    @contextmanager
+    def attribute(self, label):
+        """Attribute the samples and the CPU time of the enclosed block in the calling thread to a label.
+
+        arguments:
+        label -- The label, e.g. the name of a player.
+        """
+        self.charge_cpu_time()
+        labels = self.labels.setdefault(threading.get_ident(), [])
+        labels.append(label)
+        try:
+            yield
+        finally:
+            self.charge_cpu_time()
+            labels.pop()
+            # Ids of finished threads are reused, so another thread starts its measurement again with its first label.
+            if len(labels) == 0 and threading.get_ident() != self.thread_id:
+                del self.last_cpu_times[threading.get_ident()]
+
+    def to_data(self):
+        """Return the collected data, e.g. to send it from a worker process to the main process.
+
+        return: The stacks with their numbers of samples and the CPU times by label (dict).
+        """
+        return {"stacks": dict(self.stacks), "cpu_times": dict(self.cpu_times)}
+
+    def merge(self, data):
+        """Add the data of another profiler.
+
+        arguments:
+        data -- The data of the other profiler (see to_data).
+        """
+        self.stacks.update(data["stacks"])
+        for label, cpu_time in data["cpu_times"].items():
+            self.cpu_times[label] = self.cpu_times.get(label, 0) + cpu_time
+
+    def write_collapsed(self, path):
+        """Write the stacks in the collapsed format, e.g. for flamegraph.pl, inferno or speedscope.
+
+        arguments:
+        path -- The path of the file.
+        """
+        directory = os.path.dirname(path)
+        if directory != "":
+            os.makedirs(directory, exist_ok=True)
+        with open(path, "w") as file:
+            for stack, num in sorted(self.stacks.items()):
+                file.write(f"{stack} {num}\n")
+
+    def print_cpu_times(self):
+        """Print the CPU time of each label and its share of the total time.
+        """
+        total_time = sum(self.cpu_times.values())
+        print(f"{'label':<40}{'cpu time':>12}{'share':>10}")
+        for label, cpu_time in sorted(self.cpu_times.items(), key=lambda item: -item[1]):
+            share = cpu_time / total_time if total_time > 0 else 0
+            print(f"{label:<40}{cpu_time:>11.2f}s{share:>10.1%}")
+
+
+def attribute(label):
+    """Attribute the enclosed block to a label in the active profiler of the process.
+    Without an active profiler nothing is measured, so that the hook can stay in the hot paths.
+
+    arguments:
+    label -- The label, e.g. the name of a player.
+
+    return: The context manager.
+    """
+    if active_profiler == None:
+        return nullcontext()
+    return active_profiler.attribute(label)
+
+def get_label():
+    """Return the current label of the calling thread in the active profiler of the process,
+    e.g. to continue the attribution in a background thread.
+
+    return: The label, None without an active profiler.
+    """
+    if active_profiler == None:
+        return None
+    return active_profiler.get_label()
+
+def save_profile(profiler, path):
+    """Write the collapsed stacks of a profiler and print its CPU times.
+
+    arguments:
+    profiler -- The profiler.
+    path -- The path of the collapsed stacks.
+    """
+    profiler.write_collapsed(path)
+    profiler.print_cpu_times()
+    print(f"Collapsed stacks saved in {path}")
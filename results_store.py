@@ -0,0 +1,240 @@
+import os
+import json
+import math
+import time
+import sqlite3
+import actions
+
+DEFAULT_PATH = "results/results.db"
+ELO_K = 16
+ELO_INITIAL_RATING = 1500
+
+
+class ResultStore:
+    """Class for a persistent store of game results in a local SQLite database.
+    Every game is written as soon as it is finished, so that interrupted tournaments can be resumed
+    and results of several runs can be combined.
+    """
+
+    def __init__(self, path=DEFAULT_PATH):
+        """Open the store and create the tables if necessary.
+
+        arguments:
+        path -- The path of the database file.
+        """
+        directory = os.path.dirname(path)
+        if directory != "" and not os.path.exists(directory):
+            os.makedirs(directory)
+
+        self.connection = sqlite3.connect(path)
+        self.connection.executescript("""
+            CREATE TABLE IF NOT EXISTS players (
+                name TEXT PRIMARY KEY,
+                config TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS games (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                tournament TEXT NOT NULL,
+                game_index INTEGER NOT NULL,
+                player1 TEXT NOT NULL,
+                player2 TEXT NOT NULL,
+                starting_player INTEGER NOT NULL,
+                seed INTEGER,
+                winner INTEGER NOT NULL,
+                moves TEXT NOT NULL,
+                move_times TEXT NOT NULL,
+                finished_at REAL NOT NULL,
+                UNIQUE (tournament, game_index)
+            );
+            CREATE TABLE IF NOT EXISTS elo_ratings (
+                name TEXT PRIMARY KEY,
+                rating REAL NOT NULL,
+                game_num INTEGER NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS elo_state (
+                last_game_id INTEGER NOT NULL
+            );
+        """)
+        self.connection.commit()
+
+    def close(self):
+        """Close the database connection.
+        """
+        self.connection.close()
+
+    def register_player(self, name, config):
+        """Store the configuration of a player.
+        A name may only be used for one configuration, otherwise the results of different players would be mixed.
+
+        arguments:
+        name -- The name of the player.
+        config -- The configuration of the player (dict with JSON-serializable values).
+        """
+        config_json = json.dumps(config, sort_keys=True)
+        row = self.connection.execute("SELECT config FROM players WHERE name = ?", (name,)).fetchone()
+        if row == None:
+            self.connection.execute("INSERT INTO players (name, config) VALUES (?, ?)", (name, config_json))
+            self.connection.commit()
+        elif row[0] != config_json:
+            raise ValueError(f"The player {name} is already stored with another configuration: {row[0]}")
+
+    def add_result(self, tournament, result):
+        """Append the result of a finished game.
+
+        arguments:
+        tournament -- The name of the tournament or benchmark run.
+        result -- The result of the game (see arena.play_game) with the game index and the names of both players.
+        """
+        moves = [actions.get_action_from_move(move) for move in result["moves"]]
+        self.connection.execute(
+            "INSERT INTO games (tournament, game_index, player1, player2, starting_player, seed, winner, moves, move_times, finished_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (tournament, result["index"], result["player1"], result["player2"], result["starting_player"],
+             result["seed"], result["winner"], json.dumps(moves), json.dumps(result["move_times"]), time.time()))
+        self.connection.commit()
+
+    def get_finished_indices(self, tournament, games):
+        """Return the indices of the games of a tournament that are already stored.
+        A stored game only counts if its players and its seed match as well. A game index that is stored
+        with other players or another seed means that the name of the tournament is used for another run.
+
+        arguments:
+        tournament -- The name of the tournament.
+        games -- The games of the run (dicts with the game index, the names of both players and the seed).
+
+        return: The set of game indices.
+        """
+        rows = self.connection.execute("SELECT game_index, player1, player2, seed FROM games WHERE tournament = ?", (tournament,))
+        stored_games = {row[0]: tuple(row[1:]) for row in rows}
+        finished_indices = set()
+        for game in games:
+            stored_game = stored_games.get(game["index"])
+            if stored_game == None:
+                continue
+            if stored_game != (game["player1"], game["player2"], game["seed"]):
+                raise ValueError(f"Game {game['index']} of the tournament {tournament} is stored with other players or another seed: {stored_game}")
+            finished_indices.add(game["index"])
+        return finished_indices
+
+    def get_results(self, tournament=None):
+        """Return the stored results in the order in which the games were finished.
+
+        arguments:
+        tournament -- The name of the tournament, None for the games of all tournaments.
+
+        return: The list of results (dicts). The moves are stored as action indices (see actions.py).
+        """
+        query = "SELECT tournament, game_index, player1, player2, starting_player, seed, winner, moves, move_times FROM games"
+        parameters = ()
+        if tournament != None:
+            query += " WHERE tournament = ?"
+            parameters = (tournament,)
+        results = []
+        for row in self.connection.execute(query + " ORDER BY id", parameters):
+            results.append({"tournament": row[0], "index": row[1], "player1": row[2], "player2": row[3],
+                            "starting_player": row[4], "seed": row[5], "winner": row[6],
+                            "moves": json.loads(row[7]), "move_times": json.loads(row[8])})
+        return results
+
+    def update_elo_ratings(self):
+        """Update the Elo ratings with all games that were stored since the last update.
+        The games are processed in the order in which they were finished.
+
+        return: The Elo rating of every player (dict).
+        """
+        row = self.connection.execute("SELECT last_game_id FROM elo_state").fetchone()
+        last_game_id = 0 if row == None else row[0]
+        ratings = {name: [rating, game_num] for name, rating, game_num in self.connection.execute("SELECT name, rating, game_num FROM elo_ratings")}
+
+        rows = self.connection.execute("SELECT id, player1, player2, winner FROM games WHERE id > ? ORDER BY id", (last_game_id,)).fetchall()
+        for game_id, player1, player2, winner in rows:
+            rating1 = ratings.setdefault(player1, [ELO_INITIAL_RATING, 0])
+            rating2 = ratings.setdefault(player2, [ELO_INITIAL_RATING, 0])
+            expected_score = 1 / (1 + 10**((rating2[0] - rating1[0]) / 400))
+            score = score_player1(winner)
+            rating1[0] += ELO_K * (score - expected_score)
+            rating2[0] -= ELO_K * (score - expected_score)
+            rating1[1] += 1
+            rating2[1] += 1
+            last_game_id = game_id
+
+        self.connection.execute("DELETE FROM elo_ratings")
+        self.connection.executemany("INSERT INTO elo_ratings (name, rating, game_num) VALUES (?, ?, ?)",
+                                    [(name, rating, game_num) for name, (rating, game_num) in ratings.items()])
+        self.connection.execute("DELETE FROM elo_state")
+        self.connection.execute("INSERT INTO elo_state (last_game_id) VALUES (?)", (last_game_id,))
+        self.connection.commit()
+
+        return {name: rating for name, (rating, game_num) in ratings.items()}
+
+    def calc_bayes_ratings(self, tournament=None, prior_draws=2, iterations=1000, tolerance=1e-9):
+        """Calculate Bradley-Terry ratings (as in BayesElo) from all stored games.
+        In contrast to Elo, the result does not depend on the order of the games.
+        A draw counts as half a win for both players. As a prior, every player gets
+        virtual draws against a virtual opponent of average strength.
+
+        arguments:
+        tournament -- The name of the tournament, None for the games of all tournaments.
+        prior_draws -- The number of virtual draws of each player.
+        iterations -- The maximum number of iterations of the minorization-maximization algorithm.
+        tolerance -- The iteration stops when no strength changes more than this.
+
+        return: The rating of every player on the Elo scale with an average of ELO_INITIAL_RATING (dict).
+        """
+        wins = {}
+        games = {}
+        for result in self.get_results(tournament):
+            player1, player2 = result["player1"], result["player2"]
+            score = score_player1(result["winner"])
+            wins[player1] = wins.get(player1, 0) + score
+            wins[player2] = wins.get(player2, 0) + 1 - score
+            pairing = tuple(sorted((player1, player2)))
+            games[pairing] = games.get(pairing, 0) + 1
+
+        names = list(wins)
+        if len(names) == 0:
+            return {}
+        strengths = {name: 1.0 for name in names}
+        for _ in range(iterations):
+            new_strengths = {}
+            for name in names:
+                # The virtual opponent always has the strength 1.
+                denominator = prior_draws / (strengths[name] + 1)
+                for (player1, player2), game_num in games.items():
+                    if name == player1:
+                        denominator += game_num / (strengths[name] + strengths[player2])
+                    elif name == player2:
+                        denominator += game_num / (strengths[name] + strengths[player1])
+                new_strengths[name] = (wins[name] + prior_draws / 2) / denominator
+            change = max(abs(new_strengths[name] - strengths[name]) for name in names)
+            strengths = new_strengths
+            if change < tolerance:
+                break
+
+        ratings = {name: 400 * math.log10(strength) for name, strength in strengths.items()}
+        average = sum(ratings.values()) / len(ratings)
+        return {name: rating - average + ELO_INITIAL_RATING for name, rating in ratings.items()}
+
+
+def score_player1(winner):
+    """Map the winner of a game to the score of the first player.
+
+    arguments:
+    winner -- The winner of the game (-1 for the first player, 1 for the second player, 0 for a draw).
+
+    return: 1 for a win, 0.5 for a draw, 0 for a loss.
+    """
+    if winner == -1:
+        return 1
+    if winner == 1:
+        return 0
+    return 0.5
+
+def print_ratings(ratings):
+    """Print the ratings sorted from the strongest to the weakest player.
+
+    arguments:
+    ratings -- The rating of every player (dict).
+    """
+    for name, rating in sorted(ratings.items(), key=lambda item: -item[1]):
+        print(f"{name}: {round(rating)}")
@@ -0,0 +1,142 @@
+import numpy as np
+from scipy import ndimage
+from scipy.special import expit
+from game import Game
+
+# Probability of a random move in the epsilon-greedy policy.
+EPSILON = 0.1
+# Temperature of the softmax policy in points of Game.calc_heuristic.
+SOFTMAX_TEMPERATURE = 5
+# Value of a hero card in points, which the hero-card-aware policies subtract from a move with a hero card.
+HERO_CARD_DISCOUNT = Game.HERO_CARD_DISCOUNT
+# Scaling factor that maps the heuristic value at the end of a truncated rollout to a win probability.
+WIN_PROBABILITY_SCALE = 0.02
+
+
+def calc_field_gains(state, moves, with_hero_cards=False):
+    """Calculate the immediate change of the points (sum of the squared field sizes) of the player to move for each move.
+    The change is calculated locally from the fields next to the new piece, without evaluating the whole board.
+
+    arguments:
+    state -- The game state.
+    moves -- The legal moves of the player to move.
+    with_hero_cards -- Whether a move with a hero card also gets the points that the opponent loses
+                       (without the splitting of the opponent's field) minus HERO_CARD_DISCOUNT.
+
+    return: The gains of the moves (array).
+    """
+    player = state.player_to_move
+    own_labels = ndimage.label(state.board == player)[0]
+    own_sizes = np.bincount(own_labels.ravel())
+    if with_hero_cards:
+        opponent_labels = ndimage.label(state.board == -player)[0]
+        opponent_sizes = np.bincount(opponent_labels.ravel())
+
+    gains = np.zeros(len(moves))
+    for i, move in enumerate(moves):
+        if move == None or move[0]:
+            continue
+        row, column = state.crown_position + np.array(move[2])
+        labels = set()
+        for neighbour_row, neighbour_column in [(row-1, column), (row+1, column), (row, column-1), (row, column+1)]:
+            if 0 <= neighbour_row < state.BOARD_SIZE and 0 <= neighbour_column < state.BOARD_SIZE:
+                labels.add(own_labels[neighbour_row, neighbour_column])
+        labels.discard(0)
+        joined_size = sum(own_sizes[label] for label in labels)
+        gains[i] = (joined_size + 1)**2 - sum(own_sizes[label]**2 for label in labels)
+        if with_hero_cards and move[1]:
+            opponent_size = opponent_sizes[opponent_labels[row, column]]
+            gains[i] += opponent_size**2 - (opponent_size - 1)**2 - HERO_CARD_DISCOUNT
+    return gains
+
+def choose_best(gains, rng):
+    """Choose the index of a move with the highest gain, ties are broken randomly.
+
+    arguments:
+    gains -- The gains of the moves.
+    rng -- The random number generator (random module or random.Random).
+
+    return: The index of the chosen move.
+    """
+    return rng.choice(np.flatnonzero(gains == gains.max()).tolist())
+
+def choose_random(state, moves, rng):
+    """Rollout policy that chooses a random move.
+
+    arguments:
+    state -- The game state.
+    moves -- The legal moves of the player to move.
+    rng -- The random number generator.
+
+    return: The chosen move.
+    """
+    return rng.choice(moves)
+
+def choose_epsilon_greedy(state, moves, rng):
+    """Rollout policy that chooses a random move with the probability EPSILON
+    and otherwise the move with the highest immediate gain of points.
+
+    arguments:
+    state -- The game state.
+    moves -- The legal moves of the player to move.
+    rng -- The random number generator.
+
+    return: The chosen move.
+    """
+    if len(moves) == 1 or rng.random() < EPSILON:
+        return rng.choice(moves)
+    return moves[choose_best(calc_field_gains(state, moves), rng)]
+
+def choose_hero_greedy(state, moves, rng):
+    """Rollout policy that chooses the move with the highest immediate gain of points,
+    where a move with a hero card also counts the points of the opponent and the value of the hero card.
+
+    arguments:
+    state -- The game state.
+    moves -- The legal moves of the player to move.
+    rng -- The random number generator.
+
+    return: The chosen move.
+    """
+    if len(moves) == 1:
+        return moves[0]
+    return moves[choose_best(calc_field_gains(state, moves, True), rng)]
+
+def choose_softmax(state, moves, rng):
+    """Rollout policy that chooses a move with probabilities from a softmax over the gains of the hero-card-aware policy.
+
+    arguments:
+    state -- The game state.
+    moves -- The legal moves of the player to move.
+    rng -- The random number generator.
+
+    return: The chosen move.
+    """
+    if len(moves) == 1:
+        return moves[0]
+    gains = calc_field_gains(state, moves, True) / SOFTMAX_TEMPERATURE
+    weights = np.exp(gains - gains.max())
+    return rng.choices(moves, weights=weights.tolist())[0]
+
+def sample_winner(state, rng, hero_card_discount=HERO_CARD_DISCOUNT):
+    """Score the end of a truncated rollout: the heuristic value is mapped to a win probability,
+    from which the winner is drawn, so that the statistics of the tree keep counting wins.
+
+    arguments:
+    state -- The game state at the end of the rollout.
+    rng -- The random number generator.
+    hero_card_discount -- The value of a hero card in the heuristic.
+
+    return: The drawn winner (-1 or 1).
+    """
+    win_probability = expit(WIN_PROBABILITY_SCALE * state.calc_heuristic(hero_card_discount, 1))
+    return 1 if rng.random() < win_probability else -1
+
+
+# The rollout policies by name, each is called with the game state, the legal moves and the random number generator.
+ROLLOUT_POLICIES = {
+    "random": choose_random,
+    "epsilon_greedy": choose_epsilon_greedy,
+    "hero_greedy": choose_hero_greedy,
+    "softmax": choose_softmax,
+}
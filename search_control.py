@@ -0,0 +1,136 @@
+import time
+import threading
+from contextlib import nullcontext
+
+
+class SearchCancelled(Exception):
+    """Raised inside a search when it has been cancelled."""
+    pass
+
+
+class SearchControl:
+    """Class to cancel a running search and to read its progress from another thread.
+    The search calls count_node for every visited node and report whenever it has a new best move.
+    With a SearchStats object (see search_stats.py), the search also reports its evaluations, cutoffs,
+    chance nodes and the time of its phases.
+    """
+
+    def __init__(self, stats=None):
+        """Create a control for a new search.
+
+        arguments:
+        stats -- An optional SearchStats, in which the statistics of the search are collected.
+        """
+        self.stats = stats
+        self.cancel_event = threading.Event()
+        self.lock = threading.Lock()
+        self.start_time = time.time()
+        self.node_num = 0
+        self.depth = 0
+        self.best_move = None
+        self.best_value = None
+        self.is_finished = False
+
+    def cancel(self):
+        """Cancel the search. The search stops at the next visited node.
+        """
+        self.cancel_event.set()
+
+    def is_cancelled(self):
+        """Whether the search has been cancelled.
+
+        return: Whether the search has been cancelled.
+        """
+        return self.cancel_event.is_set()
+
+    def count_node(self, depth=None):
+        """Count a visited node and stop the search if it has been cancelled.
+
+        arguments:
+        depth -- The remaining depth of the node, for the statistics.
+        """
+        self.node_num += 1
+        if self.stats != None:
+            self.stats.count_node(depth)
+        if self.cancel_event.is_set():
+            raise SearchCancelled()
+
+    def count_evaluation(self):
+        """Count an evaluation of a position for the statistics.
+        """
+        if self.stats != None:
+            self.stats.count_evaluation()
+
+    def count_chance_node(self):
+        """Count a chance node for the statistics.
+        """
+        if self.stats != None:
+            self.stats.count_chance_node()
+
+    def count_cutoff(self, depth, move_index, is_beta=True):
+        """Count a cutoff for the statistics.
+
+        arguments:
+        depth -- The remaining depth of the node.
+        move_index -- The index of the move that caused the cutoff.
+        is_beta -- Whether it is a beta cutoff or an alpha cutoff.
+        """
+        if self.stats != None:
+            self.stats.count_cutoff(depth, move_index, is_beta)
+
+    def timer(self, phase):
+        """Measure the time of a phase of the search for the statistics.
+
+        arguments:
+        phase -- The name of the phase (see search_stats.py).
+
+        return: A context manager for the phase.
+        """
+        if self.stats == None:
+            return nullcontext()
+        return self.stats.timer(phase)
+
+    def report(self, depth, best_move, best_value):
+        """Report the current result of the search.
+
+        arguments:
+        depth -- The search depth that is reached.
+        best_move -- The best move found so far.
+        best_value -- The value of the best move.
+        """
+        with self.lock:
+            self.depth = depth
+            self.best_move = best_move
+            self.best_value = best_value
+
+    def set_progress(self, progress):
+        """Take over the progress of a search that runs elsewhere, e.g. in another process.
+
+        arguments:
+        progress -- The progress as returned by get_progress.
+        """
+        with self.lock:
+            self.node_num = progress["node_num"]
+            self.depth = progress["depth"]
+            self.best_move = progress["best_move"]
+            self.best_value = progress["best_value"]
+
+    def finish(self):
+        """Mark the search as finished.
+        """
+        self.is_finished = True
+        if self.stats != None:
+            self.stats.total_time = time.time() - self.start_time
+
+    def get_progress(self):
+        """Return the progress of the search.
+
+        return: The reached depth, the number of visited nodes, the best move and its value,
+                the elapsed time and the nodes per second (dict).
+        """
+        with self.lock:
+            elapsed_time = time.time() - self.start_time
+            return {"depth": self.depth, "node_num": self.node_num, "best_move": self.best_move,
+                    "best_value": self.best_value, "time": elapsed_time,
+                    "nodes_per_second": self.node_num / elapsed_time if elapsed_time > 0 else 0,
+                    "is_finished": self.is_finished}
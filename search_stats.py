@@ -0,0 +1,150 @@
+import json
+import os
+import time
+from contextlib import contextmanager
+
+# Phases of the minimax-based searches and of the MCTS, whose time is measured.
+SEARCH_PHASES = ["move_generation", "evaluation", "copying"]
+MCTS_PHASES = ["selection", "expansion", "simulation", "backpropagation"]
+
+
+class SearchStats:
+    """Class to collect statistics of a search. It is attached to a SearchControl (see search_control.py),
+    through which the searches report their nodes, evaluations, cutoffs and chance nodes.
+    The nodes and cutoffs are counted by the remaining depth of the node (0 for the leaves),
+    the time is measured for each phase of the search.
+    """
+
+    def __init__(self):
+        """Create empty statistics.
+        """
+        self.node_num = 0
+        self.evaluation_num = 0
+        self.chance_node_num = 0
+        self.node_nums = {} # by remaining depth
+        self.beta_cutoffs = {} # by remaining depth
+        self.alpha_cutoffs = {} # by remaining depth
+        self.first_move_cutoff_num = 0
+        self.times = {}
+        self.tree_size = None
+        self.total_time = None
+
+    def count_node(self, depth=None):
+        """Count a visited node.
+
+        arguments:
+        depth -- The remaining depth of the node, None if the search has no depths (MCTS).
+        """
+        self.node_num += 1
+        if depth != None:
+            self.node_nums[depth] = self.node_nums.get(depth, 0) + 1
+
+    def count_evaluation(self):
+        """Count an evaluation of a position, at a leaf or for the move ordering.
+        """
+        self.evaluation_num += 1
+
+    def count_chance_node(self):
+        """Count a chance node whose drawn cards are all expanded.
+        """
+        self.chance_node_num += 1
+
+    def count_cutoff(self, depth, move_index, is_beta=True):
+        """Count a cutoff.
+
+        arguments:
+        depth -- The remaining depth of the node.
+        move_index -- The index of the move that caused the cutoff.
+        is_beta -- Whether it is a beta cutoff (in a node of the maximising player) or an alpha cutoff.
+        """
+        cutoffs = self.beta_cutoffs if is_beta else self.alpha_cutoffs
+        cutoffs[depth] = cutoffs.get(depth, 0) + 1
+        if move_index == 0:
+            self.first_move_cutoff_num += 1
+
+    def add_time(self, phase, seconds):
+        """Add the time of a phase.
+
+        arguments:
+        phase -- The name of the phase (see SEARCH_PHASES and MCTS_PHASES).
+        seconds -- The time in seconds.
+        """
+        self.times[phase] = self.times.get(phase, 0) + seconds
+
+    @contextmanager
+    def timer(self, phase):
+        """Measure the time of the enclosed block for a phase.
+
+        arguments:
+        phase -- The name of the phase.
+        """
+        start_time = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(phase, time.perf_counter() - start_time)
+
+    def calc_effective_branching_factor(self):
+        """Calculate the average number of children of a node from the number of nodes at the highest
+        and at the lowest remaining depth.
+
+        return: The effective branching factor, None if the search has less than two depths.
+        """
+        if len(self.node_nums) < 2:
+            return None
+        max_depth = max(self.node_nums)
+        min_depth = min(self.node_nums)
+        return (self.node_nums[min_depth] / self.node_nums[max_depth]) ** (1 / (max_depth - min_depth))
+
+    def merge(self, other):
+        """Add the statistics of another search, e.g. to summarise all moves of a game.
+
+        arguments:
+        other -- The other statistics.
+        """
+        self.node_num += other.node_num
+        self.evaluation_num += other.evaluation_num
+        self.chance_node_num += other.chance_node_num
+        self.first_move_cutoff_num += other.first_move_cutoff_num
+        for own, others in [(self.node_nums, other.node_nums), (self.beta_cutoffs, other.beta_cutoffs),
+                            (self.alpha_cutoffs, other.alpha_cutoffs), (self.times, other.times)]:
+            for key, value in others.items():
+                own[key] = own.get(key, 0) + value
+        if other.tree_size != None:
+            self.tree_size = max(self.tree_size or 0, other.tree_size)
+        if other.total_time != None:
+            self.total_time = (self.total_time or 0) + other.total_time
+
+    def to_dict(self):
+        """Return the statistics together with the derived values.
+
+        return: The statistics (dict with JSON-serializable values).
+        """
+        cutoff_num = sum(self.beta_cutoffs.values()) + sum(self.alpha_cutoffs.values())
+        return {
+            "node_num": self.node_num,
+            "evaluation_num": self.evaluation_num,
+            "chance_node_num": self.chance_node_num,
+            "node_nums_by_depth": {str(depth): num for depth, num in sorted(self.node_nums.items())},
+            "beta_cutoffs_by_depth": {str(depth): num for depth, num in sorted(self.beta_cutoffs.items())},
+            "alpha_cutoffs_by_depth": {str(depth): num for depth, num in sorted(self.alpha_cutoffs.items())},
+            "first_move_cutoff_rate": self.first_move_cutoff_num / cutoff_num if cutoff_num > 0 else None,
+            "effective_branching_factor": self.calc_effective_branching_factor(),
+            "times": dict(self.times),
+            "tree_size": self.tree_size,
+            "total_time": self.total_time,
+        }
+
+
+def save_stats(entries, path):
+    """Save collected statistics as JSON.
+
+    arguments:
+    entries -- The statistics (list of dicts, e.g. with the game, the move and the result of SearchStats.to_dict).
+    path -- The path of the file.
+    """
+    directory = os.path.dirname(path)
+    if directory != "":
+        os.makedirs(directory, exist_ok=True)
+    with open(path, "w") as file:
+        json.dump(entries, file, indent=4)
@@ -0,0 +1,152 @@
+import queue
+import threading
+import multiprocessing
+import player_registry
+import state_codec
+from ponder import Ponderer
+from search_control import SearchControl, SearchCancelled
+
+# Interval in seconds in which the worker process reports the progress of a running search.
+PROGRESS_INTERVAL = 0.1
+
+
+def run_worker(spec, request_queue, result_queue):
+    """Main loop of the worker process: create the player once and answer the requests of the GUI process
+    until it is closed. The player, its MCTS tree and its pondering cache stay in memory across moves.
+    The game states are sent in the compact encoding of state_codec.py together with their move history.
+
+    arguments:
+    spec -- The specification of the player (see player_registry.py).
+    request_queue -- The queue from which the requests are read.
+    result_queue -- The queue into which the progress reports and the results are written.
+    """
+    ponderer = Ponderer(player_registry.create_player(spec))
+    search_id = None
+    control = None
+
+    while True:
+        try:
+            request = request_queue.get(timeout=PROGRESS_INTERVAL)
+        except queue.Empty:
+            if control != None and not control.is_finished:
+                result_queue.put(("progress", search_id, control.get_progress()))
+            continue
+
+        if request[0] == "close":
+            ponderer.stop()
+            if control != None:
+                control.cancel()
+            return
+        elif request[0] == "ponder":
+            ponderer.start(state_codec.decode(request[1], request[2]))
+        elif request[0] == "stop":
+            ponderer.stop()
+        elif request[0] == "search":
+            search_id, data, hash_value, budget = request[1:]
+            state = state_codec.decode(data, hash_value)
+            control = SearchControl()
+            # The search runs in a thread of the worker process, so that it can still be cancelled.
+            search_thread = threading.Thread(target=search, args=(ponderer, state, budget, control, search_id, result_queue), daemon=True)
+            search_thread.start()
+        elif request[0] == "cancel":
+            if request[1] == search_id and control != None:
+                control.cancel()
+
+def search(ponderer, state, budget, control, search_id, result_queue):
+    """Search thread of the worker process: calculate a move and send it to the GUI process.
+
+    arguments:
+    ponderer -- The ponderer of the player.
+    state -- The game state, in which the player is to move.
+    budget -- An optional limit for the calculation (see player_registry.Player.choose_move).
+    control -- The SearchControl of the search.
+    search_id -- The number of the search.
+    result_queue -- The queue into which the result is written.
+    """
+    try:
+        move = ponderer.choose_move(state, budget, control)
+    except SearchCancelled:
+        control.finish()
+        result_queue.put(("cancelled", search_id))
+        return
+    control.finish()
+    result_queue.put(("move", search_id, move, control.get_progress()))
+
+
+class SearchWorker:
+    """Class to calculate the moves of a computer player in a separate process,
+    so that the search does not compete with the GUI for the GIL.
+    It offers the same methods as a Ponderer, so the GUI can use either of them.
+    """
+
+    def __init__(self, spec):
+        """Start the worker process for the given player.
+
+        arguments:
+        spec -- The specification of the player (see player_registry.py).
+        """
+        # "spawn" avoids forking the process of the GUI with its Tk interpreter.
+        context = multiprocessing.get_context("spawn")
+        self.request_queue = context.Queue()
+        self.result_queue = context.Queue()
+        self.search_id = 0
+        self.process = context.Process(target=run_worker, args=(spec, self.request_queue, self.result_queue), daemon=True)
+        self.process.start()
+
+    def start(self, state):
+        """Start pondering in the given position, in which the opponent is to move.
+
+        arguments:
+        state -- The current game state.
+        """
+        self.request_queue.put(("ponder", state_codec.encode(state), state.hash_value))
+
+    def stop(self):
+        """Stop pondering.
+        """
+        self.request_queue.put(("stop",))
+
+    def choose_move(self, state, budget=None, control=None):
+        """Let the worker process calculate the move of the player and wait for it.
+        While waiting, the progress of the search is copied into the given control,
+        and the search is cancelled as soon as the control is cancelled.
+
+        arguments:
+        state -- The current game state, in which the player is to move.
+        budget -- An optional limit for the calculation (see player_registry.Player.choose_move).
+        control -- An optional SearchControl for the search.
+
+        return: The chosen move.
+        """
+        self.search_id += 1
+        search_id = self.search_id
+        self.request_queue.put(("search", search_id, state_codec.encode(state), state.hash_value, budget))
+
+        while True:
+            if control != None and control.is_cancelled():
+                self.request_queue.put(("cancel", search_id))
+                raise SearchCancelled()
+            try:
+                result = self.result_queue.get(timeout=PROGRESS_INTERVAL)
+            except queue.Empty:
+                continue
+            # Messages of earlier, cancelled searches are skipped.
+            if result[1] != search_id:
+                continue
+            if result[0] == "progress":
+                if control != None:
+                    control.set_progress(result[2])
+            elif result[0] == "cancelled":
+                raise SearchCancelled()
+            else:
+                if control != None:
+                    control.set_progress(result[3])
+                return result[2]
+
+    def close(self):
+        """Stop the worker process.
+        """
+        self.request_queue.put(("close",))
+        self.process.join(timeout=1)
+        if self.process.is_alive():
+            self.process.terminate()
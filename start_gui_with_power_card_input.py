@@ -1,4 +1,5 @@
 from gui import GUI
 
-g = GUI(with_power_card_input=True)
-
+# The guard is needed because the search process of the GUI imports this file again.
+if __name__ == "__main__":
+    g = GUI(with_power_card_input=True)
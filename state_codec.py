@@ -0,0 +1,160 @@
+import numpy as np
+from game import Game
+import actions
+
+# Each power card is stored as a code from 1 to POWER_CARDS_NUM, 0 is an empty place in the hand.
+# The codes follow the order of the actions (see actions.py).
+CARDS = np.array([[0, 0]] + [actions.get_move_from_action(action)[2] for action in range(Game.POWER_CARDS_NUM)])
+CARD_OFFSET = Game.MAX_DISTANCE
+CARD_CODES = np.zeros((2*Game.MAX_DISTANCE+1, 2*Game.MAX_DISTANCE+1), dtype=np.uint8)
+CARD_CODES[CARDS[:, 0] + CARD_OFFSET, CARDS[:, 1] + CARD_OFFSET] = np.arange(len(CARDS))
+
+SQUARES_NUM = Game.BOARD_SIZE * Game.BOARD_SIZE
+BOARD_BYTES_NUM = (SQUARES_NUM + 7) // 8
+# Marks missing values of the last move (e.g. before the first move).
+NONE = 255
+
+# Fixed-size record of a game state (66 bytes).
+STATE_DTYPE = np.dtype([
+    ("board", np.uint8, (Game.PLAYER_NUM, BOARD_BYTES_NUM)),           # one bit per square for the pieces of each player
+    ("crown", np.uint8, (2,)),
+    ("hands", np.uint8, (Game.PLAYER_NUM, Game.POWER_CARDS_PLACES_NUM)), # card codes in the order of the places
+    ("hero_cards", np.uint8, (Game.PLAYER_NUM,)),
+    ("cards", np.uint8, (Game.POWER_CARDS_NUM,)),                        # the stack in its order, followed by the discard pile
+    ("drawable_num", np.uint8),
+    ("player_to_move", np.int8),
+    ("last_action", np.uint8),
+    ("last_drawn_card", np.uint8),
+    ("last_crown", np.uint8, (2,)),
+])
+
+
+def encode_cards(cards):
+    """Map power cards to their codes.
+
+    arguments:
+    cards -- An array of power cards (shape (..., 2)).
+
+    return: The card codes.
+    """
+    cards = np.asarray(cards, dtype=np.int64).reshape(-1, 2)
+    return CARD_CODES[cards[:, 0] + CARD_OFFSET, cards[:, 1] + CARD_OFFSET]
+
+def encode_batch(states):
+    """Encode game states into a structured array with one fixed-size record per state.
+    The move history in hash_value is not encoded (see decode).
+
+    arguments:
+    states -- The game states.
+
+    return: The records (structured array with STATE_DTYPE).
+    """
+    records = np.zeros(len(states), dtype=STATE_DTYPE)
+    if len(states) == 0:
+        return records
+
+    boards = np.array([state.board for state in states]).reshape(len(states), SQUARES_NUM)
+    records["board"][:, 0] = np.packbits(boards == -1, axis=1)
+    records["board"][:, 1] = np.packbits(boards == 1, axis=1)
+    records["crown"] = [state.crown_position for state in states]
+    records["hands"] = encode_cards([state.player_power_cards for state in states]).reshape(len(states), Game.PLAYER_NUM, Game.POWER_CARDS_PLACES_NUM)
+    records["hero_cards"] = [state.player_hero_cards_num for state in states]
+    records["player_to_move"] = [state.player_to_move for state in states]
+
+    for record, state in zip(records, states):
+        drawable_num = len(state.drawable_power_cards)
+        record["drawable_num"] = drawable_num
+        record["cards"][:drawable_num] = encode_cards(state.drawable_power_cards)
+        record["cards"][drawable_num:drawable_num+len(state.played_power_cards)] = encode_cards(state.played_power_cards)
+
+        record["last_action"] = NONE if state.last_crown_position is None else actions.get_action_from_move(state.last_move)
+        record["last_drawn_card"] = NONE if state.last_drawn_card is None else encode_cards(state.last_drawn_card)[0]
+        record["last_crown"] = NONE if state.last_crown_position is None else state.last_crown_position
+    return records
+
+def encode(state):
+    """Encode a game state into a fixed-size byte string.
+
+    arguments:
+    state -- The game state.
+
+    return: The encoded state (bytes of length STATE_DTYPE.itemsize).
+    """
+    return encode_batch([state]).tobytes()
+
+def decode_record(record, board, hash_value=None):
+    """Create a game state from a record.
+
+    arguments:
+    record -- The record (with STATE_DTYPE).
+    board -- The decoded board of the record.
+    hash_value -- The move history of the state. By default it is derived from the record,
+                  so that equal records get equal hash values in all processes.
+
+    return: The game state.
+    """
+    # The constructor is skipped, because it would shuffle and deal the cards.
+    state = Game.__new__(Game)
+    state.board = board
+    state.playable_pieces_num = Game.PIECES_NUM - int(np.count_nonzero(board))
+    drawable_num = int(record["drawable_num"])
+    state.drawable_power_cards = CARDS[record["cards"][:drawable_num]]
+    # Every card that is neither in a hand nor in the stack is in the discard pile.
+    played_num = Game.POWER_CARDS_NUM - int(np.count_nonzero(record["hands"])) - drawable_num
+    state.played_power_cards = CARDS[record["cards"][drawable_num:drawable_num+played_num]].astype(np.float64)
+    state.player_power_cards = CARDS[record["hands"]]
+    state.player_hero_cards_num = record["hero_cards"].astype(np.int64)
+    state.crown_position = record["crown"].astype(np.int64)
+    state.player_to_move = int(record["player_to_move"])
+
+    state.last_crown_position = None
+    state.last_move = None
+    state.last_drawn_card = None
+    if record["last_action"] != NONE:
+        state.last_crown_position = record["last_crown"].astype(np.int64)
+        state.last_move = actions.get_move_from_action(int(record["last_action"]))
+    if record["last_drawn_card"] != NONE:
+        state.last_drawn_card = CARDS[record["last_drawn_card"]]
+
+    state.hash_value = record.tobytes().hex() if hash_value == None else hash_value
+    state.valuations = None
+    return state
+
+def decode_batch(records, hash_values=None):
+    """Create game states from a structured array of records.
+
+    arguments:
+    records -- The records (structured array with STATE_DTYPE), e.g. a view of a shared buffer.
+    hash_values -- The move histories of the states (see decode_record).
+
+    return: The game states.
+    """
+    records = np.asarray(records, dtype=STATE_DTYPE)
+    boards = np.zeros((len(records), SQUARES_NUM))
+    boards[np.unpackbits(records["board"][:, 0], axis=1, count=SQUARES_NUM) == 1] = -1
+    boards[np.unpackbits(records["board"][:, 1], axis=1, count=SQUARES_NUM) == 1] = 1
+    boards = boards.reshape(len(records), Game.BOARD_SIZE, Game.BOARD_SIZE)
+    if hash_values == None:
+        hash_values = [None] * len(records)
+    return [decode_record(record, board, hash_value) for record, board, hash_value in zip(records, boards, hash_values)]
+
+def decode(data, hash_value=None):
+    """Create a game state from the result of encode.
+
+    arguments:
+    data -- The encoded state (bytes).
+    hash_value -- The move history of the state (see decode_record).
+
+    return: The game state.
+    """
+    return decode_batch(from_bytes(data), [hash_value])[0]
+
+def from_bytes(data):
+    """Interpret a buffer of records as a structured array without copying it.
+
+    arguments:
+    data -- A buffer (bytes, bytearray, memoryview, shared memory) that contains whole records.
+
+    return: The records (structured array with STATE_DTYPE), read-only for bytes.
+    """
+    return np.frombuffer(data, dtype=STATE_DTYPE)
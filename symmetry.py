@@ -0,0 +1,191 @@
+import copy
+import numpy as np
+from game import Game
+
+# The eight symmetries of the square board (rotations and reflections, the dihedral group D4) as matrices
+# that act on positions relative to the center and on power cards. The first one is the identity.
+TRANSFORMATIONS = [np.array(matrix) for matrix in [
+    [[1, 0], [0, 1]],
+    [[0, -1], [1, 0]],
+    [[-1, 0], [0, -1]],
+    [[0, 1], [-1, 0]],
+    [[1, 0], [0, -1]],
+    [[-1, 0], [0, 1]],
+    [[0, 1], [1, 0]],
+    [[0, -1], [-1, 0]],
+]]
+IDENTITY = 0
+TRANSFORMATIONS_NUM = len(TRANSFORMATIONS)
+
+CENTER = np.array([Game.BOARD_SIZE//2] * 2)
+
+
+def inverse(transformation):
+    """Return the symmetry that undoes the given one.
+
+    arguments:
+    transformation -- The index of the symmetry in TRANSFORMATIONS.
+
+    return: The index of the inverse symmetry.
+    """
+    for i, matrix in enumerate(TRANSFORMATIONS):
+        if np.array_equal(matrix @ TRANSFORMATIONS[transformation], TRANSFORMATIONS[IDENTITY]):
+            return i
+
+def compose(first, second):
+    """Return the symmetry that applies two symmetries one after the other.
+
+    arguments:
+    first -- The index of the symmetry that is applied first.
+    second -- The index of the symmetry that is applied second.
+
+    return: The index of the combined symmetry.
+    """
+    matrix = TRANSFORMATIONS[second] @ TRANSFORMATIONS[first]
+    for i, other_matrix in enumerate(TRANSFORMATIONS):
+        if np.array_equal(matrix, other_matrix):
+            return i
+
+# For every square of the transformed board the square of the original board it comes from.
+BOARD_INDICES = []
+for transformation in range(TRANSFORMATIONS_NUM):
+    positions = np.indices((Game.BOARD_SIZE, Game.BOARD_SIZE)).reshape(2, -1).T
+    original_positions = (positions - CENTER) @ TRANSFORMATIONS[inverse(transformation)].T + CENTER
+    BOARD_INDICES.append((original_positions[:, 0].reshape(Game.BOARD_SIZE, Game.BOARD_SIZE),
+                          original_positions[:, 1].reshape(Game.BOARD_SIZE, Game.BOARD_SIZE)))
+
+
+def transform_cards(cards, transformation):
+    """Apply a symmetry to power cards or other direction vectors.
+
+    arguments:
+    cards -- An array of power cards (shape (n, 2)) or a single power card.
+    transformation -- The index of the symmetry in TRANSFORMATIONS.
+
+    return: The transformed power cards with the same dtype.
+    """
+    cards = np.asarray(cards)
+    return (cards @ TRANSFORMATIONS[transformation].T).astype(cards.dtype)
+
+def transform_position(position, transformation):
+    """Apply a symmetry to a square of the board.
+
+    arguments:
+    position -- The coordinates of the square.
+    transformation -- The index of the symmetry in TRANSFORMATIONS.
+
+    return: The coordinates of the transformed square.
+    """
+    position = np.asarray(position)
+    return ((position - CENTER) @ TRANSFORMATIONS[transformation].T + CENTER).astype(position.dtype)
+
+def transform_board(board, transformation):
+    """Apply a symmetry to the board.
+
+    arguments:
+    board -- The board (array of shape (BOARD_SIZE, BOARD_SIZE)).
+    transformation -- The index of the symmetry in TRANSFORMATIONS.
+
+    return: The transformed board.
+    """
+    return board[BOARD_INDICES[transformation]]
+
+def transform_move(move, transformation):
+    """Apply a symmetry to a move. Drawing a card and sitting out are not changed.
+
+    arguments:
+    move -- The move.
+    transformation -- The index of the symmetry in TRANSFORMATIONS.
+
+    return: The transformed move.
+    """
+    if move == None or move[0]:
+        return move
+    return (False, move[1], list(transform_cards(np.array(move[2]), transformation)))
+
+def transform_state(state, transformation, copy_state=True):
+    """Apply a symmetry to a game state.
+    The move history in hash_value is kept, so only position_key identifies the transformed position.
+
+    arguments:
+    state -- The game state.
+    transformation -- The index of the symmetry in TRANSFORMATIONS.
+    copy_state -- Whether all attributes are copied. Without a deep copy, only the transformed arrays are new
+                  and the returned state must not be modified.
+
+    return: The transformed game state.
+    """
+    new_state = copy.deepcopy(state) if copy_state else copy.copy(state)
+    new_state.board = transform_board(state.board, transformation)
+    new_state.crown_position = transform_position(state.crown_position, transformation)
+    new_state.player_power_cards = transform_cards(state.player_power_cards, transformation)
+    new_state.drawable_power_cards = transform_cards(state.drawable_power_cards, transformation)
+    new_state.played_power_cards = transform_cards(state.played_power_cards, transformation)
+    if state.last_crown_position is not None:
+        new_state.last_crown_position = transform_position(state.last_crown_position, transformation)
+    if state.last_drawn_card is not None:
+        new_state.last_drawn_card = transform_cards(state.last_drawn_card, transformation)
+    new_state.last_move = transform_move(state.last_move, transformation)
+    return new_state
+
+def canonicalize(state):
+    """Determine the symmetry that maps a state to its canonical representative,
+    which is the symmetric position with the smallest position key.
+    All eight symmetric positions get the same canonical key.
+
+    arguments:
+    state -- The game state.
+
+    return: The canonical position key, the index of the symmetry that leads to it.
+    """
+    best_key = None
+    best_transformation = None
+    for transformation in range(TRANSFORMATIONS_NUM):
+        key = transform_state(state, transformation, copy_state=False).position_key()
+        if best_key == None or key < best_key:
+            best_key = key
+            best_transformation = transformation
+    return best_key, best_transformation
+
+def canonical_key(state):
+    """Return the key that is shared by a position and all its symmetric positions.
+
+    arguments:
+    state -- The game state.
+
+    return: The canonical position key.
+    """
+    return canonicalize(state)[0]
+
+def canonical_state(state):
+    """Return the canonical representative of a state.
+
+    arguments:
+    state -- The game state.
+
+    return: The canonical game state (a copy), the index of the symmetry that leads to it.
+    """
+    transformation = canonicalize(state)[1]
+    return transform_state(state, transformation), transformation
+
+def to_canonical_move(move, transformation):
+    """Map a move in the original position to the canonical position.
+
+    arguments:
+    move -- The move in the original position.
+    transformation -- The symmetry returned by canonicalize for the original position.
+
+    return: The move in the canonical position.
+    """
+    return transform_move(move, transformation)
+
+def from_canonical_move(move, transformation):
+    """Map a move in the canonical position back to the original position.
+
+    arguments:
+    move -- The move in the canonical position.
+    transformation -- The symmetry returned by canonicalize for the original position.
+
+    return: The move in the original position.
+    """
+    return transform_move(move, inverse(transformation))
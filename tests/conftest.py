@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The modules of the project lie in the root directory of the repository.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,43 @@
+import arena
+import player_registry
+from results_store import ResultStore
+
+
+RANDOM_PLAYER = {"mode": "random"}
+
+
+def test_play_game_is_reproducible():
+    result1 = arena.play_game(RANDOM_PLAYER, RANDOM_PLAYER, seed=3)
+    result2 = arena.play_game(RANDOM_PLAYER, RANDOM_PLAYER, seed=3)
+    assert result1["moves"] == result2["moves"]
+    assert result1["winner"] == result2["winner"]
+    assert len(result1["move_times"]) == len(result1["moves"])
+
+
+def test_play_games_only_reports_the_games_of_the_run(tmp_path, monkeypatch):
+    reported = []
+    monkeypatch.setattr(arena, "print_results", reported.append)
+    store = ResultStore(str(tmp_path / "results.db"))
+
+    arena.play_games(3, RANDOM_PLAYER, RANDOM_PLAYER, store, "run", seed=0)
+    arena.play_games(1, RANDOM_PLAYER, RANDOM_PLAYER, store, "run", seed=0)
+    store.close()
+
+    assert len(reported[0]) == 3
+    assert [result["index"] for result in reported[1]] == [0]
+
+
+def test_print_results_without_moves(capsys):
+    arena.print_results([])
+    assert "Average time player 1: 0" in capsys.readouterr().out
+
+
+def test_only_pondering_players_ponder(monkeypatch):
+    calls = []
+    record_call = lambda self, state, duration=None: calls.append(self.MODE)
+    monkeypatch.setattr(player_registry.Player, "ponder", record_call)
+    monkeypatch.setattr(player_registry.PonderingPlayer, "ponder", record_call)
+    pondering_player = {"mode": "ponder", "player": {"mode": "random"}}
+    arena.play_game(RANDOM_PLAYER, pondering_player, seed=4)
+    assert len(calls) > 0
+    assert set(calls) == {"ponder"}
@@ -0,0 +1,58 @@
+import pytest
+import benchmark
+from game import Game
+from search_control import SearchControl
+
+
+def test_positions_are_reproducible():
+    positions = benchmark.create_positions(seed=3, position_num=3)
+    same_positions = benchmark.create_positions(seed=3, position_num=3)
+    for phase, piece_num in benchmark.PHASES.items():
+        assert len(positions[phase]) == 3
+        for state, same_state in zip(positions[phase], same_positions[phase]):
+            assert state.position_key() == same_state.position_key()
+            assert Game.PIECES_NUM - state.playable_pieces_num >= piece_num
+            assert not state.is_game_over()
+    for state in benchmark.create_terminal_positions(seed=3, position_num=3):
+        assert state.is_game_over()
+
+
+def test_game_benchmarks():
+    positions = benchmark.create_positions(position_num=2)
+    results = benchmark.run_game_benchmarks(positions, benchmark.create_terminal_positions(position_num=2))
+    for phase in benchmark.PHASES:
+        for name in ["get_legal_moves", "execute_move", "calc_valuations", "determine_winner", "deepcopy",
+                     "get_obs_model2", "get_obs_model5", "valid_action_mask"]:
+            assert results[f"{phase}/{name}"]["value"] > 0
+    assert results["terminal/determine_winner"]["unit"] == "us"
+    assert not any(result["higher_is_better"] for result in results.values())
+
+
+@pytest.mark.parametrize("mode", list(benchmark.SEARCH_DEPTHS) + ["mcts"])
+def test_searches_count_nodes(monkeypatch, mode):
+    if mode == "mcts":
+        monkeypatch.setattr(benchmark, "MCTS_SIMULATION_BUDGET", 5)
+    else:
+        monkeypatch.setitem(benchmark.SEARCH_DEPTHS, mode, 1)
+    state = benchmark.create_positions(position_num=1)["midgame"][0]
+    control = SearchControl()
+    benchmark.run_search(mode, state, control)
+    assert control.node_num > 0
+
+
+def test_compare_reports(tmp_path):
+    baseline = {"results": {"time": {"value": 10, "unit": "us", "higher_is_better": False},
+                            "rate": {"value": 100, "unit": "nodes/s", "higher_is_better": True},
+                            "old": {"value": 1, "unit": "us", "higher_is_better": False}}}
+    report = {"results": {"time": {"value": 20, "unit": "us", "higher_is_better": False},
+                          "rate": {"value": 110, "unit": "nodes/s", "higher_is_better": True},
+                          "new": {"value": 1, "unit": "us", "higher_is_better": False}}}
+    path = str(tmp_path / "benchmarks" / "baseline.json")
+    benchmark.save_report(baseline, path)
+    comparisons = {comparison["name"]: comparison for comparison in benchmark.compare_reports(report, benchmark.load_report(path))}
+    assert set(comparisons) == {"time", "rate"}
+    assert comparisons["time"]["change"] == pytest.approx(-0.5)
+    assert comparisons["time"]["is_regression"]
+    assert comparisons["rate"]["change"] == pytest.approx(0.1)
+    assert not comparisons["rate"]["is_regression"]
+    assert not benchmark.compare_reports(report, baseline, threshold=0.6)[0]["is_regression"]
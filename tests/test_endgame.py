@@ -0,0 +1,90 @@
+import copy
+import random
+import numpy as np
+import pytest
+import players
+import endgame
+from game import Game
+
+
+def play_until_endgame(seed, threshold):
+    random.seed(seed)
+    np.random.seed(seed)
+    state = Game()
+    while not state.is_game_over() and not endgame.is_endgame(state, threshold):
+        state.execute_move(players.random(state, state.player_to_move), state.player_to_move)
+    return state
+
+
+def expectimax(state, values=None):
+    """Value of the position for the player to move, searched without any pruning."""
+    if values == None:
+        values = {}
+    key = state.position_key()
+    if key not in values:
+        winner = state.determine_winner()
+        if winner != None:
+            values[key] = winner * state.player_to_move
+        else:
+            player = state.player_to_move
+            values[key] = max(move_value(state, move, player, values) for move in state.get_legal_moves(player))
+    return values[key]
+
+
+def move_value(state, move, player, values=None):
+    if move == None or not move[0]:
+        child_state = copy.deepcopy(state)
+        child_state.execute_move(move, player)
+        return -expectimax(child_state, values)
+    child_values = []
+    for power_card_index in range(len(state.drawable_power_cards)):
+        child_state = copy.deepcopy(state)
+        child_state.execute_move(move, player, power_card_index)
+        child_values.append(-expectimax(child_state, values))
+    return sum(child_values) / len(child_values)
+
+
+ENDGAMES = [(seed, 1) for seed in [0, 2, 3, 4, 5]] + [(1, 2), (2, 2)]
+
+
+@pytest.mark.parametrize("seed, threshold", ENDGAMES)
+def test_solver_matches_expectimax(seed, threshold):
+    state = play_until_endgame(seed, threshold)
+    assert not state.is_game_over()
+    solver = endgame.EndgameSolver(node_limit=None)
+    value, move = solver.solve(state)
+    assert value == pytest.approx(expectimax(state))
+    assert move_value(state, move, state.player_to_move) == pytest.approx(value)
+    # The second search is answered from the cache.
+    assert solver.solve(state) == (value, move)
+
+
+@pytest.mark.parametrize("seed, threshold", ENDGAMES)
+@pytest.mark.parametrize("alpha, beta", [(-2, -0.5), (-0.5, 0.5), (0.5, 2)])
+def test_bounds_outside_the_window(seed, threshold, alpha, beta):
+    state = play_until_endgame(seed, threshold)
+    exact_value = expectimax(state)
+    value = endgame.EndgameSolver(node_limit=None).search(state, alpha, beta)[0]
+    if exact_value <= alpha:
+        assert value <= alpha
+    elif exact_value >= beta:
+        assert value >= beta
+    else:
+        assert value == pytest.approx(exact_value)
+
+
+def test_node_limit():
+    state = play_until_endgame(4, 2)
+    solver = endgame.EndgameSolver(node_limit=10)
+    assert solver.try_solve(state) == None
+    with pytest.raises(endgame.EndgameTooLarge):
+        solver.solve(state)
+
+
+def test_evaluate_in_heuristic_units():
+    state = play_until_endgame(0, 1)
+    solver = endgame.EndgameSolver(node_limit=None)
+    value = solver.solve(state)[0]
+    player = state.player_to_move
+    assert solver.evaluate(state, player) == value * endgame.WIN_VALUE
+    assert solver.evaluate(state, -player) == -value * endgame.WIN_VALUE
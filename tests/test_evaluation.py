@@ -0,0 +1,89 @@
+import copy
+import random
+import numpy as np
+import pytest
+import players
+import texel_tuning
+from evaluation import Evaluator, FEATURE_NAMES, FEATURE_NUM, WIN_VALUE, calc_features
+from game import Game
+
+
+def random_positions(seed):
+    random.seed(seed)
+    np.random.seed(seed)
+    state = Game()
+    positions = [copy.deepcopy(state)]
+    while not state.is_game_over():
+        state.execute_move(players.random(state, state.player_to_move), state.player_to_move)
+        positions.append(copy.deepcopy(state))
+    return positions[::10] + [positions[-1]]
+
+
+POSITIONS = random_positions(0) + random_positions(1)
+
+
+def test_default_weights_equal_calc_heuristic():
+    evaluator = Evaluator()
+    assert evaluator.has_integer_values()
+    for state in POSITIONS:
+        for player in [-1, 1]:
+            assert evaluator.evaluate(state, player) == state.calc_heuristic(Game.HERO_CARD_DISCOUNT, player)
+            assert evaluator.evaluate(state, player, with_inf=True) == state.calc_heuristic(Game.HERO_CARD_DISCOUNT, player, with_inf=True)
+
+
+def test_features_are_antisymmetric():
+    for state in POSITIONS:
+        features = calc_features(state, -1)
+        assert features.shape == (FEATURE_NUM,)
+        assert np.allclose(features, -calc_features(state, 1))
+
+
+def test_weights():
+    with pytest.raises(ValueError):
+        Evaluator({"points": 1, "unknown": 2})
+    assert not Evaluator({"points": 1.5}).has_integer_values()
+    assert not Evaluator({"hero_cards_phase": 1}).has_integer_values()
+    assert Evaluator({"hero_cards_phase": Game.PIECES_NUM}).has_integer_values()
+
+
+def test_save_and_load(tmp_path):
+    weights = {name: index + 0.5 for index, name in enumerate(FEATURE_NAMES)}
+    path = str(tmp_path / "weights" / "evaluation.json")
+    Evaluator(weights).save(path)
+    evaluator = Evaluator.load(path)
+    assert evaluator.get_weights() == weights
+    state = POSITIONS[5]
+    assert evaluator.evaluate(state, 1) == pytest.approx(calc_features(state, 1) @ list(weights.values()))
+    assert evaluator.evaluate(POSITIONS[-1], 1, with_inf=True) in [WIN_VALUE, -WIN_VALUE, evaluator.evaluate(POSITIONS[-1], 1)]
+
+
+def test_error_gradient():
+    rng = np.random.default_rng(0)
+    features = rng.normal(size=(50, FEATURE_NUM))
+    results = rng.choice([0, 0.5, 1], size=50)
+    weights = rng.normal(size=FEATURE_NUM)
+    error, gradient = texel_tuning.calc_error(weights, features, results, 0.5)
+    epsilon = 1e-6
+    for i in range(FEATURE_NUM):
+        shifted_weights = weights.copy()
+        shifted_weights[i] += epsilon
+        numerical_gradient = (texel_tuning.calc_error(shifted_weights, features, results, 0.5)[0] - error) / epsilon
+        assert gradient[i] == pytest.approx(numerical_gradient, rel=1e-3, abs=1e-6)
+
+
+def test_tuning_reduces_the_error():
+    rng = np.random.default_rng(0)
+    features = rng.normal(size=(2000, FEATURE_NUM))
+    # The results also depend on the mobility, which is not part of the default weights.
+    true_weights = Evaluator({"points": 1, "hero_cards": Game.HERO_CARD_DISCOUNT, "mobility": 20}).weights
+    results = (rng.random(2000) < texel_tuning.sigmoid(features @ true_weights, 0.05)).astype(np.float64)
+    evaluator, start_error, error = texel_tuning.tune(features, results)
+    assert error < start_error
+    assert evaluator.get_weights()["mobility"] > 5
+
+
+def test_positions_with_other_features(tmp_path):
+    path = str(tmp_path / "positions.npz")
+    np.savez_compressed(path, features=np.zeros((1, 2)), results=np.zeros(1), feature_names=np.array(["points", "pieces"]))
+    with pytest.raises(ValueError):
+        texel_tuning.load_positions(path)
@@ -0,0 +1,40 @@
+import numpy as np
+import pytest
+import expert_iteration
+from expert_iteration import ShardWriter
+
+
+def make_rows(start, length, obs_size=3, action_num=4):
+    return {"obs": np.arange(start, start + length, dtype=np.float32).repeat(obs_size).reshape(length, obs_size),
+            "mask": np.ones((length, action_num), dtype=bool),
+            "action": np.arange(start, start + length, dtype=np.int16) % action_num,
+            "value": np.arange(start, start + length, dtype=np.float32)}
+
+
+@pytest.mark.parametrize("compress", [True, False])
+def test_shards_contain_every_position_once(tmp_path, compress):
+    writer = ShardWriter(str(tmp_path), 3, 4, shard_size=4, compress=compress)
+    writer.write(make_rows(0, 3))
+    writer.write(make_rows(3, 7))
+    writer.close()
+    assert writer.total_row_num == 10
+    assert len(expert_iteration.list_shards(str(tmp_path))) == 3
+
+    values = np.concatenate([batch["value"] for batch in expert_iteration.iterate_batches(str(tmp_path), 3, seed=0)])
+    assert sorted(values) == list(range(10))
+    batches = list(expert_iteration.iterate_batches(str(tmp_path), 3, shuffle=False))
+    assert np.array_equal(np.concatenate([batch["value"] for batch in batches]), np.arange(10))
+    assert all(np.array_equal(batch["obs"][:, 0], batch["value"]) for batch in batches)
+
+
+@pytest.mark.parametrize("augment", [False, True])
+def test_play_game_records_search_moves(augment):
+    expert_iteration.init_worker("alphabeta", {"depth": 1, "hero_card_discount": 30}, 2, augment)
+    rows = expert_iteration.play_game((0, 0))
+    length = len(rows["action"])
+    assert length > 0
+    assert rows["obs"].shape[0] == rows["mask"].shape[0] == rows["value"].shape[0] == length
+    assert np.all(rows["mask"][np.arange(length), rows["action"]])
+    assert np.all(np.abs(rows["value"]) <= 1)
+    if augment:
+        assert length % 8 == 0
@@ -0,0 +1,83 @@
+import copy
+import random
+import numpy as np
+import pytest
+import players
+import arena
+import player_registry
+import game_record
+from game import Game
+from game_record import GameRecord
+
+
+def record_random_game(seed):
+    random.seed(seed)
+    np.random.seed(seed)
+    state = Game()
+    record = GameRecord.start(state, {"seed": seed})
+    positions = [copy.deepcopy(state)]
+    while not state.is_game_over():
+        state.execute_move(players.random(state, state.player_to_move), state.player_to_move)
+        record.add_move(state)
+        positions.append(copy.deepcopy(state))
+    return record, positions
+
+
+def test_replay_reconstructs_every_position():
+    record, positions = record_random_game(0)
+    assert len(record) == len(positions) - 1
+    assert any(card != game_record.NO_CARD for card in record.drawn_cards)
+    for ply in [0, 1, 10, len(record) // 2, None]:
+        # The stack is shuffled again when it is empty, so only the position key is reconstructed, not the order of the cards.
+        assert record.replay(ply).position_key() == positions[-1 if ply == None else ply].position_key()
+    for ply, (state, move) in enumerate(record.positions()):
+        assert state.position_key() == positions[ply].position_key()
+        assert move == record.get_moves()[ply]
+    assert record.replay().determine_winner() == positions[-1].determine_winner()
+
+
+def test_save_and_load(tmp_path):
+    records = [record_random_game(seed)[0] for seed in range(3)] + [GameRecord.start(Game(), {"empty": True})]
+    path = str(tmp_path / "records" / "games.npz")
+    game_record.save_records(records, path)
+    loaded_records = game_record.load_records(path)
+    assert len(loaded_records) == len(records)
+    for record, loaded_record in zip(records, loaded_records):
+        assert loaded_record.deal == record.deal
+        assert loaded_record.moves == record.moves
+        assert loaded_record.drawn_cards == record.drawn_cards
+        assert loaded_record.info == record.info
+        assert loaded_record.replay().position_key() == record.replay().position_key()
+
+
+def test_arena_records_the_game():
+    player = {"mode": "random"}
+    result = arena.play_game(player, player, 1, seed=3)
+    record = result["record"]
+    assert len(record) == len(result["moves"])
+    assert record.info["seed"] == 3
+    assert record.info["winner"] == result["winner"]
+    assert record.replay().determine_winner() == result["winner"]
+    assert record.replay(0).player_to_move == 1
+
+
+def test_analysis_flags_only_chosen_moves():
+    record = record_random_game(1)[0]
+    record = GameRecord(record.deal, record.moves[:30], record.drawn_cards[:30])
+    game_record.init_worker({"mode": "pvs", "depth": 1, "hero_card_discount": 30}, 10)
+    analysis = game_record.analyse_game((record, 0))
+    assert len(analysis) == len(record)
+    for position, (state, move) in zip(analysis, record.positions()):
+        assert position["move"] == move
+        assert position["player"] == state.player_to_move
+        if position["move"] != None and position["move"][0]:
+            assert not position["is_blunder"]
+        if position["is_blunder"]:
+            assert position["loss"] >= 10
+    # Random moves lose value against a searching engine.
+    assert any(position["is_blunder"] for position in analysis)
+
+
+def test_analysis_needs_values():
+    with pytest.raises(ValueError):
+        game_record.evaluate_position(player_registry.create_player({"mode": "random"}), Game())
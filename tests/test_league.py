@@ -0,0 +1,55 @@
+import random
+import numpy as np
+import player_registry
+import symmetry
+from game import Game
+from game_env import GameEnv
+from league import OpponentPool, LeagueVecEnv
+
+
+def test_results_are_counted():
+    pool = OpponentPool()
+    opponent = pool.add_random()
+    for result in [1, 0, -1, -1]:
+        pool.record_result(opponent, result)
+    assert pool.get_stats() == [{"name": "random", "game_num": 4, "win_rate": 0.25, "draw_rate": 0.25}]
+
+
+def test_prioritized_sampling_prefers_strong_opponents():
+    pool = OpponentPool()
+    weak_opponent = pool.add_random()
+    strong_opponent = pool.add_alphabeta(1)
+    for _ in range(20):
+        pool.record_result(weak_opponent, 1)
+        pool.record_result(strong_opponent, -1)
+    random.seed(0)
+    samples = [pool.sample()["name"] for _ in range(200)]
+    assert samples.count(strong_opponent["name"]) > 150
+
+
+def test_symmetric_positions_are_answered_from_the_cache(monkeypatch):
+    pool = OpponentPool()
+    opponent = pool.add_alphabeta(1)
+    np.random.seed(0)
+    state = Game()
+    move = pool.choose_move(opponent, state)
+
+    # A symmetric position must not be searched again.
+    monkeypatch.setattr(player_registry, "get_player", None)
+    transformed_move = pool.choose_move(opponent, symmetry.transform_state(state, 5))
+    assert str(transformed_move) == str(symmetry.transform_move(move, 5))
+
+
+def test_league_env_plays_episodes_against_the_pool():
+    pool = OpponentPool()
+    pool.add_random()
+    env = LeagueVecEnv([lambda: GameEnv(model=2)] * 2, pool)
+    env.seed(0)
+    env.reset()
+    random.seed(0)
+    episode_num = 0
+    while episode_num < 4:
+        actions = [random.choice(np.flatnonzero(game_env.valid_action_mask())) for game_env in env.get_attr("unwrapped")]
+        dones = env.step(np.array(actions))[2]
+        episode_num += int(np.sum(dones))
+    assert pool.get_stats()[0]["game_num"] >= 4
@@ -0,0 +1,303 @@
+import math
+import random
+import numpy as np
+import pytest
+import actions
+import benchmark
+import endgame
+import monte_carlo
+import players
+from game import Game
+from monte_carlo import MonteCarlo
+from monte_carlo_node import MonteCarloNode
+from search_control import SearchControl, SearchCancelled
+
+
+@pytest.fixture
+def state():
+    np.random.seed(0)
+    return Game()
+
+
+@pytest.mark.parametrize("policy", ["robust child", "max child"])
+def test_best_move_info_with_unvisited_child(state, policy):
+    mcts = MonteCarlo(seed=0)
+    mcts.make_node(state)
+    root = mcts.nodes[state.hash_value]
+    child = mcts.expand(root)
+
+    info = mcts.best_move_info(state, policy)
+    assert info["move"] == child.move
+    assert info["move_num"] == 0
+    assert info["win_rate"] == None
+    assert info["win_rate_error"] == None
+    assert info["expanded_num"] == 1
+
+
+def test_best_move_info_counts_expanded_moves(state):
+    mcts = MonteCarlo(seed=0)
+    mcts.run_search(state, None, simulation_budget=30)
+    root = mcts.nodes[state.hash_value]
+
+    info = mcts.best_move_info(state)
+    assert info["expanded_num"] == root.expanded_num()
+    assert info["move_num"] == max(child["node"].move_num for child in root.children.values() if child["node"] != None)
+    assert 0 <= info["win_rate"] <= 1
+
+
+def test_simulation_budget_is_reproducible(state):
+    moves = []
+    for _ in range(2):
+        np.random.seed(1)
+        mcts = MonteCarlo(seed=0)
+        stats = mcts.run_search(state, None, simulation_budget=50)
+        assert stats["simulation"] == 50
+        moves.append(mcts.best_move(state))
+    assert moves[0] == moves[1]
+
+
+@pytest.fixture
+def midgame_state():
+    return benchmark.create_positions(position_num=1)["midgame"][0]
+
+
+def chance_nodes(mcts):
+    return [node for node in set(mcts.nodes.values()) if node.is_chance_node]
+
+
+def test_chance_node_outcomes_are_cards_of_the_stack(midgame_state):
+    mcts = MonteCarlo(seed=0)
+    mcts.run_search(midgame_state, None, simulation_budget=200)
+    nodes = chance_nodes(mcts)
+    assert len(nodes) > 0
+    for node in nodes:
+        stack = node.state.drawable_power_cards
+        assert node.all_moves() == list(range(len(stack)))
+        for child in node.children.values():
+            if child["node"] != None:
+                assert np.array_equal(child["node"].state.last_drawn_card, stack[child["move"]])
+
+
+@pytest.mark.parametrize("widening_param, widening_exponent", [(1, 0.5), (2, 0.25)])
+def test_progressive_widening_limits_the_drawn_cards(midgame_state, widening_param, widening_exponent):
+    mcts = MonteCarlo(widening_param=widening_param, widening_exponent=widening_exponent, seed=0)
+    mcts.run_search(midgame_state, None, simulation_budget=300)
+    for node in chance_nodes(mcts):
+        # Once all expanded cards are proven, the next card is expanded regardless of the limit.
+        if all(child["node"] == None or child["node"].proven_value == None for child in node.children.values()):
+            assert node.expanded_num() <= math.ceil(widening_param * max(node.move_num, 1)**widening_exponent)
+    assert max(node.expanded_num() for node in chance_nodes(mcts)) > 1
+
+
+def test_without_widening_every_card_is_expanded(midgame_state):
+    mcts = MonteCarlo(widening_param=None, seed=0)
+    mcts.run_search(midgame_state, None, simulation_budget=300)
+    for node in chance_nodes(mcts):
+        # The first visit creates the chance node, every further one draws a new card.
+        if node.move_num > len(node.children):
+            assert node.is_fully_expanded()
+
+
+def test_sample_outcome(midgame_state):
+    mcts = MonteCarlo(seed=0)
+    mcts.run_search(midgame_state, None, simulation_budget=200)
+    node = max([node for node in chance_nodes(mcts) if not node.is_fully_expanded()], key=lambda node: node.expanded_num())
+    unexpanded_moves = node.unexpanded_moves()
+    expanded_moves = [move for move in node.all_moves() if move not in unexpanded_moves]
+    assert len(expanded_moves) > 1
+    assert all(node.sample_outcome(True, mcts.random) in expanded_moves for _ in range(20))
+    assert all(node.sample_outcome(False, mcts.random) in unexpanded_moves for _ in range(20))
+    empty_node = MonteCarloNode(None, None, node.state, [], True)
+    assert empty_node.sample_outcome(True, mcts.random) == None
+    assert empty_node.sample_outcome(False, mcts.random) == None
+
+
+def test_rave_blends_the_amaf_win_rate(state):
+    player = state.player_to_move
+    move = state.get_legal_moves(player)[0]
+    parent = MonteCarloNode(None, None, state, [move])
+    child = parent.expand(move, state, [])
+    parent.move_num, child.move_num, child.win_num = 100, 10, 2
+    assert child.get_RAVE_UCB1(1, 30) == child.get_UCB1(1)
+
+    # Actions of the opponent are not counted for the player to move.
+    parent.update_amaf({(player, actions.get_action_from_move(move)), (-player, 0)}, player)
+    parent.update_amaf({(player, actions.get_action_from_move(move))}, -player)
+    assert parent.get_amaf(move) == (2, 1)
+    assert parent.amaf_move_nums.sum() == 2
+
+    exploration_value = (math.log(100) / 10)**(1/2)
+    # With k = 3n the weight of the AMAF win rate is sqrt(1/2).
+    beta = (1/2)**(1/2)
+    assert child.get_RAVE_UCB1(1, 30) == pytest.approx((1-beta) * 0.2 + beta * 0.5 + exploration_value)
+    assert child.get_RAVE_UCB1(1, 0) == pytest.approx(child.get_UCB1(1))
+
+
+def test_rave_statistics_of_a_search(midgame_state):
+    mcts = MonteCarlo(seed=0)
+    mcts.run_search(midgame_state, None, simulation_budget=50)
+    assert mcts.nodes[midgame_state.hash_value].amaf_move_nums is None
+
+    mcts = MonteCarlo(use_rave=True, seed=0)
+    mcts.run_search(midgame_state, None, simulation_budget=200)
+    root = mcts.nodes[midgame_state.hash_value]
+    for child in root.children.values():
+        # Every simulation through a child has played its move, but the move may also be played later in other simulations.
+        amaf_move_num, amaf_win_num = root.get_amaf(child["move"])
+        assert amaf_move_num >= child["node"].move_num
+        assert amaf_win_num <= amaf_move_num
+    for node in chance_nodes(mcts):
+        assert node.amaf_move_nums is None
+    assert mcts.best_move(midgame_state) in root.all_moves()
+
+
+def test_prove(state):
+    player = state.player_to_move
+    mcts = MonteCarlo(seed=0)
+    moves = state.get_legal_moves(player)[:3]
+    node = MonteCarloNode(None, None, state, moves)
+    children = [node.expand(move, state, []) for move in moves]
+    children[0].proven_value = -player
+    assert not mcts.prove(node)
+    children[1].proven_value = 0
+    children[2].proven_value = -player
+    assert mcts.prove(node)
+    assert node.proven_value == 0
+
+    node = MonteCarloNode(None, None, state, moves)
+    children = [node.expand(move, state, []) for move in moves]
+    children[1].proven_value = player
+    assert mcts.prove(node)
+    assert node.proven_value == player
+
+    # A chance node is proven with the average over all cards.
+    node = MonteCarloNode(None, None, state, [0, 1, 2, 3], True)
+    children = [node.expand(move, state, []) for move in range(3)]
+    for child, value in zip(children, [1, 1, -1]):
+        child.proven_value = value
+    assert not mcts.prove(node)
+    node.expand(3, state, []).proven_value = 0
+    assert mcts.prove(node)
+    assert node.proven_value == pytest.approx(0.25)
+    winners = [mcts.get_proven_winner(node) for _ in range(2000)]
+    assert np.mean(winners) == pytest.approx(0.25, abs=0.1)
+
+
+@pytest.mark.parametrize("seed, threshold", [(0, 1), (2, 1), (3, 1), (4, 1), (2, 2)])
+def test_solver_proves_endgames(seed, threshold):
+    random.seed(seed)
+    np.random.seed(seed)
+    state = Game()
+    while not endgame.is_endgame(state, threshold):
+        state.execute_move(players.random(state, state.player_to_move), state.player_to_move)
+    exact_value = endgame.EndgameSolver(node_limit=None).solve(state)[0]
+
+    mcts = MonteCarlo(seed=0)
+    stats = mcts.run_search(state, None, simulation_budget=100000)
+    assert stats["is_proven"]
+    # The search stops as soon as the root is proven.
+    assert stats["simulation"] < 100000
+    root = mcts.nodes[state.hash_value]
+    assert root.proven_value * state.player_to_move == pytest.approx(exact_value)
+    info = mcts.best_move_info(state)
+    assert info["proven_value"] * state.player_to_move == pytest.approx(exact_value)
+
+
+def test_search_limits(midgame_state):
+    mcts = MonteCarlo(seed=0)
+    with pytest.raises(ValueError):
+        mcts.run_search(midgame_state, None)
+
+    stats = mcts.run_search(midgame_state, None, node_budget=40)
+    assert stats["tree_size"] == 41
+    # Anytime: a later search continues the same tree.
+    stats = mcts.run_search(midgame_state, None, simulation_budget=10)
+    assert stats["simulation"] == 10
+    assert mcts.nodes[midgame_state.hash_value].move_num == 50
+
+    stats = MonteCarlo(seed=0).run_search(midgame_state, 0.2)
+    assert 0.2 <= stats["runtime"] < 1
+    assert stats["simulation"] > 0
+
+
+class CancelAfter(SearchControl):
+    """Control that cancels the search after a number of simulations."""
+
+    def __init__(self, simulation_num):
+        super().__init__()
+        self.simulation_num = simulation_num
+
+    def count_node(self, depth=None):
+        if self.node_num == self.simulation_num:
+            self.cancel()
+        super().count_node(depth)
+
+
+def test_cancelled_search_keeps_its_tree(midgame_state):
+    mcts = MonteCarlo(seed=0)
+    with pytest.raises(SearchCancelled):
+        mcts.run_search(midgame_state, None, CancelAfter(20), simulation_budget=100)
+    assert mcts.nodes[midgame_state.hash_value].move_num == 20
+    assert mcts.best_move(midgame_state) in midgame_state.get_legal_moves(midgame_state.player_to_move)
+
+
+def test_parallel_search_keeps_the_statistics_consistent(midgame_state):
+    mcts = MonteCarlo(seed=0)
+    stats = mcts.run_parallel_search(midgame_state, None, 4, simulation_budget=300, allow_gil=True)
+    assert stats["simulation"] == 300
+    assert mcts.locks == None
+    root = mcts.nodes[midgame_state.hash_value]
+    # All virtual losses are removed again.
+    assert root.move_num == 300
+    for node in set(mcts.nodes.values()):
+        assert 0 <= node.win_num + node.draw_num <= node.move_num
+        children = [child["node"] for child in node.children.values() if child["node"] != None]
+        assert sum(child.move_num for child in children) <= node.move_num
+        for child in node.children.values():
+            if child["node"] != None:
+                assert child["node"] is child["first_node"]
+                assert child["node"].parent is node
+
+
+def test_parallel_search_falls_back_with_the_gil(midgame_state, monkeypatch):
+    monkeypatch.setattr(monte_carlo, "is_gil_enabled", lambda: True)
+    results = []
+    for thread_num in [1, 4]:
+        # The stack is shuffled again with the generator of numpy when it is empty.
+        np.random.seed(0)
+        mcts = MonteCarlo(seed=0)
+        stats = mcts.run_parallel_search(midgame_state, None, thread_num, simulation_budget=50)
+        results.append((stats["tree_size"], mcts.nodes[midgame_state.hash_value].win_num, mcts.best_move(midgame_state)))
+    assert results[0] == results[1]
+
+
+def test_parallel_search_is_cancelled(midgame_state):
+    mcts = MonteCarlo(seed=0)
+    with pytest.raises(SearchCancelled):
+        mcts.run_parallel_search(midgame_state, None, 4, CancelAfter(20), simulation_budget=1000, allow_gil=True)
+    assert mcts.locks == None
+
+
+def test_virtual_loss(midgame_state):
+    mcts = MonteCarlo(seed=0)
+    mcts.run_search(midgame_state, None, simulation_budget=30)
+    path = []
+    node = mcts.select(midgame_state, path)
+    assert path[0] is mcts.nodes[midgame_state.hash_value]
+    # The selected nodes keep their virtual loss until the result is backpropagated.
+    move_nums = [path_node.move_num for path_node in path]
+    mcts.backpropagate(node, 0, None, path)
+    assert [path_node.move_num for path_node in path] == [move_num - mcts.virtual_loss + 1 for move_num in move_nums]
+
+
+def test_parallel_search_proves_endgames():
+    random.seed(2)
+    np.random.seed(2)
+    state = Game()
+    while not endgame.is_endgame(state, 2):
+        state.execute_move(players.random(state, state.player_to_move), state.player_to_move)
+    exact_value = endgame.EndgameSolver(node_limit=None).solve(state)[0]
+    mcts = MonteCarlo(seed=0)
+    stats = mcts.run_parallel_search(state, None, 4, simulation_budget=100000, allow_gil=True)
+    assert stats["is_proven"]
+    assert mcts.nodes[state.hash_value].proven_value * state.player_to_move == pytest.approx(exact_value)
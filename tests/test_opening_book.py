@@ -0,0 +1,39 @@
+import numpy as np
+import opening_book
+import symmetry
+
+
+SPEC = {"mode": "alphabeta", "depth": 1, "hero_card_discount": 30}
+
+
+def test_book_only_serves_its_seeded_deals(tmp_path):
+    path = str(tmp_path / "book.npz")
+    book = opening_book.build_book([0], SPEC, path, ply_num=1, process_num=1)
+    assert len(book) > 0
+
+    state = opening_book.deal(0)
+    entry = book.lookup(state, "alphabeta", 1, 30)
+    assert entry != None
+    assert str(entry[0]) in map(str, state.get_legal_moves(state.player_to_move))
+    assert book.lookup(state, "alphabeta", 2, 30) == None
+    assert book.lookup(state, "minimax", 1, 30) == None
+    assert book.lookup(opening_book.deal(1), "alphabeta", 1, 30) == None
+
+
+def test_symmetric_positions_share_entries(tmp_path):
+    book = opening_book.build_book([0], SPEC, str(tmp_path / "book.npz"), ply_num=0, process_num=1)
+    state = opening_book.deal(0)
+    transformed_state = symmetry.transform_state(state, 3)
+    move, value = book.lookup(state, "alphabeta", 1, 30)
+    transformed_move, transformed_value = book.lookup(transformed_state, "alphabeta", 1, 30)
+    assert transformed_value == value
+    assert str(transformed_move) == str(symmetry.transform_move(move, 3))
+
+
+def test_saved_book_is_loaded(tmp_path):
+    path = str(tmp_path / "book.npz")
+    book = opening_book.build_book([0], SPEC, path, ply_num=0, process_num=1)
+    loaded_book = opening_book.OpeningBook.load(path)
+    assert loaded_book.spec == SPEC
+    assert np.array_equal(loaded_book.keys, book.keys)
+    assert np.array_equal(loaded_book.actions, book.actions)
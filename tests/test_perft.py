@@ -0,0 +1,46 @@
+import copy
+import pytest
+import perft
+import state_codec
+
+
+def test_depth_one():
+    state = perft.create_position(0)
+    counts = perft.perft(state, 1)
+    moves = state.get_legal_moves(state.player_to_move)
+    draw_moves = [move for move in moves if move != None and move[0]]
+    assert counts["chance_nodes"] == len(draw_moves)
+    assert counts["draws"] == len(draw_moves) * len(state.drawable_power_cards)
+    assert counts["nodes"] == 1 + len(moves) - len(draw_moves) + counts["draws"]
+    assert counts["leaves"] == counts["nodes"] - 1
+    assert perft.perft(state, 0)["nodes"] == 1
+
+
+@pytest.mark.parametrize("seed", [1, 2])
+def test_divide_adds_up_to_perft(seed):
+    state = perft.create_position(seed)
+    counts = perft.perft(state, 2)
+    divided_counts = perft.divide(state, 2)
+    assert len(divided_counts) == len(state.get_legal_moves(state.player_to_move))
+    assert sum(move_counts["nodes"] for move_counts in divided_counts.values()) == counts["nodes"] - 1
+    assert sum(move_counts["leaves"] for move_counts in divided_counts.values()) == counts["leaves"]
+
+
+@pytest.mark.parametrize("engine_name", list(perft.ENGINES))
+def test_engines_agree_with_the_reference(engine_name):
+    for seed in [0, 3, 5]:
+        assert perft.run_perft((seed, engine_name, 2))[2] == perft.run_perft((seed, "reference", 2))[2]
+
+
+def test_compare_engines_finds_differences(monkeypatch):
+    def remove_stack_card(state):
+        state = copy.deepcopy(state)
+        state.drawable_power_cards = state.drawable_power_cards[1:]
+        return state
+
+    # The worker processes are forked and inherit the changed engines.
+    monkeypatch.setitem(perft.ENGINES, "broken", remove_stack_card)
+    differences, nodes_per_second = perft.compare_engines([0, 1], depth=1, engine_names=["state_codec", "broken"], process_num=2)
+    assert set(nodes_per_second) == {"reference", "state_codec", "broken"}
+    assert len(differences) > 0
+    assert all(difference["engine"] == "broken" for difference in differences)
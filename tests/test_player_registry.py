@@ -0,0 +1,71 @@
+import numpy as np
+import pytest
+import arena
+import player_registry
+from game import Game
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    player_registry.player_cache.clear()
+    yield
+    player_registry.player_cache.clear()
+
+
+def test_sides_do_not_share_players():
+    spec = {"mode": "mcts", "timeout": 0.1}
+    player1 = player_registry.get_player(spec, -1)
+    player2 = player_registry.get_player(spec, 1)
+    assert player1 is not player2
+    assert player1.mcts is not player2.mcts
+    assert player_registry.get_player(dict(spec), -1) is player1
+
+
+def test_player_cache_is_bounded():
+    first_player = player_registry.get_player({"mode": "random", "name": "random0"})
+    for i in range(1, player_registry.PLAYER_CACHE_SIZE + 1):
+        player_registry.get_player({"mode": "random", "name": f"random{i}"})
+    assert len(player_registry.player_cache) == player_registry.PLAYER_CACHE_SIZE
+    assert player_registry.get_player({"mode": "random", "name": "random0"}) is not first_player
+
+
+def test_new_game_clears_mcts_tree():
+    player = player_registry.get_player({"mode": "mcts"}, -1)
+    tree = player.mcts
+    player.new_game()
+    assert player.mcts is not tree
+    assert len(player.mcts.nodes) == 0
+
+
+def test_unknown_parameters_are_rejected():
+    with pytest.raises(ValueError):
+        player_registry.create_player({"mode": "alphabeta", "dept": 3})
+    with pytest.raises(ValueError):
+        player_registry.create_player({"mode": "unknown"})
+
+
+@pytest.mark.parametrize("mode", ["random", "minimax", "alphabeta", "pvs", "expectiminimax", "mcts", "ponder", "rl"])
+def test_players_choose_legal_moves(mode):
+    np.random.seed(0)
+    state = Game()
+    spec = {"mode": mode}
+    if mode in ["minimax", "alphabeta", "pvs", "expectiminimax"]:
+        spec["depth"] = 1
+    elif mode == "mcts":
+        spec.update({"timeout": None, "simulation_budget": 20})
+    player = player_registry.create_player(spec)
+    move = player.choose_move(state)
+    assert str(move) in map(str, state.get_legal_moves(state.player_to_move))
+
+
+def test_complete_spec_adds_defaults():
+    spec = player_registry.complete_spec({"mode": "alphabeta", "name": "ab", "depth": 2})
+    assert spec == dict(player_registry.AlphabetaPlayer.PARAMETERS, mode="alphabeta", depth=2)
+    assert player_registry.create_player(spec).get_spec() == spec
+
+
+def test_player_names_distinguish_configurations():
+    assert arena.get_player_name({"mode": "alphabeta"}) == "alphabeta"
+    assert arena.get_player_name({"mode": "alphabeta", "depth": 4}) == "alphabeta"
+    assert arena.get_player_name({"mode": "alphabeta", "depth": 3}) == "alphabeta(depth=3)"
+    assert arena.get_player_name({"mode": "alphabeta", "depth": 3, "name": "ab3"}) == "ab3"
@@ -0,0 +1,33 @@
+import math
+import random
+import numpy as np
+import pytest
+import players
+from game import Game
+
+
+def play_random_moves(seed, move_num):
+    random.seed(seed)
+    np.random.seed(seed)
+    state = Game()
+    for _ in range(move_num):
+        if state.is_game_over():
+            break
+        state.execute_move(players.random(state, state.player_to_move), state.player_to_move)
+    return state
+
+
+@pytest.fixture
+def deterministic_draws(monkeypatch):
+    # The searches draw random cards, so the first card of the stack is always drawn for exact comparisons.
+    monkeypatch.setattr(np.random, "choice", lambda n: 0)
+    monkeypatch.setattr(np.random, "shuffle", lambda cards: None)
+
+
+@pytest.mark.parametrize("hero_card_discount", [30, 30.5, 12.25])
+@pytest.mark.parametrize("seed, move_num", [(0, 6), (1, 20), (2, 35)])
+def test_pvs_equals_negamax(deterministic_draws, seed, move_num, hero_card_discount):
+    state = play_random_moves(seed, move_num)
+    expected = players.negamax(state, 3, -math.inf, math.inf, hero_card_discount)[0]
+    assert players.pvs(state, 3, -math.inf, math.inf, hero_card_discount)[0] == expected
+    assert players.iterative_pvs(state, 3, hero_card_discount)[0] == expected
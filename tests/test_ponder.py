@@ -0,0 +1,70 @@
+import threading
+import numpy as np
+import pytest
+from game import Game
+from ponder import Ponderer
+
+
+class FailingPlayer:
+    """A player whose pondering search fails, while a direct search returns the first legal move."""
+
+    def __init__(self):
+        self.entered = threading.Event()
+        self.release = threading.Event()
+        self.state = None
+
+    def choose_move(self, state, budget=None, control=None):
+        if control == None:
+            return state.get_legal_moves(state.player_to_move)[0]
+        self.state = state
+        self.entered.set()
+        self.release.wait()
+        raise RuntimeError("search failed")
+
+
+@pytest.mark.filterwarnings("ignore::pytest.PytestUnhandledThreadExceptionWarning")
+def test_choose_move_does_not_wait_for_failed_search():
+    np.random.seed(0)
+    player = FailingPlayer()
+    ponderer = Ponderer(player)
+    ponderer.start(Game())
+    assert player.entered.wait(5)
+
+    result = []
+    caller = threading.Thread(target=lambda: result.append(ponderer.choose_move(player.state)), daemon=True)
+    caller.start()
+    player.release.set()
+    caller.join(5)
+
+    assert not caller.is_alive()
+    assert result == [player.state.get_legal_moves(player.state.player_to_move)[0]]
+
+
+class CountingPlayer:
+    """A player that counts its searches and plays the first legal move."""
+
+    def __init__(self):
+        self.search_num = 0
+
+    def choose_move(self, state, budget=None, control=None):
+        self.search_num += 1
+        return state.get_legal_moves(state.player_to_move)[0]
+
+
+def test_pondered_positions_are_answered_from_the_cache():
+    np.random.seed(0)
+    state = Game()
+    player = CountingPlayer()
+    ponderer = Ponderer(player, max_positions=3)
+    ponderer.start(state)
+    ponderer.wait(5)
+    assert player.search_num == 3
+
+    for child_state in ponderer.get_likely_positions(state):
+        move = ponderer.choose_move(child_state)
+        assert str(move) == str(child_state.get_legal_moves(child_state.player_to_move)[0])
+    assert player.search_num == 3
+
+    # Another position is searched directly.
+    ponderer.choose_move(state)
+    assert player.search_num == 4
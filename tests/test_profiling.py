@@ -0,0 +1,87 @@
+import time
+import threading
+import profiling
+import arena
+from profiling import Profiler
+
+
+def spin(seconds):
+    end_time = time.thread_time() + seconds
+    while time.thread_time() < end_time:
+        pass
+
+
+def test_hook_without_profiler():
+    assert profiling.active_profiler == None
+    assert profiling.get_label() == None
+    with profiling.attribute("player"):
+        assert profiling.get_label() == None
+
+
+def test_labels_split_stacks_and_cpu_times():
+    profiler = Profiler(interval=0.001)
+    profiler.start()
+    try:
+        assert profiling.get_label() == profiling.OTHER_LABEL
+        with profiling.attribute("outer"):
+            spin(0.1)
+            with profiling.attribute("inner"):
+                assert profiling.get_label() == "inner"
+                spin(0.1)
+    finally:
+        profiler.stop()
+    assert profiling.active_profiler == None
+
+    roots = {stack.split(";")[0] for stack in profiler.stacks}
+    assert {"outer", "inner"} <= roots
+    assert any("test_profiling.py:spin" in stack for stack in profiler.stacks)
+    # Nested labels are exclusive.
+    assert 0.05 < profiler.cpu_times["outer"] < 0.15
+    assert 0.05 < profiler.cpu_times["inner"] < 0.15
+
+
+def test_only_labelled_background_threads_are_sampled():
+    profiler = Profiler(interval=0.001)
+    profiler.start()
+
+    def work(label):
+        if label == None:
+            spin(0.1)
+            return
+        with profiling.attribute(label):
+            spin(0.1)
+
+    threads = [threading.Thread(target=work, args=(label,)) for label in [None, "ponder"]]
+    try:
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        profiler.stop()
+    assert "ponder" in profiler.cpu_times
+    work_stacks = [stack for stack in profiler.stacks if "test_profiling.py:work" in stack]
+    assert len(work_stacks) > 0
+    assert all(stack.startswith("ponder;") for stack in work_stacks)
+
+
+def test_merge_and_write_collapsed(tmp_path):
+    profiler = Profiler()
+    profiler.merge({"stacks": {"a;f": 2, "b;g": 1}, "cpu_times": {"a": 1.0}})
+    profiler.merge({"stacks": {"a;f": 3}, "cpu_times": {"a": 0.5, "b": 2.0}})
+    assert profiler.to_data() == {"stacks": {"a;f": 5, "b;g": 1}, "cpu_times": {"a": 1.5, "b": 2.0}}
+    path = str(tmp_path / "profiles" / "profile.txt")
+    profiler.write_collapsed(path)
+    with open(path) as file:
+        assert file.read() == "a;f 5\nb;g 1\n"
+
+
+def test_arena_profiles_by_player(tmp_path):
+    path = str(tmp_path / "arena.txt")
+    player1 = {"mode": "alphabeta", "depth": 2, "hero_card_discount": 30}
+    player2 = {"mode": "random"}
+    arena.play_games(2, player1, player2, seed=0, profile_path=path)
+    with open(path) as file:
+        roots = {line.split(";")[0] for line in file}
+    assert arena.get_profile_label(player1, -1) in roots
+    assert profiling.active_profiler == None
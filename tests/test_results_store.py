@@ -0,0 +1,93 @@
+import math
+import pytest
+import results_store
+from results_store import ResultStore, ELO_INITIAL_RATING, ELO_K
+
+
+def make_result(index, player1, player2, winner, seed=None):
+    return {"index": index, "player1": player1, "player2": player2, "starting_player": -1, "seed": seed,
+            "winner": winner, "moves": [(False, False, [1, 0]), None], "move_times": [0.1, 0.2]}
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = ResultStore(str(tmp_path / "results.db"))
+    yield store
+    store.close()
+
+
+def test_results_are_persistent(tmp_path):
+    path = str(tmp_path / "results.db")
+    store = ResultStore(path)
+    store.add_result("run", make_result(0, "a", "b", -1, seed=5))
+    store.close()
+
+    store = ResultStore(path)
+    results = store.get_results("run")
+    store.close()
+    assert len(results) == 1
+    assert (results[0]["player1"], results[0]["winner"], results[0]["seed"]) == ("a", -1, 5)
+    assert len(results[0]["moves"]) == 2
+
+
+def test_player_names_are_unique(store):
+    store.register_player("a", {"mode": "random"})
+    store.register_player("a", {"mode": "random"})
+    with pytest.raises(ValueError):
+        store.register_player("a", {"mode": "alphabeta"})
+
+
+def test_finished_indices_must_match_the_schedule(store):
+    store.add_result("run", make_result(0, "a", "b", -1, seed=1))
+    games = [{"index": 0, "player1": "a", "player2": "b", "seed": 1}, {"index": 1, "player1": "b", "player2": "a", "seed": 2}]
+    assert store.get_finished_indices("run", games) == {0}
+    assert store.get_finished_indices("other run", games) == set()
+    with pytest.raises(ValueError):
+        store.get_finished_indices("run", [{"index": 0, "player1": "a", "player2": "c", "seed": 1}])
+
+
+def test_elo_ratings_are_updated_incrementally(tmp_path, store):
+    results = [make_result(0, "a", "b", -1), make_result(1, "b", "a", 0), make_result(2, "c", "a", 1)]
+    store.add_result("run", results[0])
+    ratings = store.update_elo_ratings()
+    assert ratings == {"a": ELO_INITIAL_RATING + ELO_K / 2, "b": ELO_INITIAL_RATING - ELO_K / 2}
+
+    for result in results[1:]:
+        store.add_result("run", result)
+    ratings = store.update_elo_ratings()
+
+    other_store = ResultStore(str(tmp_path / "other.db"))
+    for result in results:
+        other_store.add_result("run", result)
+    assert other_store.update_elo_ratings() == pytest.approx(ratings)
+    other_store.close()
+    assert sum(ratings.values()) == pytest.approx(3 * ELO_INITIAL_RATING)
+
+
+def test_bradley_terry_ratings(store):
+    for index, winner in enumerate([-1, -1, -1, 1]):
+        store.add_result("run", make_result(index, "a", "b", winner))
+    ratings = store.calc_bayes_ratings(prior_draws=0)
+    # The first player wins three of four games, so its strength is three times as large.
+    assert ratings["a"] - ratings["b"] == pytest.approx(400 * math.log10(3))
+    assert (ratings["a"] + ratings["b"]) / 2 == pytest.approx(ELO_INITIAL_RATING)
+
+    # The prior pulls the ratings together.
+    prior_ratings = store.calc_bayes_ratings(prior_draws=2)
+    assert 0 < prior_ratings["a"] - prior_ratings["b"] < ratings["a"] - ratings["b"]
+    assert store.calc_bayes_ratings("other run") == {}
+
+
+def test_bradley_terry_ratings_do_not_depend_on_the_order(tmp_path, store):
+    winners = [-1, 0, 1, -1, -1]
+    for index, winner in enumerate(winners):
+        store.add_result("run", make_result(index, "a", "b", winner))
+    other_store = ResultStore(str(tmp_path / "other.db"))
+    for index, winner in enumerate(reversed(winners)):
+        other_store.add_result("run", make_result(index, "a", "b", winner))
+    assert other_store.calc_bayes_ratings() == pytest.approx(store.calc_bayes_ratings())
+    other_store.close()
+
+
+def test_score_player1():
+    assert [results_store.score_player1(winner) for winner in [-1, 0, 1]] == [1, 0.5, 0]
@@ -0,0 +1,95 @@
+import copy
+import random
+import numpy as np
+import pytest
+import benchmark
+import rollout
+from game import Game
+from monte_carlo import MonteCarlo
+
+def hero_move_positions(seed, position_num):
+    """Positions of random games in which the player to move can play a hero card."""
+    rng = random.Random(seed)
+    np.random.seed(seed)
+    positions = []
+    while len(positions) < position_num:
+        state = Game()
+        while not state.is_game_over() and len(positions) < position_num:
+            moves = state.get_legal_moves(state.player_to_move)
+            if any(move != None and not move[0] and move[1] for move in moves):
+                positions.append(copy.deepcopy(state))
+            state.execute_move(rng.choice(moves), state.player_to_move)
+    return positions
+
+
+POSITIONS = benchmark.create_positions(position_num=5)
+STATES = POSITIONS["midgame"] + POSITIONS["endgame"] + hero_move_positions(0, 10)[::2]
+
+
+def calc_points(state):
+    state.valuations = None
+    player_index = state.determine_player_index(state.player_to_move)
+    points = state.calc_valuations()[0]
+    return points[player_index], points[1-player_index]
+
+
+@pytest.mark.parametrize("state", STATES)
+def test_field_gains_equal_the_change_of_points(state):
+    moves = state.get_legal_moves(state.player_to_move)
+    gains = rollout.calc_field_gains(state, moves)
+    hero_gains = rollout.calc_field_gains(state, moves, True)
+    own_points, opponent_points = calc_points(state)
+    for move, gain, hero_gain in zip(moves, gains, hero_gains):
+        if move == None or move[0]:
+            assert gain == hero_gain == 0
+            continue
+        new_state = copy.deepcopy(state)
+        new_state.execute_move(move, state.player_to_move)
+        new_state.player_to_move = state.player_to_move
+        new_own_points, new_opponent_points = calc_points(new_state)
+        assert gain == new_own_points - own_points
+        if move[1]:
+            # The splitting of the opponent's field is not calculated, so the opponent loses at least as many points.
+            opponent_loss = hero_gain - gain + rollout.HERO_CARD_DISCOUNT
+            assert opponent_points - new_opponent_points >= opponent_loss > 0
+        else:
+            assert hero_gain == gain
+
+
+@pytest.mark.parametrize("policy_name", list(rollout.ROLLOUT_POLICIES))
+def test_policies_choose_legal_moves(policy_name):
+    rng = random.Random(0)
+    for state in STATES:
+        moves = state.get_legal_moves(state.player_to_move)
+        for _ in range(3):
+            assert rollout.ROLLOUT_POLICIES[policy_name](state, moves, rng) in moves
+
+
+def test_greedy_policy_chooses_the_highest_gain():
+    rng = random.Random(0)
+    for state in STATES:
+        moves = state.get_legal_moves(state.player_to_move)
+        gains = rollout.calc_field_gains(state, moves, True)
+        if len(moves) > 1:
+            assert gains[moves.index(rollout.choose_hero_greedy(state, moves, rng))] == gains.max()
+
+
+def test_sample_winner():
+    rng = random.Random(0)
+    state = STATES[0]
+    win_probability = rollout.expit(rollout.WIN_PROBABILITY_SCALE * state.calc_heuristic(rollout.HERO_CARD_DISCOUNT, 1))
+    winners = [rollout.sample_winner(state, rng) for _ in range(2000)]
+    assert set(winners) <= {-1, 1}
+    assert winners.count(1) / len(winners) == pytest.approx(win_probability, abs=0.05)
+
+
+@pytest.mark.parametrize("rollout_policy, rollout_depth", [("epsilon_greedy", None), ("softmax", 0), ("hero_greedy", 5)])
+def test_mcts_with_rollout_policies(rollout_policy, rollout_depth):
+    state = STATES[0]
+    mcts = MonteCarlo(rollout_policy=rollout_policy, rollout_depth=rollout_depth, seed=0)
+    stats = mcts.run_search(state, None, simulation_budget=30)
+    assert stats["simulation"] == 30
+    assert mcts.best_move(state) in state.get_legal_moves(state.player_to_move)
+    # A truncated rollout always has a winner.
+    if rollout_depth != None:
+        assert stats["draws"] == 0
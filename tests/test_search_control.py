@@ -0,0 +1,54 @@
+import math
+import threading
+import numpy as np
+import pytest
+import players
+from game import Game
+from monte_carlo import MonteCarlo
+from search_control import SearchControl, SearchCancelled
+
+
+@pytest.fixture
+def state():
+    np.random.seed(0)
+    return Game()
+
+
+def test_cancelled_search_raises(state):
+    control = SearchControl()
+    control.cancel()
+    with pytest.raises(SearchCancelled):
+        players.alphabeta(state, 3, -math.inf, math.inf, state.player_to_move, 30, control)
+    with pytest.raises(SearchCancelled):
+        MonteCarlo(seed=0).run_search(state, None, control, simulation_budget=10)
+
+
+def test_search_is_cancelled_from_another_thread(state):
+    control = SearchControl()
+    timer = threading.Timer(0.2, control.cancel)
+    timer.start()
+    with pytest.raises(SearchCancelled):
+        players.alphabeta(state, 20, -math.inf, math.inf, state.player_to_move, 30, control)
+    timer.join()
+    assert control.node_num > 0
+
+
+def test_iterative_deepening_reports_each_depth(state):
+    control = SearchControl()
+    value, move = players.iterative_alphabeta(state, 3, state.player_to_move, 30, control)
+    control.finish()
+    progress = control.get_progress()
+    assert progress["depth"] == 3
+    assert progress["best_move"] == move
+    assert progress["best_value"] == value
+    assert progress["is_finished"]
+    assert progress["node_num"] > 0
+
+
+def test_progress_is_taken_over(state):
+    control = SearchControl()
+    control.report(2, (False, False, [1, 0]), 5)
+    other_control = SearchControl()
+    other_control.set_progress(control.get_progress())
+    progress = other_control.get_progress()
+    assert (progress["depth"], progress["best_move"], progress["best_value"]) == (2, (False, False, [1, 0]), 5)
@@ -0,0 +1,96 @@
+import json
+import math
+import numpy as np
+import pytest
+import players
+import arena
+import benchmark
+from monte_carlo import MonteCarlo
+from search_control import SearchControl
+from search_stats import SearchStats, SEARCH_PHASES, MCTS_PHASES, save_stats
+
+STATE = benchmark.create_positions(position_num=1)["midgame"][0]
+
+
+def test_statistics_do_not_change_the_search():
+    player = STATE.player_to_move
+    np.random.seed(0)
+    result = players.alphabeta(STATE, 3, -math.inf, math.inf, player, 30)
+    control = SearchControl(SearchStats())
+    np.random.seed(0)
+    assert players.alphabeta(STATE, 3, -math.inf, math.inf, player, 30, control) == result
+
+    stats = control.stats
+    assert stats.node_num == control.node_num == sum(stats.node_nums.values())
+    assert stats.node_nums[3] == 1
+    assert stats.evaluation_num > 0
+    assert sum(stats.beta_cutoffs.values()) + sum(stats.alpha_cutoffs.values()) > 0
+    assert set(stats.times) == set(SEARCH_PHASES)
+    assert stats.calc_effective_branching_factor() > 1
+
+
+def test_minimax_counts_every_move():
+    # A drawn card is a single random child in minimax.
+    control = SearchControl(SearchStats())
+    players.minimax(STATE, 1, STATE.player_to_move, 30, control)
+    moves = STATE.get_legal_moves(STATE.player_to_move)
+    assert control.stats.node_nums == {1: 1, 0: len(moves)}
+    assert control.stats.calc_effective_branching_factor() == pytest.approx(len(moves))
+
+
+def test_chance_nodes_of_expectiminimax():
+    control = SearchControl(SearchStats())
+    players.expectiminimax(STATE, 2, -math.inf, math.inf, STATE.player_to_move, 30, control)
+    assert control.stats.chance_node_num > 0
+
+
+def test_mcts_phases():
+    control = SearchControl(SearchStats())
+    mcts = MonteCarlo(seed=0)
+    mcts.run_search(STATE, None, control, simulation_budget=20)
+    assert set(control.stats.times) == set(MCTS_PHASES)
+    assert control.stats.tree_size == len(mcts.nodes)
+    assert control.stats.to_dict()["effective_branching_factor"] == None
+
+
+def test_merge_and_save(tmp_path):
+    stats = SearchStats()
+    for depth in [2, 1, 1, 0]:
+        stats.count_node(depth)
+    stats.count_cutoff(1, 0)
+    stats.count_cutoff(1, 2, is_beta=False)
+    stats.add_time("evaluation", 1.5)
+    stats.total_time = 2
+    other_stats = SearchStats()
+    other_stats.count_node(0)
+    other_stats.count_cutoff(0, 0)
+    other_stats.add_time("evaluation", 0.5)
+    other_stats.tree_size = 7
+    stats.merge(other_stats)
+
+    data = stats.to_dict()
+    assert data["node_num"] == 5
+    assert data["node_nums_by_depth"] == {"0": 2, "1": 2, "2": 1}
+    assert data["beta_cutoffs_by_depth"] == {"0": 1, "1": 1}
+    assert data["alpha_cutoffs_by_depth"] == {"1": 1}
+    assert data["first_move_cutoff_rate"] == pytest.approx(2 / 3)
+    assert data["times"] == {"evaluation": 2}
+    assert data["tree_size"] == 7
+    assert data["total_time"] == 2
+    assert data["effective_branching_factor"] == pytest.approx(2 ** 0.5)
+
+    path = str(tmp_path / "stats" / "stats.json")
+    save_stats([dict(data, game=0)], path)
+    with open(path) as file:
+        assert json.load(file) == [dict(data, game=0)]
+
+
+def test_arena_collects_statistics():
+    player1 = {"mode": "alphabeta", "depth": 1, "hero_card_discount": 30}
+    player2 = {"mode": "random"}
+    result = arena.play_game(player1, player2, seed=0, collect_stats=True)
+    assert len(result["stats"]) == len(result["moves"])
+    assert [entry["ply"] for entry in result["stats"]] == list(range(len(result["moves"])))
+    searched = [entry for entry in result["stats"] if entry["player"] == arena.get_player_name(player1)]
+    assert len(searched) > 0
+    assert all(entry["total_time"] != None for entry in result["stats"])
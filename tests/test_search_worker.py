@@ -0,0 +1,33 @@
+import numpy as np
+import pytest
+from game import Game
+from search_control import SearchControl, SearchCancelled
+from search_worker import SearchWorker
+
+
+@pytest.fixture(scope="module")
+def worker():
+    worker = SearchWorker({"mode": "alphabeta", "depth": 2, "hero_card_discount": 30, "iterative_deepening": True})
+    yield worker
+    worker.close()
+
+
+def test_worker_calculates_legal_moves(worker):
+    np.random.seed(0)
+    state = Game()
+    control = SearchControl()
+    move = worker.choose_move(state, control=control)
+    assert str(move) in map(str, state.get_legal_moves(state.player_to_move))
+    assert control.get_progress()["depth"] == 2
+    assert control.get_progress()["best_move"] == move
+
+
+def test_cancelled_search_raises(worker):
+    np.random.seed(1)
+    state = Game()
+    control = SearchControl()
+    control.cancel()
+    with pytest.raises(SearchCancelled):
+        worker.choose_move(state, budget=30, control=control)
+    # The worker answers the next search after the cancelled one.
+    assert str(worker.choose_move(state, budget=1)) in map(str, state.get_legal_moves(state.player_to_move))
@@ -0,0 +1,82 @@
+import copy
+import random
+import numpy as np
+import players
+import state_codec
+from game import Game
+
+
+def random_positions(seed):
+    random.seed(seed)
+    np.random.seed(seed)
+    state = Game()
+    positions = [copy.deepcopy(state)]
+    while not state.is_game_over():
+        state.execute_move(players.random(state, state.player_to_move), state.player_to_move)
+        positions.append(copy.deepcopy(state))
+    return positions
+
+
+POSITIONS = random_positions(0)
+ATTRIBUTES = ["board", "crown_position", "player_power_cards", "player_hero_cards_num", "drawable_power_cards",
+              "played_power_cards", "playable_pieces_num", "player_to_move", "last_crown_position", "last_drawn_card"]
+
+
+def normalize_move(move):
+    if move == None:
+        return None
+    return move[0], move[1], None if move[2] is None else [int(value) for value in move[2]]
+
+
+def assert_equal_states(state, decoded_state):
+    for attribute in ATTRIBUTES:
+        value = getattr(state, attribute)
+        decoded_value = getattr(decoded_state, attribute)
+        if value is None:
+            assert decoded_value is None, attribute
+        else:
+            assert np.array_equal(np.asarray(value).reshape(np.shape(decoded_value)), decoded_value), attribute
+    assert normalize_move(decoded_state.last_move) == normalize_move(state.last_move)
+
+
+def test_round_trip():
+    assert state_codec.STATE_DTYPE.itemsize == 66
+    for state in POSITIONS:
+        data = state_codec.encode(state)
+        assert len(data) == state_codec.STATE_DTYPE.itemsize
+        decoded_state = state_codec.decode(data)
+        assert_equal_states(state, decoded_state)
+        assert decoded_state.position_key() == state.position_key()
+        assert [normalize_move(move) for move in decoded_state.get_legal_moves(state.player_to_move)] == \
+               [normalize_move(move) for move in state.get_legal_moves(state.player_to_move)]
+        assert decoded_state.calc_heuristic(30, 1) == state.calc_heuristic(30, 1)
+        assert state_codec.encode(decoded_state) == data
+
+
+def test_hash_values():
+    data = state_codec.encode(POSITIONS[10])
+    assert state_codec.decode(data).hash_value == state_codec.decode(data).hash_value
+    assert state_codec.decode(data).hash_value != state_codec.decode(state_codec.encode(POSITIONS[11])).hash_value
+    assert state_codec.decode(data, "history").hash_value == "history"
+
+
+def test_batch_from_shared_buffer():
+    records = state_codec.encode_batch(POSITIONS)
+    buffer = bytearray(records.tobytes())
+    decoded_states = state_codec.decode_batch(state_codec.from_bytes(buffer))
+    assert len(decoded_states) == len(POSITIONS)
+    for state, decoded_state in zip(POSITIONS, decoded_states):
+        assert_equal_states(state, decoded_state)
+    assert len(state_codec.encode_batch([])) == 0
+
+
+def test_decoded_state_plays_on_identically():
+    state = POSITIONS[20]
+    decoded_state = state_codec.decode(state_codec.encode(state))
+    for current_state in [state, decoded_state]:
+        random.seed(1)
+        np.random.seed(1)
+        while not current_state.is_game_over():
+            current_state.execute_move(players.random(current_state, current_state.player_to_move), current_state.player_to_move)
+    assert_equal_states(state, decoded_state)
+    assert decoded_state.determine_winner() == state.determine_winner()
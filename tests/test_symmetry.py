@@ -0,0 +1,80 @@
+import copy
+import random
+import numpy as np
+import pytest
+import players
+import symmetry
+from game import Game
+from monte_carlo import MonteCarlo
+
+
+def play_random_moves(seed, move_num):
+    random.seed(seed)
+    np.random.seed(seed)
+    state = Game()
+    for _ in range(move_num):
+        if state.is_game_over():
+            break
+        state.execute_move(players.random(state, state.player_to_move), state.player_to_move)
+    return state
+
+
+POSITIONS = [(0, 0), (1, 9), (2, 30)]
+TRANSFORMATIONS = range(symmetry.TRANSFORMATIONS_NUM)
+
+
+def test_transformations_form_a_group():
+    for first in TRANSFORMATIONS:
+        assert symmetry.compose(first, symmetry.inverse(first)) == symmetry.IDENTITY
+        for second in TRANSFORMATIONS:
+            assert symmetry.compose(first, second) in TRANSFORMATIONS
+
+
+@pytest.mark.parametrize("seed, move_num", POSITIONS)
+@pytest.mark.parametrize("transformation", TRANSFORMATIONS)
+def test_canonical_key_is_invariant(seed, move_num, transformation):
+    state = play_random_moves(seed, move_num)
+    transformed_state = symmetry.transform_state(state, transformation)
+    assert symmetry.canonical_key(transformed_state) == symmetry.canonical_key(state)
+    canonical_state, canonical_transformation = symmetry.canonical_state(transformed_state)
+    assert canonical_state.position_key() == symmetry.canonical_key(state)
+
+
+@pytest.mark.parametrize("seed, move_num", POSITIONS)
+@pytest.mark.parametrize("transformation", TRANSFORMATIONS)
+def test_moves_and_values_are_transformed(seed, move_num, transformation):
+    state = play_random_moves(seed, move_num)
+    transformed_state = symmetry.transform_state(state, transformation)
+    player = state.player_to_move
+    moves = state.get_legal_moves(player)
+    assert sorted(str(symmetry.transform_move(move, transformation)) for move in moves) == \
+           sorted(str(move) for move in transformed_state.get_legal_moves(player))
+    assert transformed_state.calc_heuristic(30, player) == state.calc_heuristic(30, player)
+
+    for move in moves:
+        if move == None or move[0]:
+            continue
+        child_state = copy.deepcopy(state)
+        child_state.execute_move(move, player)
+        transformed_child_state = copy.deepcopy(transformed_state)
+        transformed_child_state.execute_move(symmetry.transform_move(move, transformation), player)
+        assert symmetry.transform_state(child_state, transformation).position_key() == transformed_child_state.position_key()
+
+
+def test_canonical_moves_are_mapped_back():
+    state = play_random_moves(1, 9)
+    key, transformation = symmetry.canonicalize(state)
+    for move in state.get_legal_moves(state.player_to_move):
+        assert str(symmetry.from_canonical_move(symmetry.to_canonical_move(move, transformation), transformation)) == str(move)
+
+
+def test_mcts_continues_the_tree_of_a_symmetric_position():
+    state = play_random_moves(2, 10)
+    mcts = MonteCarlo(use_symmetry=True, seed=0)
+    mcts.run_search(state, None, simulation_budget=20)
+    transformed_state = symmetry.transform_state(state, 6)
+    transformed_state.hash_value += "transformed"
+    root_state, transformation = mcts.find_root(transformed_state)
+    assert root_state.hash_value == state.hash_value
+    move = mcts.best_move(transformed_state)
+    assert str(move) in map(str, transformed_state.get_legal_moves(transformed_state.player_to_move))
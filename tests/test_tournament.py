@@ -0,0 +1,39 @@
+import pytest
+import tournament
+from results_store import ResultStore
+
+
+def test_schedule_alternates_starting_player():
+    tasks = tournament.create_schedule(["a", "b", "c"], 4, seed=1)
+    assert len(tasks) == 3 * 4
+    assert [task["index"] for task in tasks] == list(range(len(tasks)))
+    pairing = [task for task in tasks if (task["player1"], task["player2"]) == ("a", "b")]
+    assert [task["starting_player"] for task in pairing] == [-1, 1, -1, 1]
+
+
+def test_schedule_seeds_are_reproducible():
+    tasks = tournament.create_schedule(["a", "b"], 3, seed=7)
+    assert tasks == tournament.create_schedule(["a", "b"], 3, seed=7)
+    assert len({task["seed"] for task in tasks}) == 3
+    assert tasks != tournament.create_schedule(["a", "b"], 3, seed=8)
+
+
+def test_play_games_rejects_equal_names():
+    with pytest.raises(ValueError):
+        tournament.play_games(2, {"mode": "random", "name": "random"}, {"mode": "random", "name": "random"}, process_num=1)
+    with pytest.raises(ValueError):
+        tournament.play_games(2, {"mode": "random", "name": "player2"}, {"mode": "random"}, process_num=1)
+
+
+def test_round_robin_is_resumed_from_the_store(tmp_path, capsys):
+    player_specs = {name: {"mode": "random"} for name in ["a", "b", "c"]}
+    store = ResultStore(str(tmp_path / "results.db"))
+    results = tournament.round_robin(player_specs, 2, process_num=2, seed=0, store=store, tournament="run")
+    assert sorted(result["index"] for result in results) == list(range(6))
+    assert capsys.readouterr().out.splitlines()[-1].startswith("c")
+
+    resumed_results = tournament.round_robin(player_specs, 2, process_num=2, seed=0, store=store, tournament="run")
+    store.close()
+    assert sorted(result["index"] for result in resumed_results) == list(range(6))
+    assert [result["winner"] for result in sorted(resumed_results, key=lambda result: result["index"])] == \
+           [result["winner"] for result in sorted(results, key=lambda result: result["index"])]
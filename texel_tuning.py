@@ -0,0 +1,179 @@
+import os
+import math
+import random
+from multiprocessing import Pool
+import numpy as np
+from scipy.optimize import minimize, minimize_scalar
+from scipy.special import expit
+from tqdm import tqdm
+from game import Game
+import players
+import evaluation
+from evaluation import Evaluator, FEATURE_NAMES
+
+GAME_NUM = 2000
+PROCESS_NUM = os.cpu_count()
+DATA_PATH = "data/texel_tuning.npz"
+
+# The games are played by shallow alpha-beta searches, some moves are random for more diverse positions.
+SEARCH_DEPTH = 2
+RANDOM_MOVE_RATIO = 0.1
+# Positions shortly after the deal say little about the result and are left out.
+SKIP_PIECE_NUM = 4
+
+
+def play_game(args):
+    """Play one game with the alpha-beta search on both sides and record the features of all positions
+    with more than one legal move, together with the final result.
+
+    arguments:
+    args -- The seed of the game, the search depth and the probability to play a random move instead of the search move.
+
+    return: The features from the point of view of the player to move (array of shape (n, FEATURE_NUM)),
+            the results for the player to move (1 for a win, 0.5 for a draw, 0 for a loss).
+    """
+    seed, depth, random_move_ratio = args
+    random.seed(seed)
+    np.random.seed(seed)
+
+    game = Game()
+    game.player_to_move = random.choice([-1, 1])
+    features = []
+    movers = []
+
+    while not game.is_game_over():
+        player = game.player_to_move
+        moves = game.get_legal_moves(player)
+        if len(moves) > 1:
+            if Game.PIECES_NUM - game.playable_pieces_num >= SKIP_PIECE_NUM:
+                features.append(evaluation.calc_features(game, player))
+                movers.append(player)
+            if random.random() < random_move_ratio:
+                move = random.choice(moves)
+            else:
+                move = players.alphabeta(game, depth, -math.inf, math.inf, player, Game.HERO_CARD_DISCOUNT)[1]
+        else:
+            move = moves[0]
+        game.execute_move(move, player)
+
+    winner = game.determine_winner()
+    results = [0.5 if winner == 0 else float(winner == mover) for mover in movers]
+    return np.array(features, dtype=np.float64).reshape(-1, evaluation.FEATURE_NUM), np.array(results, dtype=np.float64)
+
+def generate_positions(game_num=GAME_NUM, depth=SEARCH_DEPTH, random_move_ratio=RANDOM_MOVE_RATIO, path=DATA_PATH, seed=0, process_num=PROCESS_NUM):
+    """Play self-play games in parallel and save the features and results of their positions.
+
+    arguments:
+    game_num -- The number of games.
+    depth -- The search depth of the players.
+    random_move_ratio -- The probability to play a random move instead of the search move.
+    path -- The path of the data file.
+    seed -- The seed of the first game.
+    process_num -- The number of worker processes.
+
+    return: The features and the results.
+    """
+    features = []
+    results = []
+    args = [(seed + i, depth, random_move_ratio) for i in range(game_num)]
+    with Pool(process_num) as pool:
+        for game_features, game_results in tqdm(pool.imap_unordered(play_game, args), total=game_num, desc="Self-Play"):
+            features.append(game_features)
+            results.append(game_results)
+
+    features = np.concatenate(features)
+    results = np.concatenate(results)
+    directory = os.path.dirname(path)
+    if directory != "":
+        os.makedirs(directory, exist_ok=True)
+    np.savez_compressed(path, features=features, results=results, feature_names=np.array(FEATURE_NAMES))
+    return features, results
+
+def load_positions(path=DATA_PATH):
+    """Load the positions of generate_positions.
+
+    arguments:
+    path -- The path of the data file.
+
+    return: The features and the results.
+    """
+    with np.load(path) as data:
+        if list(data["feature_names"]) != FEATURE_NAMES:
+            raise ValueError(f"The positions in {path} were recorded with other features: {list(data['feature_names'])}")
+        return data["features"], data["results"]
+
+def sigmoid(values, scale):
+    """Map evaluations onto expected results between 0 and 1.
+
+    arguments:
+    values -- The evaluations.
+    scale -- The scaling factor of the evaluations.
+
+    return: The expected results.
+    """
+    return expit(scale * values)
+
+def calc_error(weights, features, results, scale):
+    """Calculate the mean squared error between the expected and the actual results and its gradient.
+
+    arguments:
+    weights -- The weights of the features.
+    features -- The features of the positions.
+    results -- The results of the positions.
+    scale -- The scaling factor of the evaluations.
+
+    return: The error, the gradient with respect to the weights.
+    """
+    expected = sigmoid(features @ weights, scale)
+    differences = expected - results
+    error = np.mean(differences**2)
+    gradient = features.T @ (2 * differences * expected * (1 - expected) * scale) / len(results)
+    return error, gradient
+
+def fit_scale(weights, features, results):
+    """Find the scaling factor that fits the given weights best to the results.
+
+    arguments:
+    weights -- The weights of the features.
+    features -- The features of the positions.
+    results -- The results of the positions.
+
+    return: The scaling factor.
+    """
+    values = features @ weights
+    solution = minimize_scalar(lambda scale: np.mean((sigmoid(values, scale) - results)**2), bounds=(1e-4, 10), method="bounded")
+    return solution.x
+
+def tune(features, results, start_weights=None, max_iterations=1000):
+    """Tune the weights of the evaluator (Texel tuning).
+    The scaling factor of the sigmoid is fitted to the starting weights and then kept fixed,
+    so that the tuned weights stay in the units of Game.calc_heuristic.
+
+    arguments:
+    features -- The features of the positions.
+    results -- The results of the positions.
+    start_weights -- The starting weights by feature name (dict), by default those of Game.calc_heuristic.
+    max_iterations -- The maximum number of iterations of the optimizer.
+
+    return: The evaluator with the tuned weights, the error before and after tuning.
+    """
+    start_weights = Evaluator(start_weights).weights
+    scale = fit_scale(start_weights, features, results)
+    start_error = calc_error(start_weights, features, results, scale)[0]
+    solution = minimize(calc_error, start_weights, args=(features, results, scale), jac=True,
+                        method="L-BFGS-B", options={"maxiter": max_iterations})
+    evaluator = Evaluator(dict(zip(FEATURE_NAMES, solution.x)))
+    return evaluator, start_error, solution.fun
+
+
+if __name__ == "__main__":
+    if os.path.exists(DATA_PATH):
+        features, results = load_positions()
+    else:
+        features, results = generate_positions()
+    print(f"Positions: {len(results)}")
+    evaluator, start_error, error = tune(features, results)
+    print(f"Error: {start_error:.5f} -> {error:.5f}")
+    for name, weight in evaluator.get_weights().items():
+        print(f"{name}: {weight:.3f}")
+    evaluator.save(evaluation.WEIGHTS_PATH)
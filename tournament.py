@@ -0,0 +1,207 @@
+import os
+import itertools
+from multiprocessing import Pool
+import numpy as np
+from tqdm import tqdm
+import arena
+import profiling
+from results_store import ResultStore, print_ratings
+
+PROCESS_NUM = os.cpu_count()
+
+# The data of each process is kept here. The players themselves are created once per side and process
+# by player_registry.get_player, so that RL models and caches are reused across games.
+worker = {}
+
+
+def init_worker(player_specs, profile=False):
+    """Initialise a worker process of the tournament.
+
+    arguments:
+    player_specs -- The specifications of all players by name (dict).
+    profile -- Whether each game is profiled (see profiling.py).
+    """
+    worker["player_specs"] = player_specs
+    worker["profile"] = profile
+
+def play_game(task):
+    """Play one game of the tournament in a worker process.
+
+    arguments:
+    task -- The game (dict) with its index, the names of both players, the starting player and the seed.
+
+    return: The result of the game (dict), with the data of the profiler if the games are profiled.
+    """
+    player_specs = worker["player_specs"]
+    profiler = None
+    if worker["profile"]:
+        profiler = profiling.Profiler()
+        profiler.start()
+    result = arena.play_game(player_specs[task["player1"]], player_specs[task["player2"]], task["starting_player"], task["seed"])
+    if profiler != None:
+        profiler.stop()
+        result["profile"] = profiler.to_data()
+    result.update(task)
+    return result
+
+def game_seed(seed, pairing_index, game_index):
+    """Derive a deterministic seed for a single game.
+    The seed only depends on the position of the game in the schedule and not on the worker that plays it.
+
+    arguments:
+    seed -- The seed of the tournament.
+    pairing_index -- The index of the pairing.
+    game_index -- The index of the game within the pairing.
+
+    return: The seed of the game.
+    """
+    return int(np.random.SeedSequence([seed, pairing_index, game_index]).generate_state(1)[0])
+
+def create_schedule(player_names, games_per_pairing, seed=0):
+    """Create the games of a round-robin tournament.
+    Within each pairing the starting player alternates.
+
+    arguments:
+    player_names -- The names of the participating players.
+    games_per_pairing -- The number of games between every two players.
+    seed -- The seed of the tournament.
+
+    return: The list of games (dicts).
+    """
+    tasks = []
+    for pairing_index, (name1, name2) in enumerate(itertools.combinations(player_names, 2)):
+        for game_index in range(games_per_pairing):
+            tasks.append({"index": len(tasks), "player1": name1, "player2": name2,
+                          "starting_player": -1 if game_index % 2 == 0 else 1,
+                          "seed": game_seed(seed, pairing_index, game_index)})
+    return tasks
+
+def run_games(player_specs, tasks, process_num=PROCESS_NUM, profile=False):
+    """Play the given games in a process pool.
+    The results are yielded as soon as the games are completed, not in the order of the schedule.
+
+    arguments:
+    player_specs -- The specifications of all players by name (dict).
+    tasks -- The games to be played (see create_schedule).
+    process_num -- The number of worker processes.
+    profile -- Whether each game is profiled in its worker (see profiling.py).
+
+    return: A generator for the results of the games.
+    """
+    with Pool(process_num, initializer=init_worker, initargs=(player_specs, profile)) as pool:
+        for result in pool.imap_unordered(play_game, tasks):
+            yield result
+
+def round_robin(player_specs, games_per_pairing, process_num=PROCESS_NUM, seed=0, store=None, tournament="tournament", profile_path=None):
+    """Play a round-robin tournament between all given players and print a table of the results.
+
+    arguments:
+    player_specs -- The specifications of all players by name (dict).
+    games_per_pairing -- The number of games between every two players.
+    process_num -- The number of worker processes.
+    seed -- The seed of the tournament.
+    store -- An optional ResultStore (see results_store.py) in which every game is saved as soon as it is finished.
+             Games that are already stored for the tournament are not played again, so that the tournament can be resumed.
+    tournament -- The name of the tournament in the store.
+    profile_path -- An optional path under which the profiles of all workers are saved as collapsed stacks (see profiling.py).
+
+    return: The results of all games.
+    """
+    tasks = create_schedule(list(player_specs), games_per_pairing, seed)
+    results = run_stored_games(player_specs, tasks, process_num, store, tournament, "Play Tournament", profile_path)
+    print_table(list(player_specs), results)
+    return results
+
+def play_games(num, player1_spec, player2_spec, process_num=PROCESS_NUM, seed=0, store=None, tournament="games", profile_path=None):
+    """Parallel version of arena.play_games for two players. The players must have different names.
+
+    arguments:
+    num -- The number of games.
+    player1_spec -- The specification of the first player (dict), optionally with a "name".
+    player2_spec -- The specification of the second player (dict), optionally with a "name".
+    process_num -- The number of worker processes.
+    seed -- The seed of the games.
+    store -- An optional ResultStore in which every game is saved as soon as it is finished.
+    tournament -- The name of the run in the store.
+    profile_path -- An optional path under which the profiles of all workers are saved as collapsed stacks (see profiling.py).
+
+    return: The results of all games.
+    """
+    # The optional names of the players are used to identify them in the store.
+    player_specs = {player1_spec.get("name", "player1"): player1_spec, player2_spec.get("name", "player2"): player2_spec}
+    if len(player_specs) < 2:
+        raise ValueError(f"Both players are named {list(player_specs)[0]!r}, the players need different names.")
+    tasks = create_schedule(list(player_specs), num, seed)
+    results = run_stored_games(player_specs, tasks, process_num, store, tournament, "Play Games", profile_path)
+    arena.print_results(results)
+    return results
+
+def run_stored_games(player_specs, tasks, process_num, store, tournament, description, profile_path=None):
+    """Play all games that are not yet in the store and save each result when it arrives.
+
+    arguments:
+    player_specs -- The specifications of all players by name (dict).
+    tasks -- The games of the schedule.
+    process_num -- The number of worker processes.
+    store -- The ResultStore or None.
+    tournament -- The name of the tournament in the store.
+    description -- The description for the progress bar.
+    profile_path -- An optional path under which the merged profiles of the played games are saved.
+
+    return: The results of all games of the schedule, including the already stored ones.
+    """
+    results = []
+    if store != None:
+        for name, spec in player_specs.items():
+            store.register_player(name, arena.get_player_config(spec))
+        finished_indices = store.get_finished_indices(tournament, tasks)
+        # Other runs under the same name, e.g. with other players, are not part of the results.
+        results = [result for result in store.get_results(tournament) if result["index"] in finished_indices]
+        tasks = [task for task in tasks if task["index"] not in finished_indices]
+
+    # The profiles of all workers are merged into one.
+    profiler = profiling.Profiler() if profile_path != None else None
+    for result in tqdm(run_games(player_specs, tasks, process_num, profiler != None), total=len(tasks), desc=description):
+        if profiler != None:
+            profiler.merge(result.pop("profile"))
+        if store != None:
+            store.add_result(tournament, result)
+        results.append(result)
+    if profiler != None:
+        profiling.save_profile(profiler, profile_path)
+    return results
+
+def print_table(player_names, results):
+    """Print the number of points of every player (1 for a win, 0.5 for a draw) against every other player.
+
+    arguments:
+    player_names -- The names of the participating players.
+    results -- The results of the played games.
+    """
+    points = {name: {other_name: 0 for other_name in player_names} for name in player_names}
+    for result in results:
+        if result["winner"] == -1:
+            points[result["player1"]][result["player2"]] += 1
+        elif result["winner"] == 1:
+            points[result["player2"]][result["player1"]] += 1
+        else:
+            points[result["player1"]][result["player2"]] += 0.5
+            points[result["player2"]][result["player1"]] += 0.5
+
+    width = max(len(name) for name in player_names) + 2
+    print("".ljust(width) + "".join(name.ljust(width) for name in player_names) + "total")
+    for name in player_names:
+        row = "".join(("-" if other_name == name else str(points[name][other_name])).ljust(width) for other_name in player_names)
+        print(name.ljust(width) + row + str(sum(points[name].values())))
+
+
+if __name__ == "__main__":
+    player_specs = {
+        "alphabeta4": {"mode": "alphabeta", "depth": 4, "hero_card_discount": 30},
+        "expectiminimax2": {"mode": "expectiminimax", "depth": 2, "hero_card_discount": 30},
+        "mcts1s": {"mode": "mcts", "timeout": 1, "selection_mode": "robust child"},
+        "rl2": {"mode": "rl", "env_model": 2, "model_path": "models/trained_models/model2.zip"},
+    }
+    store = ResultStore()
+    round_robin(player_specs, 10, store=store)
+    print_ratings(store.update_elo_ratings())
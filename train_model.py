@@ -6,12 +6,22 @@ from sb3_contrib.common.maskable.policies import MaskableActorCriticPolicy
 from sb3_contrib.common.wrappers import ActionMasker
 from sb3_contrib.ppo_mask import MaskablePPO
 from game_env import GameEnv
+from league import OpponentPool, LeagueVecEnv
+import profiling
 import os
 
 GAME_NUM = 100
 WIN_RATIO = 0.6
 TIMESTEPS_BEFORE_UPDATE = 100000
 TRAINING_ITERATIONS = 250
+USE_LEAGUE = True
+LEAGUE_ENV_NUM = 8 # number of games played in parallel against the league
+# Start from a policy that was pretrained on search-labelled positions (see expert_iteration.py).
+PRETRAINED_MODEL_PATH = None # e.g. "models/new_models/pretrained.zip"
+# Profile the training and save the collapsed stacks after every iteration (see profiling.py).
+# The CPU time is split between the learner, the opponents and the environment.
+PROFILE = False
+PROFILE_PATH = "profiles/training.folded"
 
 models_dir = "models/new_models"
 logdir = "logs/new_logs"
@@ -26,15 +36,31 @@ def mask_fn(env: gymnasium.Env) -> np.ndarray:
 
 # Create an environment and the agent.
 modeltype = 2
-# For masked actions
-env = GameEnv(model=modeltype)
-env = ActionMasker(env, mask_fn)
-model = MaskablePPO(MaskableActorCriticPolicy, env, verbose=1)
-env.reset()
-# Create an environment for the opponent.
-opponent_env = GameEnv(model=modeltype)
-opponent_env = ActionMasker(opponent_env, mask_fn)
-env.set_opponent_env(opponent_env)
+if USE_LEAGUE:
+    # Train against a pool of opponents that grows with every improved model.
+    opponent_pool = OpponentPool(model=modeltype)
+    opponent_pool.add_random()
+    opponent_pool.add_alphabeta(depth=1)
+    train_env = LeagueVecEnv([lambda: ActionMasker(GameEnv(model=modeltype), mask_fn) for _ in range(LEAGUE_ENV_NUM)], opponent_pool)
+    model = MaskablePPO(MaskableActorCriticPolicy, train_env, verbose=1)
+    # The test games are played against opponents from the league as well,
+    # but they do not change how often the opponents are sampled in the training.
+    env = GameEnv(model=modeltype)
+    env.set_opponent_pool(opponent_pool, records_results=False)
+    env = ActionMasker(env, mask_fn)
+    env.reset()
+else:
+    # For masked actions
+    env = GameEnv(model=modeltype)
+    env = ActionMasker(env, mask_fn)
+    model = MaskablePPO(MaskableActorCriticPolicy, env, verbose=1)
+    env.reset()
+    # Create an environment for the opponent.
+    opponent_env = GameEnv(model=modeltype)
+    opponent_env = ActionMasker(opponent_env, mask_fn)
+    env.set_opponent_env(opponent_env)
+if PRETRAINED_MODEL_PATH != None:
+    model.set_parameters(PRETRAINED_MODEL_PATH)
 # For unmasked actions (against random player, no test games)
 """
 env = GameEnv(model=modeltype)
@@ -42,8 +68,13 @@ env.reset()
 model = PPO("MlpPolicy", env, verbose=1)
 """
 
+if PROFILE:
+    profiler = profiling.Profiler()
+    profiler.start()
+
 for i in range(1,TRAINING_ITERATIONS):
-    model.learn(total_timesteps=TIMESTEPS_BEFORE_UPDATE, log_interval=1, reset_num_timesteps=False, tb_log_name="MaskablePPO")
+    with profiling.attribute(profiling.LEARNER_LABEL):
+        model.learn(total_timesteps=TIMESTEPS_BEFORE_UPDATE, log_interval=1, reset_num_timesteps=False, tb_log_name="MaskablePPO")
     model_path = f"{models_dir}/{TIMESTEPS_BEFORE_UPDATE*i}"
     model.save(model_path)
 
@@ -55,7 +86,8 @@ for i in range(1,TRAINING_ITERATIONS):
         truncated = False
         while not terminated and not truncated:
             mask = mask_fn(env)
-            action, _ = model.predict(obs, action_masks=mask)
+            with profiling.attribute(profiling.LEARNER_LABEL):
+                action, _ = model.predict(obs, action_masks=mask)
             obs, reward, terminated, truncated, info = env.step(action)
             if info["won"] == True:
                 wins += 1
@@ -63,5 +95,12 @@ for i in range(1,TRAINING_ITERATIONS):
     # If the agent has improved, update the opponent.
     if wins / GAME_NUM >= WIN_RATIO:
         print(f"LOAD MODEL: {model_path}.zip")
-        opponent_model = MaskablePPO.load(f"{model_path}.zip", env=opponent_env)
-        env.set_opponent_model(opponent_model)
+        if USE_LEAGUE:
+            # Keep the previous opponents and add the improved model as a frozen policy.
+            opponent_pool.add_model(f"{model_path}.zip")
+            print(opponent_pool.get_stats())
+        else:
+            opponent_model = MaskablePPO.load(f"{model_path}.zip", env=opponent_env)
+            env.set_opponent_model(opponent_model)
+    if PROFILE:
+        profiling.save_profile(profiler, PROFILE_PATH)